@@ -3,10 +3,13 @@ HTTP API server for Jarvis conversation endpoint.
 Allows custom HA integration to communicate with Jarvis backend.
 """
 import asyncio
+import json
 import logging
 from aiohttp import web
 from conversation import JarvisConversation
 from memory import Memory
+from sessions import DEFAULT_CONVERSATION_ID
+from metrics import METRICS
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,7 @@ class JarvisHTTPAPI:
         self.app = web.Application()
         self.app.router.add_post('/conversation', self.handle_conversation)
         self.app.router.add_get('/health', self.handle_health)
+        self.app.router.add_get('/metrics', self.handle_metrics)
     
     async def handle_conversation(self, request):
         """
@@ -27,17 +31,28 @@ class JarvisHTTPAPI:
         Expected JSON:
         {
             "text": "user input text",
-            "conversation_id": "optional_id"
+            "conversation_id": "optional_id",
+            "stream": false
         }
         
         Returns:
         {
-            "response": "Jarvis response text"
+            "response": "Jarvis response text",
+            "conversation_id": "id the turn was recorded under"
         }
+        
+        With "stream": true (or an Accept: text/event-stream header) the reply
+        is sent as Server-Sent Events instead: one `data: {"text": ...}` event
+        per sentence as it is generated, then an `event: done` whose data is
+        the JSON object above.
+        
+        Requests with the same conversation_id share chat history;
+        requests without one share a default conversation.
         """
         try:
             data = await request.json()
             text = data.get('text', '')
+            conversation_id = data.get('conversation_id') or None
             
             if not text:
                 return web.json_response(
@@ -47,12 +62,18 @@ class JarvisHTTPAPI:
             
             logger.info(f"Processing: {text}")
             
-            # Process through Jarvis
-            response = self.jarvis.process(text)
+            if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+                return await self._stream_conversation(request, text, conversation_id)
+            
+            # Process through Jarvis (non-blocking so other requests keep flowing)
+            response = await self.jarvis.aprocess(text, conversation_id=conversation_id)
             
             logger.info(f"Response: {response}")
             
-            return web.json_response({'response': response})
+            return web.json_response({
+                'response': response,
+                'conversation_id': conversation_id or DEFAULT_CONVERSATION_ID
+            })
         
         except Exception as e:
             logger.error(f"Error processing conversation: {e}", exc_info=True)
@@ -61,10 +82,40 @@ class JarvisHTTPAPI:
                 status=500
             )
     
+    async def _stream_conversation(self, request, text: str, conversation_id):
+        """Stream a reply as Server-Sent Events, one event per sentence."""
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+        })
+        await response.prepare(request)
+        
+        final = []
+        try:
+            async for chunk in self.jarvis.astream(text, conversation_id=conversation_id, response=final):
+                await response.write(f"data: {json.dumps({'text': chunk})}\n\n".encode())
+            
+            full_text = "".join(final)
+            logger.info(f"Response: {full_text}")
+            
+            done = {'response': full_text, 'conversation_id': conversation_id or DEFAULT_CONVERSATION_ID}
+            await response.write(f"event: done\ndata: {json.dumps(done)}\n\n".encode())
+            await response.write_eof()
+        except ConnectionResetError:
+            logger.info("Client disconnected while streaming the response")
+        return response
+    
     async def handle_health(self, request):
         """Health check endpoint."""
         return web.json_response({'status': 'ok'})
     
+    async def handle_metrics(self, request):
+        """Prometheus metrics endpoint (latency summaries, counters, in-flight gauges)."""
+        return web.Response(
+            body=METRICS.render().encode(),
+            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'},
+        )
+    
     def run(self, host='0.0.0.0', port=10401):
         """Run the HTTP server."""
         logger.info(f"Starting Jarvis HTTP API on {host}:{port}")
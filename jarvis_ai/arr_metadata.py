@@ -0,0 +1,189 @@
+"""
+Radarr/Sonarr metadata cache for Jarvis.
+Root folders and quality profiles almost never change, so each service keeps
+them in memory with a TTL and refreshes them in the background as they near
+expiry; adding a movie or series is then a lookup plus a single POST instead
+of three sequential round trips.
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+
+import config_helper as config
+
+logger = logging.getLogger(__name__)
+
+# Seconds cached metadata is trusted before it must be fetched again
+METADATA_TTL_SECONDS = 6 * 3600
+
+# Past this share of the TTL, cached metadata is served and refreshed in the background
+REFRESH_AHEAD_FRACTION = 0.8
+
+# Timeout (seconds) for metadata requests
+REQUEST_TIMEOUT = 10
+
+# Cached API resources (paths under /api/v3)
+RESOURCES = ('rootfolder', 'qualityprofile')
+
+# Words in a rejected add's validation errors that point at stale cached metadata
+# (Radarr/Sonarr name the fields RootFolderPath and QualityProfileId)
+METADATA_ERROR_HINTS = ('rootfolder', 'root folder', 'qualityprofile', 'quality profile')
+
+
+class ArrMetadataCache:
+    """Per-service cache of the root folders and quality profiles Radarr/Sonarr add with."""
+
+    def __init__(self, name: str, base_url: str, api_key: str, ttl: float = METADATA_TTL_SECONDS):
+        """
+        Args:
+            name: Service name for logs (e.g. "Radarr")
+            base_url: Service URL
+            api_key: Service API key
+            ttl: Seconds metadata is cached
+        """
+        self.name = name
+        self.base_url = (base_url or "").rstrip("/")
+        self.ttl = ttl
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-Api-Key": api_key or "",
+            "Content-Type": "application/json",
+        })
+        # resource -> (fetched_at, items)
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.session.headers.get("X-Api-Key"))
+
+    def get(self, resource: str) -> List[Dict]:
+        """
+        Cached items of an API resource, fetched when missing or expired.
+
+        Raises:
+            requests.RequestException: If a needed fetch fails
+        """
+        with self._lock:
+            entry = self._entries.get(resource)
+        if entry is None:
+            return self.refresh(resource)
+        age = time.time() - entry[0]
+        if age >= self.ttl:
+            return self.refresh(resource)
+        if age >= self.ttl * REFRESH_AHEAD_FRACTION:
+            self.refresh_in_background(resource)
+        return entry[1]
+
+    def root_folders(self) -> List[Dict]:
+        return self.get('rootfolder')
+
+    def quality_profiles(self) -> List[Dict]:
+        return self.get('qualityprofile')
+
+    def refresh(self, resource: str) -> List[Dict]:
+        """Fetch a resource now and cache it."""
+        response = self.session.get(f"{self.base_url}/api/v3/{resource}", timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        items = response.json()
+        with self._lock:
+            self._entries[resource] = (time.time(), items)
+        logger.debug(f"{self.name} {resource} cached ({len(items)} items)")
+        return items
+
+    def refresh_in_background(self, resource: str):
+        """Refresh a resource on a daemon thread (one refresh per resource at a time)."""
+        with self._lock:
+            if resource in self._refreshing:
+                return
+            self._refreshing.add(resource)
+
+        def run():
+            try:
+                self.refresh(resource)
+            except Exception as e:
+                # The cached copy stays in use until it expires
+                logger.warning(f"{self.name} {resource} refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(resource)
+
+        threading.Thread(target=run, name=f"{self.name.lower()}-metadata", daemon=True).start()
+
+    def invalidate(self, resource: Optional[str] = None):
+        """Forget one cached resource, or all of them."""
+        with self._lock:
+            if resource is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(resource, None)
+
+    def invalidate_for_error(self, response: requests.Response) -> bool:
+        """
+        Invalidate after a rejected add if the rejection can be down to stale metadata.
+
+        Radarr/Sonarr also answer 400 for ordinary validation failures such as
+        "already exists", which must not flush the cache.
+
+        Returns:
+            bool: True if the cache was invalidated
+        """
+        if response.status_code in (404, 422):
+            stale = True
+        elif response.status_code == 400:
+            body = (response.text or "").lower()
+            stale = any(hint in body for hint in METADATA_ERROR_HINTS)
+        else:
+            stale = False
+        if stale:
+            logger.info(f"{self.name} rejected cached root folder/quality profile, refetching on next add")
+            self.invalidate()
+        return stale
+
+    def warm(self) -> bool:
+        """Fetch every resource ahead of the first add (no-op if not configured)."""
+        if not self.configured:
+            return False
+        try:
+            for resource in RESOURCES:
+                self.refresh(resource)
+            return True
+        except Exception as e:
+            logger.warning(f"{self.name} metadata prefetch failed: {e}")
+            return False
+
+
+_caches: Dict[str, ArrMetadataCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_arr_metadata(service: str) -> ArrMetadataCache:
+    """
+    Get the process-wide metadata cache for a service.
+
+    Args:
+        service: "radarr" or "sonarr"
+    """
+    cache = _caches.get(service)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(service)
+            if cache is None:
+                if service == "radarr":
+                    cache = ArrMetadataCache("Radarr", config.RADARR_URL, config.RADARR_API_KEY)
+                elif service == "sonarr":
+                    cache = ArrMetadataCache("Sonarr", config.SONARR_URL, config.SONARR_API_KEY)
+                else:
+                    raise ValueError(f"Unknown service: {service}")
+                _caches[service] = cache
+    return cache
+
+
+def warm_arr_metadata():
+    """Prefetch Radarr and Sonarr metadata so the first add is a single POST."""
+    for service in ("radarr", "sonarr"):
+        get_arr_metadata(service).warm()
@@ -0,0 +1,92 @@
+"""
+Async facade over Jarvis memory.
+Every call runs on a small pool of reader threads, each with its own SQLite
+connection, so concurrent turns read in parallel without blocking the event
+loop; writes are still serialised through Memory's single writer.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Optional
+
+# Threads (and read connections) serving async memory calls
+READER_POOL_SIZE = 4
+
+
+class AsyncMemory:
+    """Awaitable versions of the Memory methods used from the event loop."""
+
+    def __init__(self, memory, readers: int = READER_POOL_SIZE):
+        """
+        Args:
+            memory: Memory instance to wrap
+            readers: Reader threads in the pool
+        """
+        self.memory = memory
+        self._executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="memory-reader")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    # ===== PREFERENCES =====
+
+    async def set_preference(self, key: str, value: Any):
+        return await self._run(self.memory.set_preference, key, value)
+
+    async def get_preference(self, key: str, default: Any = None) -> Any:
+        return await self._run(self.memory.get_preference, key, default)
+
+    async def get_all_preferences(self) -> Dict[str, Any]:
+        return await self._run(self.memory.get_all_preferences)
+
+    async def delete_preference(self, key: str):
+        return await self._run(self.memory.delete_preference, key)
+
+    # ===== FACTS =====
+
+    async def remember_fact(self, entity_id: str, fact_key: str, fact_value: str, source: str = "user"):
+        return await self._run(self.memory.remember_fact, entity_id, fact_key, fact_value, source)
+
+    async def recall_fact(self, entity_id: str, fact_key: str) -> Optional[str]:
+        return await self._run(self.memory.recall_fact, entity_id, fact_key)
+
+    async def get_entity_facts(self, entity_id: str) -> Dict[str, str]:
+        return await self._run(self.memory.get_entity_facts, entity_id)
+
+    async def delete_fact(self, entity_id: str, fact_key: str):
+        return await self._run(self.memory.delete_fact, entity_id, fact_key)
+
+    # ===== CONVERSATION CONTEXT =====
+
+    async def save_context(self, user_input: str, assistant_response: str, is_error: bool = False):
+        return await self._run(self.memory.save_context, user_input, assistant_response, is_error=is_error)
+
+    async def get_recent_context(self, limit: int = 5, include_errors: bool = False) -> list:
+        return await self._run(self.memory.get_recent_context, limit, include_errors)
+
+    async def recall(self, query: str, limit: int = 3, sources=None) -> list:
+        return await self._run(self.memory.recall, query, limit, sources)
+
+    async def clear_context(self) -> int:
+        return await self._run(self.memory.clear_context)
+
+    # ===== LAST INTERACTION =====
+
+    async def save_last_interaction(self, context_type: str, entity_id: str, action: str):
+        return await self._run(self.memory.save_last_interaction, context_type, entity_id, action)
+
+    async def get_last_interaction(self, context_type: str) -> Optional[Dict[str, str]]:
+        return await self._run(self.memory.get_last_interaction, context_type)
+
+    # ===== UTILITY =====
+
+    async def get_stats(self) -> Dict[str, int]:
+        return await self._run(self.memory.get_stats)
+
+    async def flush(self):
+        return await self._run(self.memory.flush)
+
+    def shutdown(self):
+        """Stop the reader pool (pending calls finish first)."""
+        self._executor.shutdown(wait=True)
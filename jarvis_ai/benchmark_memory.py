@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Benchmark Jarvis memory (memory.py) as data grows.
+
+Seeds a temporary database per size with realistic volumes (context rows
+spread over the last weeks, facts over many entities, preferences), then
+times the hot Memory calls single-threaded and from concurrent threads and
+prints a JSON report (or writes it with --output).
+
+Everything goes through the public Memory API, as the add-on uses it; only
+the old context rows are inserted with plain SQL, since save_context always
+stamps the current time.
+
+    python3 benchmark_memory.py --rows 10000 100000 1000000 --output report.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from memory import SNAPSHOT_FORMAT, SNAPSHOT_VERSION, Memory
+from semantic_memory import create_embedder
+
+# Rows per executemany() while seeding
+SEED_BATCH_ROWS = 10000
+
+# Days of history seeded; days past the retention window exercise the rollup
+SEED_DAYS = 14
+
+USER_REQUESTS = [
+    "turn on the kitchen lights", "what's the weather tomorrow", "play some jazz in the lounge",
+    "set the heating to 21 degrees", "is the garage door closed", "how long to drive to work",
+    "add the new Dune movie", "what's on my calendar today", "show me the garden camera",
+    "who won the game last night", "turn off all the lights", "pause the music",
+]
+
+
+def _percentile(sorted_samples: List[float], q: float) -> float:
+    index = min(len(sorted_samples) - 1, max(0, int(round(q * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+
+def _summarise(samples: List[float], wall_seconds: float) -> Dict[str, float]:
+    """Latency stats in milliseconds plus throughput."""
+    ordered = sorted(samples)
+    return {
+        'calls': len(samples),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 4),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 4),
+        'p95_ms': round(_percentile(ordered, 0.95) * 1000, 4),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+        'ops_per_sec': round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0,
+    }
+
+
+def seed(mem: Memory, context_rows: int, facts: int, preferences: int, workdir: str, rng: random.Random):
+    """Fill the database with realistic volumes."""
+    # Facts and preferences arrive as a bulk snapshot import, which also indexes
+    # the facts for semantic recall. Imported first: the import starts the
+    # writer, whose startup maintenance must not see the expired context rows
+    # before the benchmark times their rollup.
+    snapshot = os.path.join(workdir, "seed.jsonl")
+    with open(snapshot, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION}) + "\n")
+        for i in range(facts):
+            f.write(json.dumps(['f', f"sensor.device_{i % max(1, facts // 10)}", f"fact_{i}",
+                                f"value {i}", "benchmark", None]) + "\n")
+        for i in range(preferences):
+            f.write(json.dumps(['p', f"pref_{i}", {'value': i}, None]) + "\n")
+    mem.import_snapshot(snapshot)
+    mem.flush()
+    os.remove(snapshot)
+
+    # History as earlier runs of the add-on left it, spread over SEED_DAYS
+    conn = sqlite3.connect(mem.db_path)
+    now = datetime.utcnow()
+    span_seconds = SEED_DAYS * 86400
+
+    def context_batches():
+        batch = []
+        for i in range(context_rows):
+            # Oldest first, so rowids follow time as they do in production
+            ts = now - timedelta(seconds=span_seconds * (context_rows - i) / context_rows)
+            request = rng.choice(USER_REQUESTS)
+            batch.append((request, f"Certainly, Sir. ({i})", 1 if rng.random() < 0.05 else 0,
+                          ts.strftime("%Y-%m-%d %H:%M:%S")))
+            if len(batch) >= SEED_BATCH_ROWS:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with conn:
+        for batch in context_batches():
+            conn.executemany("""
+                INSERT INTO context (user_input, assistant_response, is_error, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, batch)
+    conn.close()
+
+
+def run_single(func: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    samples = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - t)
+    return _summarise(samples, time.perf_counter() - start)
+
+
+def run_concurrent(func: Callable[[int], object], iterations: int, threads: int) -> Dict[str, float]:
+    samples = []
+    lock = threading.Lock()
+
+    def worker(offset: int):
+        local = []
+        for i in range(iterations):
+            t = time.perf_counter()
+            func(offset * iterations + i)
+            local.append(time.perf_counter() - t)
+        with lock:
+            samples.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    result = _summarise(samples, time.perf_counter() - start)
+    result['threads'] = threads
+    return result
+
+
+def bench_size(context_rows: int, args, rng: random.Random) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="jarvis_memory_bench_")
+    try:
+        db_path = os.path.join(workdir, "jarvis_memory.db")
+        mem = Memory(db_path=db_path, write_behind=not args.no_write_behind,
+                     embedder=create_embedder(args.embedder))
+
+        t = time.perf_counter()
+        seed(mem, context_rows, args.facts, args.preferences, workdir, rng)
+        seed_seconds = time.perf_counter() - t
+
+        entity_count = max(1, args.facts // 10)
+        workloads = {
+            'get_all_preferences': lambda i: mem.get_all_preferences(),
+            'get_preference': lambda i: mem.get_preference(f"pref_{i % max(1, args.preferences)}"),
+            'get_recent_context': lambda i: mem.get_recent_context(limit=3),
+            'get_entity_facts': lambda i: mem.get_entity_facts(f"sensor.device_{i % entity_count}"),
+            'recall_fact': lambda i: mem.recall_fact(f"sensor.device_{i % entity_count}", f"fact_{i % max(1, args.facts)}"),
+            'save_context': lambda i: mem.save_context(rng.choice(USER_REQUESTS), f"Bench reply {i}"),
+            # Latency until the write is durable in the database
+            'save_context_committed': lambda i: (mem.save_context(rng.choice(USER_REQUESTS), f"Bench {i}"), mem.flush()),
+            'get_stats': lambda i: mem.get_stats(),
+        }
+        if args.embedder != "off":
+            workloads['recall'] = lambda i: mem.recall(rng.choice(USER_REQUESTS), limit=3)
+
+        # One maintenance pass rolls up the seeded expired days; later passes find nothing
+        t = time.perf_counter()
+        mem.apply_retention()
+        retention_rollup_ms = round((time.perf_counter() - t) * 1000, 3)
+
+        single = {name: run_single(func, args.iterations) for name, func in workloads.items()}
+        single['retention_noop'] = run_single(lambda i: mem.apply_retention(), max(1, args.iterations // 10))
+
+        concurrent = {}
+        if args.threads > 1:
+            per_thread = max(1, args.iterations // args.threads)
+            for name, func in workloads.items():
+                concurrent[name] = run_concurrent(func, per_thread, args.threads)
+
+        stats = mem.get_stats()
+        mem.close()
+        db_bytes = sum(os.path.getsize(os.path.join(workdir, f)) for f in os.listdir(workdir))
+        return {
+            'context_rows': context_rows,
+            'seed_seconds': round(seed_seconds, 3),
+            'retention_rollup_ms': retention_rollup_ms,
+            'final_stats': stats,
+            'disk_bytes': db_bytes,
+            'single': single,
+            'concurrent': concurrent,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Jarvis memory.py workloads")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000],
+                        help="Context row counts to benchmark (one run each)")
+    parser.add_argument("--facts", type=int, default=5000, help="Facts seeded")
+    parser.add_argument("--preferences", type=int, default=50, help="Preferences seeded")
+    parser.add_argument("--embedder", default="hashing", help="Semantic embedder for the seeded facts: hashing or off")
+    parser.add_argument("--iterations", type=int, default=500, help="Calls per workload")
+    parser.add_argument("--threads", type=int, default=8, help="Threads for the concurrent runs (1 to skip)")
+    parser.add_argument("--no-write-behind", action="store_true", help="Commit writes in line")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        import numpy  # noqa: F401
+        has_numpy = True
+    except ImportError:
+        has_numpy = False
+
+    rng = random.Random(args.seed)
+    report = {
+        'created_at': datetime.utcnow().isoformat(timespec="seconds"),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'numpy': has_numpy,
+        },
+        'config': {k: v for k, v in vars(args).items() if k != 'output'},
+        'results': [],
+    }
+    for rows in args.rows:
+        print(f"Benchmarking {rows} context rows...", file=sys.stderr)
+        report['results'].append(bench_size(rows, args, rng))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,24 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+def _get_int(name: str, default: int) -> int:
+    """Read an integer option, treating HA's "null" string and bad values as unset."""
+    value = os.getenv(name, "")
+    if not value or value.lower() in ['null', 'none']:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid integer for {name}: '{value}', using {default}")
+        return default
+
+def _get_bool(name: str, default: bool) -> bool:
+    """Read a boolean option, treating HA's "null" string as unset."""
+    value = os.getenv(name, "")
+    if not value or value.lower() in ['null', 'none']:
+        return default
+    return value.lower() in ['true', '1', 'yes', 'on']
+
 # Debug logging
 logger.info(f"Loading config from environment...")
 logger.info(f"GEMINI_API_KEY present: {bool(os.getenv('GEMINI_API_KEY'))}")
@@ -70,3 +88,26 @@ UNIFI_WAN_SENSOR = os.getenv("UNIFI_WAN_SENSOR", "sensor.unifi_gateway_wan_ip")
 
 # ===== LLM CONFIGURATION =====
 LLM_PROVIDER = "gemini"  # Always use Gemini for now
+
+# ===== CONVERSATION SESSIONS =====
+# One chat per conversation_id; idle sessions are dropped
+MAX_CONVERSATIONS = _get_int("MAX_CONVERSATIONS", 32)
+CONVERSATION_TIMEOUT_MINUTES = _get_int("CONVERSATION_TIMEOUT_MINUTES", 30)
+
+# ===== CHAT HISTORY =====
+# Older turns are folded into a summary once history exceeds the token budget
+HISTORY_TOKEN_BUDGET = _get_int("HISTORY_TOKEN_BUDGET", 4000)
+HISTORY_KEEP_EXCHANGES = _get_int("HISTORY_KEEP_EXCHANGES", 3)
+
+# ===== STREAMING =====
+# Also send Wyoming replies a sentence at a time (synthesize-start/chunk/stop events) ahead of
+# the final text event; off by default, as these are TTS requests Home Assistant doesn't expect
+STREAM_RESPONSES = _get_bool("STREAM_RESPONSES", False)
+
+# ===== SEMANTIC MEMORY =====
+# Embedder for recalling relevant past exchanges and facts: hashing (local), vertex, or off
+MEMORY_EMBEDDER = os.getenv("MEMORY_EMBEDDER", "hashing")
+if not MEMORY_EMBEDDER or MEMORY_EMBEDDER.lower() in ['null', 'none']:
+    MEMORY_EMBEDDER = "hashing"
+# Most relevant memories added to a turn's prompt (0 disables recall)
+MEMORY_RECALL_LIMIT = _get_int("MEMORY_RECALL_LIMIT", 3)
@@ -0,0 +1,109 @@
+"""
+Day-partitioned retention for Jarvis conversation context.
+Raw exchanges are kept for CONTEXT_RETENTION_DAYS; each expired UTC day is
+then folded into one context_rollup row (exchange and error counts, top
+intents) and its raw rows are dropped with a single indexed range delete,
+so long-term usage stats survive while the context table stays small.
+"""
+import json
+import logging
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Days of raw conversation context kept (today counts as one)
+CONTEXT_RETENTION_DAYS = 7
+
+# Intents kept per rollup day
+TOP_INTENTS = 5
+
+# Intent -> words that signal it; the first intent with a matching word wins
+INTENT_KEYWORDS = {
+    'lights': {'light', 'lights', 'lamp', 'lamps', 'bulb', 'brightness', 'dim'},
+    'climate': {'heating', 'thermostat', 'temperature', 'aircon', 'ac', 'warmer', 'cooler', 'fan'},
+    'music': {'play', 'music', 'song', 'playlist', 'album', 'spotify', 'pause', 'skip', 'volume'},
+    'weather': {'weather', 'rain', 'forecast', 'sunny', 'umbrella', 'wind'},
+    'media': {'movie', 'film', 'series', 'episode', 'radarr', 'sonarr', 'torrent', 'download', 'downloads'},
+    'calendar': {'calendar', 'meeting', 'appointment', 'schedule', 'event'},
+    'travel': {'traffic', 'commute', 'drive', 'travel', 'directions'},
+    'camera': {'camera', 'cameras', 'doorbell'},
+    'security': {'lock', 'unlock', 'door', 'alarm', 'garage'},
+    'network': {'wifi', 'network', 'unifi', 'internet', 'vpn', 'ip'},
+    'memory': {'remember', 'forget', 'preference', 'prefer'},
+    'search': {'search', 'google', 'who', 'what', 'when', 'why', 'how'},
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def classify_intent(text: str) -> str:
+    """Coarse intent of a user request, for usage stats ("other" if none match)."""
+    words = set(_WORD_RE.findall((text or "").lower()))
+    for intent, keywords in INTENT_KEYWORDS.items():
+        if words & keywords:
+            return intent
+    return "other"
+
+
+def retention_cutoff(now: Optional[datetime] = None, retention_days: int = CONTEXT_RETENTION_DAYS) -> str:
+    """Start of the oldest retained UTC day, in CURRENT_TIMESTAMP format."""
+    day = (now or datetime.utcnow()).date() - timedelta(days=retention_days - 1)
+    return f"{day.isoformat()} 00:00:00"
+
+
+def roll_up_expired(conn: sqlite3.Connection, now: Optional[datetime] = None,
+                    retention_days: int = CONTEXT_RETENTION_DAYS) -> int:
+    """
+    Fold expired context days into context_rollup and drop their raw rows.
+
+    Runs in the caller's transaction. Cheap when nothing has expired: both
+    the scan and the delete are range seeks on the context timestamp index.
+
+    Returns:
+        int: Raw context rows rolled up and deleted
+    """
+    cutoff = retention_cutoff(now, retention_days)
+    days: Dict[str, dict] = {}
+    rows = conn.execute("""
+        SELECT user_input, is_error, timestamp FROM context
+        WHERE timestamp < ? ORDER BY timestamp
+    """, (cutoff,))
+    for user_input, is_error, timestamp in rows:
+        timestamp = str(timestamp)
+        day = days.setdefault(timestamp[:10], {
+            'exchanges': 0, 'errors': 0, 'intents': Counter(),
+            'first_at': timestamp, 'last_at': timestamp,
+        })
+        day['exchanges'] += 1
+        day['errors'] += 1 if is_error else 0
+        day['intents'][classify_intent(user_input)] += 1
+        day['last_at'] = timestamp
+
+    if not days:
+        return 0
+
+    for day, stats in days.items():
+        # Merge into an existing rollup (rows restored into an already rolled-up day)
+        existing = conn.execute("""
+            SELECT exchanges, errors, top_intents, first_at, last_at FROM context_rollup WHERE day = ?
+        """, (day,)).fetchone()
+        if existing:
+            stats['exchanges'] += existing[0]
+            stats['errors'] += existing[1]
+            stats['intents'].update(json.loads(existing[2] or "{}"))
+            stats['first_at'] = min(stats['first_at'], existing[3] or stats['first_at'])
+            stats['last_at'] = max(stats['last_at'], existing[4] or stats['last_at'])
+        conn.execute("""
+            INSERT OR REPLACE INTO context_rollup (day, exchanges, errors, top_intents, first_at, last_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (day, stats['exchanges'], stats['errors'],
+              json.dumps(dict(stats['intents'].most_common(TOP_INTENTS))),
+              stats['first_at'], stats['last_at']))
+
+    deleted = conn.execute("DELETE FROM context WHERE timestamp < ?", (cutoff,)).rowcount
+    logger.info(f"Rolled up {deleted} context entries from {len(days)} expired day(s)")
+    return deleted
@@ -1,77 +1,40 @@
 """
 Conversation brain for Jarvis using Vertex AI Gemini with function calling and persistent memory.
 """
+import asyncio
+import contextvars
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, List, Optional
 from google.cloud import aiplatform
 import vertexai
 from vertexai.generative_models import GenerativeModel, Tool, FunctionDeclaration
 import config_helper as config
 from memory import Memory
+from semantic_memory import format_exchange
+from sessions import SessionManager
+from history import HistoryCompactor, content_text
+from streaming import SentenceChunker
+from metrics import record_span, span, start_turn_trace, finish_turn_trace
 
 logger = logging.getLogger(__name__)
 
-class JarvisConversation:
-    """
-    Jarvis conversation agent powered by Vertex AI Gemini.
-    Integrates with persistent memory for preferences and context.
-    """
-    
-    def __init__(self, memory: Memory):
-        """
-        Initialize Jarvis conversation brain.
-        
-        Args:
-            memory: Memory instance for persistent storage
-        """
-        self.memory = memory
-        
-        # Check mode: Vertex AI or AI Studio
-        if config.GCP_PROJECT_ID:
-            # Vertex AI mode - no API key needed
-            logger.info("Initializing in Vertex AI mode")
-        else:
-            # AI Studio mode - require API key
-            if not config.GEMINI_API_KEY:
-                raise ValueError("GEMINI_API_KEY not configured!")
-            logger.info("Initializing in AI Studio mode")
-        
-        # Initialize Vertex AI
-        credentials_path = "/data/gcp-credentials.json"
-        if os.path.exists(credentials_path):
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
-            logger.info(f"Using GCP credentials from {credentials_path}")
-        else:
-            logger.warning(f"GCP credentials not found at {credentials_path}, attempting default credentials")
-        
-        vertexai.init(
-            project=config.GCP_PROJECT_ID,
-            location="us-central1"
-        )
-        
-        # Get configured model (defaults to gemini-2.5-flash)
-        model_name = config.GEMINI_MODEL
-        
-        # Import Vertex AI tools
-        from vertex_tools import jarvis_tool
-       
-        # Initialize with tools
-        self.model = GenerativeModel(
-            model_name,
-            tools=[jarvis_tool]
-        )
-        
-        # Start chat
-        self.chat = self.model.start_chat()
-        
-        logger.info(f"Jarvis conversation brain initialized with Vertex AI {model_name}")
-        logger.info(f"GCP Project: {config.GCP_PROJECT_ID}")
-        logger.info("Function calling tools enabled: HA control, weather, search")
-    
-    def _build_system_prompt(self) -> str:
-        """Build dynamic system prompt including user preferences from memory."""
-        
-        base_prompt = """You are J.A.R.V.I.S. (Just A Rather Very Intelligent System), Tony Stark's AI assistant.
+GENERATION_CONFIG = {"temperature": 0.7, "max_output_tokens": 1024}
+RETRY_GENERATION_CONFIG = {"temperature": 0.5, "max_output_tokens": 200}
+
+# Prevent infinite function-calling loops
+MAX_FUNCTION_CALLS = 5
+
+# Worker threads for legacy sync tools (blocking HTTP calls)
+TOOL_EXECUTOR_WORKERS = 8
+
+# Persona and tool-usage rules. Sent once per request as the model's
+# system_instruction, an identical prefix the provider can serve from its
+# context cache; preferences and recent context follow in the first message.
+STATIC_SYSTEM_PROMPT = """You are J.A.R.V.I.S. (Just A Rather Very Intelligent System), Tony Stark's AI assistant.
 
 PERSONA:
 - Helpful, polite, and slightly witty
@@ -142,273 +105,554 @@ UNIFI NETWORK QUERIES:
         
         **General Knowledge vs Search:**
 """
+
+_FUNCTION_MAP = None
+
+def _get_function_map() -> dict:
+    """Map function names declared in vertex_tools to the actual tool callables."""
+    global _FUNCTION_MAP
+    if _FUNCTION_MAP is None:
+        import tools
+        _FUNCTION_MAP = {
+            name: getattr(tools, name) for name in [
+                "control_home_assistant",
+                "get_ha_state",
+                "search_ha_entities",
+                "get_person_location",
+                "get_appliance_status",
+                "get_weather",
+                "get_travel_time",
+                "google_search",
+                "add_calendar_event",
+                "list_calendar_events",
+                "create_location_reminder",
+                "play_music",
+                "save_preference",
+                "get_preference",
+                "delete_preference",
+                "get_current_time",
+                "query_radarr",
+                "add_to_radarr",
+                "query_sonarr",
+                "add_to_sonarr",
+                "query_qbittorrent",
+                "query_prowlarr",
+                "check_vpn_status",
+                "query_unifi_network",
+                "query_unifi_controller",
+                "analyze_camera",
+            ]
+        }
+    return _FUNCTION_MAP
+
+# Tools that change state, mapped to the argument naming what they change.
+# Calls in one model response run concurrently, except writes to the same
+# target, which keep the order the model gave them.
+WRITE_TOOL_TARGETS = {
+    "control_home_assistant": "entity_id",
+    "play_music": "entity_id",
+    "save_preference": "name",
+    "delete_preference": "name",
+    "add_to_radarr": "movie_name",
+    "add_to_sonarr": "series_name",
+    "add_calendar_event": None,
+    "create_location_reminder": None,
+}
+
+def _ordering_key(function_name: str, function_args: dict) -> Optional[str]:
+    """
+    Key for calls that must stay ordered relative to each other.
+    
+    Returns None for read-only tools (free to overlap with anything).
+    """
+    if function_name not in WRITE_TOOL_TARGETS:
+        return None
+    target_arg = WRITE_TOOL_TARGETS[function_name]
+    target = function_args.get(target_arg) if target_arg else None
+    if function_name == "play_music" and not target:
+        target = function_args.get("device")
+    if function_name in ("save_preference", "delete_preference"):
+        return f"preference:{str(target).lower()}"
+    # Entity writes are keyed by entity so different tools on one device stay ordered
+    return str(target).lower() if target else function_name
+
+class JarvisConversation:
+    """
+    Jarvis conversation agent powered by Vertex AI Gemini.
+    Integrates with persistent memory for preferences and context.
+    """
+    
+    def __init__(self, memory: Memory):
+        """
+        Initialize Jarvis conversation brain.
+        
+        Args:
+            memory: Memory instance for persistent storage
+        """
+        self.memory = memory
+        
+        # Tools share this Memory (one connection, writer and preference cache)
+        import tools
+        tools.set_memory(memory)
+        
+        # Check mode: Vertex AI or AI Studio
+        if config.GCP_PROJECT_ID:
+            # Vertex AI mode - no API key needed
+            logger.info("Initializing in Vertex AI mode")
+        else:
+            # AI Studio mode - require API key
+            if not config.GEMINI_API_KEY:
+                raise ValueError("GEMINI_API_KEY not configured!")
+            logger.info("Initializing in AI Studio mode")
+        
+        # Initialize Vertex AI
+        credentials_path = "/data/gcp-credentials.json"
+        if os.path.exists(credentials_path):
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+            logger.info(f"Using GCP credentials from {credentials_path}")
+        else:
+            logger.warning(f"GCP credentials not found at {credentials_path}, attempting default credentials")
+        
+        vertexai.init(
+            project=config.GCP_PROJECT_ID,
+            location="us-central1"
+        )
+        
+        # Get configured model (defaults to gemini-2.5-flash)
+        model_name = config.GEMINI_MODEL
+        
+        # Import Vertex AI tools
+        from vertex_tools import jarvis_tool
+       
+        # Initialize with tools; the static prompt is the system instruction
+        self.model = GenerativeModel(
+            model_name,
+            tools=[jarvis_tool],
+            system_instruction=STATIC_SYSTEM_PROMPT
+        )
+        
+        # (memory version, dynamic prompt text, exchange texts in it) of the last _build_system_prompt()
+        self._prompt_cache = None
+        
+        # One chat per conversation_id / Wyoming client, bounded by LRU + idle TTL
+        self.sessions = SessionManager(
+            chat_factory=self.model.start_chat,
+            max_sessions=config.MAX_CONVERSATIONS,
+            ttl_seconds=config.CONVERSATION_TIMEOUT_MINUTES * 60
+        )
+        
+        # Keeps each chat's history within a token budget
+        self.history_compactor = HistoryCompactor(
+            token_budget=config.HISTORY_TOKEN_BUDGET,
+            keep_exchanges=config.HISTORY_KEEP_EXCHANGES
+        )
+        
+        # Legacy sync tools run here so they never block the event loop
+        self._tool_executor = ThreadPoolExecutor(
+            max_workers=TOOL_EXECUTOR_WORKERS,
+            thread_name_prefix="jarvis-tool"
+        )
+        
+        logger.info(f"Jarvis conversation brain initialized with Vertex AI {model_name}")
+        logger.info(f"GCP Project: {config.GCP_PROJECT_ID}")
+        logger.info("Function calling tools enabled: HA control, weather, search")
+    
+    async def _build_system_prompt(self) -> str:
+        """
+        Build the dynamic part of the system prompt (preferences and recent context).
+        
+        The static persona and tool rules are the model's system_instruction
+        (STATIC_SYSTEM_PROMPT). The dynamic text is cached and only rebuilt
+        when Memory's preferences or context change.
+        """
+        version = (self.memory.preferences_version, self.memory.context_version)
+        if self._prompt_cache is not None and self._prompt_cache[0] == version:
+            return self._prompt_cache[1]
+        
+        exchanges = set()
+        
+        sections = []
         
         # Load user preferences from memory
-        prefs = self.memory.get_all_preferences()
+        prefs = await self.memory.aio.get_all_preferences()
         
         if prefs:
             logger.info(f"Loading {len(prefs)} preferences into system prompt: {list(prefs.keys())}")
-            pref_text = "\n\nUSER PREFERENCES (from memory):\n"
+            pref_text = "USER PREFERENCES (from memory):\n"
             for key, value in prefs.items():
                 pref_text += f"- {key}: {value}\n"
-            base_prompt += pref_text
+            sections.append(pref_text)
         else:
             logger.info("No preferences found in memory")
         
         # Load recent conversation context (exclude errors!)
-        recent_context = self.memory.get_recent_context(limit=3, include_errors=False)
+        recent_context = await self.memory.aio.get_recent_context(limit=3, include_errors=False)
         if recent_context:
-            context_text = "\n\nRECENT CONTEXT:\n"
+            context_text = "RECENT CONTEXT:\n"
             for ctx in recent_context:
                 context_text += f"User: {ctx['user']}\n"
                 context_text += f"You: {ctx['assistant']}\n"
-            base_prompt += context_text
+                exchanges.add(format_exchange(ctx['user'], ctx['assistant']))
+            sections.append(context_text)
         
-        return base_prompt
+        prompt = "\n".join(sections)
+        self._prompt_cache = (version, prompt, frozenset(exchanges))
+        return prompt
+    
+    async def _recall_memories(self, session, text: str) -> str:
+        """
+        Prompt section with the stored exchanges and facts most relevant to
+        this request, leaving out any this chat has already seen.
+        """
+        if config.MEMORY_RECALL_LIMIT <= 0:
+            return ""
+        memories = await self.memory.aio.recall(text, limit=config.MEMORY_RECALL_LIMIT + len(session.recalled))
+        fresh = [m['text'] for m in memories if m['text'] not in session.recalled]
+        fresh = fresh[:config.MEMORY_RECALL_LIMIT]
+        if not fresh:
+            return ""
+        session.recalled.update(fresh)
+        logger.info(f"Recalled {len(fresh)} relevant memories")
+        return "RELEVANT MEMORY (earlier conversations and learned facts):\n" + "\n".join(fresh)
     
-    def process(self, text: str) -> str:
+    async def _handle_memory_command(self, text: str) -> Optional[str]:
         """
-        Process user input and return Jarvis response.
+        Handle simple memory commands without calling the model.
         
         Args:
             text: User input text from STT
             
         Returns:
-            str: Jarvis response text (for TTS)
+            str: Response text if the input was a memory command, otherwise None
         """
-        try:
-            # Manual memory command detection (temporary workaround)
-            text_lower = text.lower()
-            
-            # Handle "remember [location name] is [address]" / "save [location] as [address]"
-            if "remember" in text_lower or "save" in text_lower or "set" in text_lower:
-                # Try to extract location name and address
-                # Patterns: "remember work is 123 Main St", "save gym as Fitness Center", "set mom to 456 Oak Ave"
-                for pattern in [" is ", " as ", " to "]:
-                    if pattern in text:
-                        parts = text.split(pattern, 1)
-                        prefix = parts[0].lower()
-                        address = parts[1].strip().rstrip('.')
-                        
-                        # Only process if it looks like a location command
-                        # Check for location keywords or address-like content
-                        is_location_command = (
-                            "location" in prefix or 
-                            "address" in prefix or 
-                            "home" in prefix or
-                            any(keyword in address.lower() for keyword in ["street", "road", "avenue", "drive", "lane", "way", " st ", " rd ", " ave "]) or
-                            (len(address) > 15 and any(char.isdigit() for char in address))  # Address-like: long and has numbers
-                        )
-                        
-                        if not is_location_command:
-                            continue  # Skip - not a location command
-                        
-                        # Extract location name from prefix
-                        location_name = None
-                        if "remember" in prefix:
-                            location_name = prefix.replace("remember", "").replace("my", "").strip()
-                        elif "save" in prefix:
-                            location_name = prefix.replace("save", "").replace("my", "").strip()
-                        elif "set" in prefix:
-                            location_name = prefix.replace("set", "").replace("my", "").strip()
+        # Manual memory command detection (temporary workaround)
+        text_lower = text.lower()
+        
+        # Handle "remember [location name] is [address]" / "save [location] as [address]"
+        if "remember" in text_lower or "save" in text_lower or "set" in text_lower:
+            # Try to extract location name and address
+            # Patterns: "remember work is 123 Main St", "save gym as Fitness Center", "set mom to 456 Oak Ave"
+            for pattern in [" is ", " as ", " to "]:
+                if pattern in text:
+                    parts = text.split(pattern, 1)
+                    prefix = parts[0].lower()
+                    address = parts[1].strip().rstrip('.')
+                    
+                    # Only process if it looks like a location command
+                    # Check for location keywords or address-like content
+                    is_location_command = (
+                        "location" in prefix or 
+                        "address" in prefix or 
+                        "home" in prefix or
+                        any(keyword in address.lower() for keyword in ["street", "road", "avenue", "drive", "lane", "way", " st ", " rd ", " ave "]) or
+                        (len(address) > 15 and any(char.isdigit() for char in address))  # Address-like: long and has numbers
+                    )
+                    
+                    if not is_location_command:
+                        continue  # Skip - not a location command
+                    
+                    # Extract location name from prefix
+                    location_name = None
+                    if "remember" in prefix:
+                        location_name = prefix.replace("remember", "").replace("my", "").strip()
+                    elif "save" in prefix:
+                        location_name = prefix.replace("save", "").replace("my", "").strip()
+                    elif "set" in prefix:
+                        location_name = prefix.replace("set", "").replace("my", "").strip()
+                    
+                    if location_name:
+                        # Special handling for "home" vs other locations
+                        if "home" in location_name or "location" in location_name:
+                            pref_key = "home_location"
+                            display_name = "your home"
+                        else:
+                            # Remove words like "location", "address" from the name
+                            location_name = location_name.replace("location", "").replace("address", "").strip()
+                            pref_key = f"{location_name}_location"
+                            display_name = location_name
                         
-                        if location_name:
-                            # Special handling for "home" vs other locations
-                            if "home" in location_name or "location" in location_name:
-                                pref_key = "home_location"
-                                display_name = "your home"
-                            else:
-                                # Remove words like "location", "address" from the name
-                                location_name = location_name.replace("location", "").replace("address", "").strip()
-                                pref_key = f"{location_name}_location"
-                                display_name = location_name
-                            
-                            self.memory.set_preference(pref_key, address)
-                            return f"Understood, Sir. I've logged {display_name} as {address}."
-            
-            # Handle "what's my home" / "where do I live"
-            if (("what" in text_lower or "where" in text_lower) and 
-                ("home" in text_lower or "live" in text_lower)):
-                home = self.memory.get_preference("home_location")
-                if home:
-                    return f"Your home is in {home}, Sir."
+                        await self.memory.aio.set_preference(pref_key, address)
+                        return f"Understood, Sir. I've logged {display_name} as {address}."
+        
+        # Handle "what's my home" / "where do I live"
+        if (("what" in text_lower or "where" in text_lower) and 
+            ("home" in text_lower or "live" in text_lower)):
+            home = await self.memory.aio.get_preference("home_location")
+            if home:
+                return f"Your home is in {home}, Sir."
+        
+        return None
+    
+    async def _execute_tool(self, function_name: str, function_args: dict) -> str:
+        """
+        Execute a single tool call without blocking the event loop.
+        
+        Coroutine tools are awaited directly; legacy sync tools (blocking
+        `requests` calls) are offloaded to the tool executor.
+        
+        Args:
+            function_name: Name of the tool from the model's function call
+            function_args: Keyword arguments for the tool
             
-            # Build system prompt with current memory/preferences
-            system_prompt = self._build_system_prompt()
+        Returns:
+            str: "name: result" line to send back to the model
+        """
+        func = _get_function_map()[function_name]
+        try:
+            with span('tool', tool=function_name):
+                if asyncio.iscoroutinefunction(func):
+                    result = await func(**function_args)
+                else:
+                    # Carry the turn's trace context into the worker thread
+                    loop = asyncio.get_running_loop()
+                    context = contextvars.copy_context()
+                    result = await loop.run_in_executor(
+                        self._tool_executor, partial(context.run, func, **function_args)
+                    )
+            logger.info(f"Function result: {result}")
+            return f"{function_name}: {result}"
+        except Exception as e:
+            logger.error(f"Function execution error: {e}", exc_info=True)
+            return f"{function_name}: Error - {str(e)}"
+    
+    async def _execute_tools(self, function_calls: list) -> list:
+        """
+        Execute all function calls from one model response concurrently.
+        
+        Calls sharing an ordering key (writes to the same entity) run one
+        after another in the order given; everything else overlaps.
+        
+        Args:
+            function_calls: List of (function_name, function_args) tuples
             
-            # Send message
-            if not self.chat.history:
-                # First message includes system prompt
-                full_message = f"{system_prompt}\n\nUser: {text}"
-                logger.info(f"First message with system prompt")
+        Returns:
+            list: Result lines in the same order as function_calls
+        """
+        results = [None] * len(function_calls)
+        
+        chains = {}
+        for index, (function_name, function_args) in enumerate(function_calls):
+            key = _ordering_key(function_name, function_args)
+            chains.setdefault(key if key is not None else index, []).append(index)
+        
+        async def run_chain(indexes):
+            for index in indexes:
+                function_name, function_args = function_calls[index]
+                results[index] = await self._execute_tool(function_name, function_args)
+        
+        await asyncio.gather(*(run_chain(indexes) for indexes in chains.values()))
+        return results
+    
+    @staticmethod
+    def _fallback_response(combined_results: str) -> str:
+        """Build a spoken response from raw function results when the model fails twice."""
+        if "turn_on" in combined_results.lower() or "success" in combined_results.lower():
+            return "Done, Sir. I've executed those commands for you."
+        elif "not found" in combined_results.lower() or "error" in combined_results.lower():
+            # Try to extract the actual error message
+            if "Route not found" in combined_results:
+                return "I apologize, Sir, but I couldn't find a route for that location. Could you provide a more specific address or postcode?"
+            elif "not configured" in combined_results.lower():
+                return "I apologize, Sir, but that feature isn't currently configured."
             else:
-                # Subsequent messages don't need system prompt repeated
-                full_message = text
-                logger.info(f"User: {text}")
+                return f"I encountered an issue, Sir: {combined_results[:150]}"
+        else:
+            return f"I executed the commands. Results: {combined_results[:200]}"
+    
+    async def astream(self, text: str, conversation_id: Optional[str] = None,
+                      response: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """
+        Process user input and stream the Jarvis response as sentence-sized chunks.
+        
+        Each model round is streamed from Gemini; text is released a sentence at
+        a time as it arrives so TTS can start speaking before the reply is
+        complete.
+        
+        Args:
+            text: User input text from STT
+            conversation_id: Conversation to continue (defaults to a shared session)
+            response: If given, receives the final response text (what aprocess()
+                returns and what is saved to memory), which can differ from the
+                joined chunks when a function call or fallback replaced streamed text
             
-            response = self.chat.send_message(
-                full_message,
-                generation_config={"temperature": 0.7, "max_output_tokens": 1024}
-            )
+        Yields:
+            str: Response text chunks (for TTS)
+        """
+        async for chunk in self._traced_turn(text, conversation_id, response):
+            yield chunk
+    
+    async def _traced_turn(self, text: str, conversation_id: Optional[str],
+                           response: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Run _stream_turn inside a turn trace."""
+        start_turn_trace()
+        start = time.perf_counter()
+        try:
+            with span('turn'):
+                async for chunk in self._stream_turn(text, conversation_id, response):
+                    yield chunk
+        finally:
+            finish_turn_trace(time.perf_counter() - start)
+    
+    async def _stream_turn(self, text: str, conversation_id: Optional[str],
+                           response: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """
+        Run one conversation turn (see astream).
+        
+        Args:
+            text: User input text
+            conversation_id: Conversation to continue
+            response: If given, receives the final response text; it can differ from
+                the joined chunks when text streamed before a function call
+        """
+        if response is None:
+            response = []
+        try:
+            memory_response = await self._handle_memory_command(text)
+            if memory_response:
+                response[:] = [memory_response]
+                yield memory_response
+                return
             
-            # Loop through function calls until we get text
-            max_function_calls = 5  # Prevent infinite loops
-            function_call_count = 0
+            session = self.sessions.get(conversation_id)
             
-            while function_call_count < max_function_calls:
-                # Debug: Log response structure
-                logger.info(f"Response candidates: {len(response.candidates)}")
-                if not response.candidates:
-                    break
-                
-                candidate = response.candidates[0]
-                logger.info(f"Finish reason: {candidate.finish_reason}")
-                logger.info(f"Safety ratings: {candidate.safety_ratings}")
-                    
-                parts = candidate.content.parts
-                logger.info(f"Response parts: {len(parts)}")
+            # Turns within one conversation must not interleave their history
+            async with session.lock:
+                # Fold old turns into a summary so the payload stays within budget
+                self.history_compactor.compact(session, self.model.start_chat)
+                chat = session.chat
                 
-                # Check if any part is a function call - collect ALL function calls first
-                has_function_call = False
-                function_results = []
+                # Send message
+                if not chat.history:
+                    # First message carries the dynamic prompt (current preferences and context)
+                    system_prompt = await self._build_system_prompt()
+                    session.preamble = system_prompt
+                    # Exchanges already in RECENT CONTEXT need not be recalled again
+                    session.recalled = set(self._prompt_cache[2]) if self._prompt_cache else set()
+                    logger.info(f"First message with system prompt")
+                else:
+                    # Subsequent messages don't need system prompt repeated
+                    system_prompt = ""
+                    logger.info(f"User: {text}")
                 
-                # Import tools once at the start
-                from tools import (
-                    control_home_assistant,
-                    get_ha_state,
-                    search_ha_entities,
-                    get_person_location,
-                    get_appliance_status,
-                    get_weather,
-                    get_travel_time,
-                    google_search,
-                    add_calendar_event,
-                    list_calendar_events,
-                    create_location_reminder,
-                    play_music,
-                    save_preference,
-                    get_preference,
-                    delete_preference,
-                    get_current_time,
-                    query_radarr,
-                    add_to_radarr,
-                    query_sonarr,
-                    add_to_sonarr,
-                    query_qbittorrent,
-                    query_prowlarr,
-                    check_vpn_status,
-                    query_unifi_network,
-                    query_unifi_controller,
-                    analyze_camera,
-                )
+                # Relevant long-term memories ride along with the turn that needs them
+                recalled = await self._recall_memories(session, text)
+                preamble = [part for part in (system_prompt, recalled) if part]
+                message = "\n\n".join(preamble + [f"User: {text}"]) if preamble else text
                 
-                # Map function names to actual functions
-                function_map = {
-                    "control_home_assistant": control_home_assistant,
-                    "get_ha_state": get_ha_state,
-                    "search_ha_entities": search_ha_entities,
-                    "get_person_location": get_person_location,
-                    "get_appliance_status": get_appliance_status,
-                    "get_weather": get_weather,
-                    "get_travel_time": get_travel_time,
-                    "google_search": google_search,
-                    "add_calendar_event": add_calendar_event,
-                    "list_calendar_events": list_calendar_events,
-                    "create_location_reminder": create_location_reminder,
-                    "play_music": play_music,
-                    "save_preference": save_preference,
-                    "get_preference": get_preference,
-                    "delete_preference": delete_preference,
-                    "get_current_time": get_current_time,
-                    "query_radarr": query_radarr,
-                    "add_to_radarr": add_to_radarr,
-                    "query_sonarr": query_sonarr,
-                    "add_to_sonarr": add_to_sonarr,
-                    "query_qbittorrent": query_qbittorrent,
-                    "query_prowlarr": query_prowlarr,
-                    "check_vpn_status": check_vpn_status,
-                    "query_unifi_network": query_unifi_network,
-                    "query_unifi_controller": query_unifi_controller,
-                    "analyze_camera": analyze_camera,
-                }
+                generation_config = GENERATION_CONFIG
+                retry_message = None
+                combined_results = None
+                spoken = []
                 
-                for i, part in enumerate(parts):
-                    logger.info(f"Part {i}: has function_call = {hasattr(part, 'function_call')}")
-                    
-                    if hasattr(part, 'function_call'):
-                        logger.info(f"Part {i} function_call object: {part.function_call}")
-                        logger.info(f"Part {i} function_call bool: {bool(part.function_call)}")
-                    
-                    if hasattr(part, 'function_call') and part.function_call:
-                        has_function_call = True
-                        function_call_count += 1
-                        
-                        # Execute the function call
-                        function_name = part.function_call.name
-                        function_args = dict(part.function_call.args)
-                        
-                        logger.info(f"Function call {function_call_count}: {function_name}({function_args})")
-                        
-                        if function_name in function_map:
-                            try:
-                                # Call the function
-                                result = function_map[function_name](**function_args)
-                                logger.info(f"Function result: {result}")
-                                function_results.append(f"{function_name}: {result}")
-                                
-                            except Exception as e:
-                                logger.error(f"Function execution error: {e}", exc_info=True)
-                                function_results.append(f"{function_name}: Error - {str(e)}")
+                # Loop through function calls until we get text
+                function_call_count = 0
                 
-                # If we had function calls, send ALL results back together
-                if has_function_call and function_results:
-                    combined_results = "\n".join(function_results)
-                    logger.info(f"Sending {len(function_results)} function results back to model")
+                while True:
+                    can_call = function_call_count < MAX_FUNCTION_CALLS
+                    called = False
+                    function_calls = []
+                    chunker = SentenceChunker()
+                    round_spoken = 0
+                    # Sentences held back until the round looks text-only: a function
+                    # call can follow text in a later chunk, and that text must not be spoken
+                    held = []
+                    text_seen = False
+                    confirmed = False
                     
                     try:
-                        response = self.chat.send_message(
-                            f"Function results:\n{combined_results}",
-                            generation_config={"temperature": 0.7, "max_output_tokens": 1024}
-                        )
+                        with span('model_round') as clock:
+                            stream = await chat.send_message_async(
+                                message,
+                                generation_config=generation_config,
+                                stream=True
+                            )
+                            first_chunk = True
+                            async for chunk in stream:
+                                if first_chunk:
+                                    first_chunk = False
+                                    record_span('model_first_chunk', clock.elapsed())
+                                if not chunk.candidates:
+                                    continue
+                                
+                                # Collect ALL function calls first
+                                for part in chunk.candidates[0].content.parts:
+                                    if hasattr(part, 'function_call') and part.function_call:
+                                        called = True
+                                        if not can_call:
+                                            continue
+                                        function_call_count += 1
+                                        function_name = part.function_call.name
+                                        function_args = dict(part.function_call.args)
+                                        logger.info(f"Function call {function_call_count}: {function_name}({function_args})")
+                                        if function_name in _get_function_map():
+                                            function_calls.append((function_name, function_args))
+                                
+                                if called:
+                                    if round_spoken:
+                                        # Too late to unsay it, but keep it out of the saved response
+                                        del spoken[-round_spoken:]
+                                        round_spoken = 0
+                                    held = []
+                                    continue
+                                
+                                # A chunk after the first text with no function call: speak as it arrives
+                                confirmed = confirmed or text_seen
+                                chunk_text = content_text(chunk.candidates[0].content)
+                                text_seen = text_seen or bool(chunk_text)
+                                held.extend(chunker.feed(chunk_text))
+                                if confirmed:
+                                    for sentence in held:
+                                        spoken.append(sentence)
+                                        round_spoken += 1
+                                        # The consumer's pace (TTS, SSE writes) is not model time
+                                        with clock.paused():
+                                            yield sentence
+                                    held = []
                     except Exception as model_error:
+                        if retry_message is None or round_spoken:
+                            if combined_results is not None and not round_spoken:
+                                logger.error(f"Retry also failed: {model_error}")
+                                # Return a helpful response based on the function results
+                                fallback = self._fallback_response(combined_results)
+                                response[:] = [fallback]
+                                yield fallback
+                                return
+                            raise
                         # Handle malformed response errors - retry with simpler format
                         logger.warning(f"Model error on function result, retrying: {model_error}")
-                        try:
-                            # Reset chat and try with direct instruction
-                            response = self.chat.send_message(
-                                f"Based on these results, provide a natural response: {combined_results}",
-                                generation_config={"temperature": 0.5, "max_output_tokens": 200}
-                            )
-                        except Exception as retry_error:
-                            logger.error(f"Retry also failed: {retry_error}")
-                            # Return a helpful response based on the function results
-                            if "turn_on" in combined_results.lower() or "success" in combined_results.lower():
-                                return "Done, Sir. I've executed those commands for you."
-                            elif "not found" in combined_results.lower() or "error" in combined_results.lower():
-                                # Try to extract the actual error message
-                                if "Route not found" in combined_results:
-                                    return "I apologize, Sir, but I couldn't find a route for that location. Could you provide a more specific address or postcode?"
-                                elif "not configured" in combined_results.lower():
-                                    return "I apologize, Sir, but that feature isn't currently configured."
-                                else:
-                                    return f"I encountered an issue, Sir: {combined_results[:150]}"
-                            else:
-                                return f"I executed the commands. Results: {combined_results[:200]}"
+                        message, retry_message = retry_message, None
+                        generation_config = RETRY_GENERATION_CONFIG
+                        continue
                     
-                    continue  # Continue loop to check new response
-                
-                # If no function calls, we have text - exit loop
-                if not has_function_call:
-                    break
+                    # If no function calls, we have text - exit loop
+                    if not called:
+                        rest = chunker.flush()
+                        for sentence in held + ([rest] if rest else []):
+                            spoken.append(sentence)
+                            yield sentence
+                        break
+                    
+                    if not function_calls:
+                        # Out of function calls (or only unknown ones) and still no text
+                        logger.error(f"No text response after {function_call_count} function calls")
+                        break
+                    
+                    function_results = await self._execute_tools(function_calls)
+                    
+                    # Send ALL results back together
+                    combined_results = "\n".join(function_results)
+                    logger.info(f"Sending {len(function_results)} function results back to model")
+                    message = f"Function results:\n{combined_results}"
+                    retry_message = f"Based on these results, provide a natural response: {combined_results}"
+                    generation_config = GENERATION_CONFIG
             
             # Get the final text response
-            try:
-                response_text = response.text
-            except (ValueError, AttributeError) as e:
-                # If still no text after max calls, log and return error
-                logger.error(f"No text response after {function_call_count} function calls: {e}")
+            response_text = "".join(spoken)
+            if not response_text.strip():
                 response_text = "I apologize, Sir. I encountered an issue formulating my response."
+                yield response_text
             
+            response[:] = [response_text]
             logger.info(f"Jarvis: {response_text}")
             
             # Save conversation to memory for context
@@ -417,21 +661,56 @@ UNIFI NETWORK QUERIES:
                 'error', 'failed', 'could not', 'unable to', 'issue', 'problem', 
                 'apolog', 'sorry', 'encountered an', 'cannot'
             ])
-            self.memory.save_context(text, response_text, is_error=is_error)
-            
-            return response_text
+            await self.memory.aio.save_context(text, response_text, is_error=is_error)
+            # Already in this chat's history, so never recalled into it
+            session.recalled.add(format_exchange(text, response_text))
         
         except Exception as e:
             # Check if this is a safety block error
             error_str = str(e)
             if "Finish reason: 2" in error_str or "ResponseValidationError" in str(type(e)):
                 logger.error(f"Safety block detected: {e}")
-                return "I apologize, Sir, but that request triggered a safety filter. This sometimes happens with complex multi-step queries. Try breaking it into simpler parts - for example, ask for each destination separately."
+                response[:] = ["I apologize, Sir, but that request triggered a safety filter. This sometimes happens with complex multi-step queries. Try breaking it into simpler parts - for example, ask for each destination separately."]
+                yield response[0]
+                return
             
             logger.error(f"Vertex AI error: {e}", exc_info=True)
-            return f"I encountered an error processing that, Sir. {str(e)}"
+            response[:] = [f"I encountered an error processing that, Sir. {str(e)}"]
+            yield response[0]
+    
+    async def aprocess(self, text: str, conversation_id: Optional[str] = None) -> str:
+        """
+        Process user input and return Jarvis response without blocking the event loop.
+        
+        Args:
+            text: User input text from STT
+            conversation_id: Conversation to continue (defaults to a shared session)
+            
+        Returns:
+            str: Jarvis response text (for TTS)
+        """
+        response: List[str] = []
+        async for _ in self._traced_turn(text, conversation_id, response):
+            pass
+        return "".join(response)
+    
+    def process(self, text: str, conversation_id: Optional[str] = None) -> str:
+        """
+        Synchronous wrapper around aprocess() for scripts and one-off calls.
+        
+        Do not call this from inside a running event loop - servers should
+        await aprocess() instead.
+        
+        Args:
+            text: User input text from STT
+            conversation_id: Conversation to continue (defaults to a shared session)
+            
+        Returns:
+            str: Jarvis response text (for TTS)
+        """
+        return asyncio.run(self.aprocess(text, conversation_id))
     
-    def reset_conversation(self):
-        """Reset conversation history (but keep memory)."""
-        self.chat = self.model.start_chat()
-        logger.info("Conversation history reset")
+    def reset_conversation(self, conversation_id: Optional[str] = None):
+        """Reset conversation history (but keep memory). Resets all conversations if no ID is given."""
+        self.sessions.reset(conversation_id)
+        logger.info(f"Conversation history reset ({conversation_id or 'all conversations'})")
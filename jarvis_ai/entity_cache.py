@@ -0,0 +1,256 @@
+"""
+In-process cache of Home Assistant entity states.
+Loaded once over REST, then kept current by the HA WebSocket `state_changed`
+stream, with periodic REST refreshes whenever the WebSocket is down.
+
+Entity lookups and searches read from here instead of downloading /api/states.
+Reported state values still follow the "always query live" rule: they come from
+the cache only while it is fed by live push events, otherwise from REST.
+"""
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import aiohttp
+
+import config_helper as config
+from entity_index import EntitySearchIndex
+from ha_client import get_ha_client
+
+logger = logging.getLogger(__name__)
+
+# Reconnect backoff bounds for the WebSocket (seconds); the cache is refreshed
+# over REST before each attempt, so this also bounds staleness while it is down
+RECONNECT_MIN_DELAY = 2
+RECONNECT_MAX_DELAY = 60
+
+
+class EntityStateCache:
+    """Thread-safe entity_id -> state dict cache fed by the HA WebSocket API."""
+
+    def __init__(self):
+        self._states: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._live = False
+        # Bumped whenever entities are added, removed or renamed (not on state changes)
+        self.registry_version = 0
+        self.index = EntitySearchIndex()
+
+    # ===== READS =====
+
+    @property
+    def is_live(self) -> bool:
+        """True while the WebSocket subscription is delivering state changes."""
+        return self._live
+
+    def ensure_loaded(self):
+        """Load all states over REST if the cache has never been filled."""
+        if not self._loaded:
+            self.load()
+
+    def get_state(self, entity_id: str, fresh: bool = False) -> Optional[dict]:
+        """
+        Get one entity's state dict.
+
+        Args:
+            entity_id: Entity to look up
+            fresh: The caller reports this state to the user; if the cache is not
+                live, read it from HA over REST instead (and update the cache)
+
+        Returns:
+            State dict as returned by /api/states, or None if the entity does not exist
+        """
+        if fresh and not self._live:
+            response = get_ha_client().get(f"/api/states/{entity_id}")
+            if response.status_code == 404:
+                self._remove(entity_id)
+                return None
+            response.raise_for_status()
+            state = response.json()
+            self._upsert(entity_id, state)
+            return state
+
+        self.ensure_loaded()
+        return self._states.get(entity_id)
+
+    def get_states(self, fresh: bool = False) -> List[dict]:
+        """
+        Get a snapshot of all entity states.
+
+        Args:
+            fresh: The caller reports these states to the user; if the cache is
+                not live, reload from HA over REST first
+        """
+        if fresh and not self._live:
+            self.load()
+        else:
+            self.ensure_loaded()
+        with self._lock:
+            return list(self._states.values())
+
+    def get_domain_states(self, domain: str) -> List[dict]:
+        """Get a snapshot of all entity states in one domain (from the index's domain bucket)."""
+        self.ensure_loaded()
+        entity_ids = self.index.domain_entities(domain)
+        with self._lock:
+            return [self._states[eid] for eid in entity_ids if eid in self._states]
+    
+    def find_entity(self, text: str, domain: str) -> Optional[dict]:
+        """State of the first entity in a domain whose id or friendly name contains text."""
+        self.ensure_loaded()
+        entity_id = self.index.find(text, domain)
+        return self.get_state(entity_id) if entity_id else None
+
+    def search(self, query: str) -> List[dict]:
+        """Score entities against a search query (see EntitySearchIndex.search)."""
+        self.ensure_loaded()
+        return self.index.search(query)
+
+    def __contains__(self, entity_id: str) -> bool:
+        self.ensure_loaded()
+        return entity_id in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    # ===== WRITES =====
+
+    def load(self):
+        """Replace the cache with a full /api/states download."""
+        response = get_ha_client().get("/api/states")
+        response.raise_for_status()
+        states = {s['entity_id']: s for s in response.json()}
+        with self._lock:
+            old_names = {eid: _friendly_name(s) for eid, s in self._states.items()}
+            new_names = {eid: _friendly_name(s) for eid, s in states.items()}
+            self._states = states
+            self._loaded = True
+            if old_names != new_names:
+                self.registry_version += 1
+                self.index.rebuild(list(states.values()))
+        logger.info(f"Entity cache loaded {len(states)} entities")
+
+    def _upsert(self, entity_id: str, state: dict):
+        """Insert or update one entity's state."""
+        with self._lock:
+            old = self._states.get(entity_id)
+            self._states[entity_id] = state
+            if old is None or _friendly_name(old) != _friendly_name(state):
+                self.registry_version += 1
+                self.index.upsert(state)
+
+    def _remove(self, entity_id: str):
+        """Drop an entity that no longer exists."""
+        with self._lock:
+            if self._states.pop(entity_id, None) is not None:
+                self.registry_version += 1
+                self.index.remove(entity_id)
+
+    def apply_state_changed(self, data: dict):
+        """Apply the data of a `state_changed` event."""
+        entity_id = data.get('entity_id')
+        if not entity_id:
+            return
+        new_state = data.get('new_state')
+        if new_state is None:
+            self._remove(entity_id)
+        else:
+            self._upsert(entity_id, new_state)
+
+    # ===== WEBSOCKET =====
+
+    def _websocket_url(self) -> str:
+        """Derive the WebSocket API URL from the HA REST URL."""
+        base = config.HA_URL.rstrip("/")
+        if base.startswith("https://"):
+            base = "wss://" + base[len("https://"):]
+        elif base.startswith("http://"):
+            base = "ws://" + base[len("http://"):]
+        return f"{base}/websocket"
+
+    async def _rest_refresh(self):
+        """Reload over REST without blocking the event loop."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        except Exception as e:
+            logger.warning(f"Entity cache REST refresh failed: {e}")
+
+    async def _subscribe(self, session: aiohttp.ClientSession):
+        """Connect, authenticate and stream state_changed events until disconnected."""
+        async with session.ws_connect(self._websocket_url(), heartbeat=30, max_msg_size=0) as ws:
+            message = await ws.receive_json()
+            if message.get('type') == 'auth_required':
+                await ws.send_json({'type': 'auth', 'access_token': config.HA_TOKEN})
+                message = await ws.receive_json()
+            if message.get('type') != 'auth_ok':
+                raise ConnectionError(f"WebSocket authentication failed: {message.get('message', message)}")
+
+            await ws.send_json({'id': 1, 'type': 'subscribe_events', 'event_type': 'state_changed'})
+            result = await ws.receive_json()
+            if not result.get('success'):
+                raise ConnectionError(f"state_changed subscription failed: {result}")
+
+            # Resync after subscribing so nothing missed while disconnected is lost
+            await self._rest_refresh()
+            self._live = True
+            logger.info("Entity cache subscribed to Home Assistant state changes")
+
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                payload = msg.json()
+                if payload.get('type') == 'event':
+                    self.apply_state_changed(payload.get('event', {}).get('data', {}))
+
+    async def run(self):
+        """
+        Keep the cache current for the lifetime of the add-on.
+
+        Streams state changes over the WebSocket; while it is down the cache is
+        refreshed over REST before every reconnect attempt (at most
+        RECONNECT_MAX_DELAY seconds apart).
+        """
+        if not config.HA_URL or not config.HA_TOKEN:
+            logger.warning("Entity cache disabled: Home Assistant URL or token not configured")
+            return
+
+        await self._rest_refresh()
+        delay = RECONNECT_MIN_DELAY
+
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    await self._subscribe(session)
+                    delay = RECONNECT_MIN_DELAY
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Entity cache WebSocket error: {e}")
+                finally:
+                    self._live = False
+
+                # Fall back to a REST refresh before each reconnect attempt
+                await asyncio.sleep(delay)
+                await self._rest_refresh()
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+def _friendly_name(state: dict) -> str:
+    """Friendly name of a state dict."""
+    return state.get('attributes', {}).get('friendly_name', '')
+
+
+_cache: Optional[EntityStateCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_entity_cache() -> EntityStateCache:
+    """Get the process-wide entity state cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EntityStateCache()
+    return _cache
@@ -0,0 +1,240 @@
+"""
+Inverted index for Home Assistant entity search.
+Maintained incrementally by the entity state cache as entities are added,
+removed or renamed, so a search only scores the entities that can match
+instead of re-lowercasing and rescanning every entity per query.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+# Longest character n-gram indexed; any query token up to this length is an
+# exact posting lookup, longer tokens intersect their n-grams and are verified
+NGRAM_SIZE = 3
+
+# Query keywords that boost entities of a domain
+DOMAIN_KEYWORDS = {
+    'camera': 'camera',
+    'light': 'light',
+    'switch': 'switch',
+    'sensor': 'sensor',
+    'climate': 'climate',
+}
+DOMAIN_BOOST = 50
+
+
+def _ngrams(text: str) -> Set[str]:
+    """All substrings of text up to NGRAM_SIZE characters, skipping whitespace."""
+    grams = set()
+    for word in text.split():
+        for size in range(1, NGRAM_SIZE + 1):
+            for i in range(len(word) - size + 1):
+                grams.add(word[i:i + size])
+    return grams
+
+
+class _IndexedEntity:
+    """Pre-lowercased search fields for one entity."""
+
+    __slots__ = ('entity_id', 'display_name', 'entity_id_lower', 'friendly_name',
+                 'search_text', 'domain', 'seq', 'grams')
+
+    def __init__(self, entity_id: str, display_name: Optional[str], seq: int):
+        self.entity_id = entity_id
+        self.display_name = display_name
+        self.entity_id_lower = entity_id.lower()
+        self.friendly_name = (display_name or '').lower()
+        self.search_text = f"{self.entity_id_lower} {self.friendly_name}"
+        self.domain = self.entity_id_lower.split('.')[0]
+        self.seq = seq
+        self.grams = _ngrams(self.search_text)
+
+
+class EntitySearchIndex:
+    """
+    Character n-gram and domain index over entity ids and friendly names.
+
+    Scores exactly like the original linear scan: 100 exact friendly name,
+    80 friendly name contains the query, 60 friendly name contains every token,
+    40 entity_id contains the query, 20 entity_id contains every token,
+    10 id + name contain every token, plus 50 for a domain keyword match.
+    """
+
+    def __init__(self):
+        self._entities: Dict[str, _IndexedEntity] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._domains: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        # Preserves the cache's iteration order so score ties sort the same way
+        self._next_seq = 0
+
+    # ===== MAINTENANCE =====
+
+    def rebuild(self, states: List[dict]):
+        """Replace the index with the given state dicts."""
+        with self._lock:
+            self._entities.clear()
+            self._postings.clear()
+            self._domains.clear()
+            self._next_seq = 0
+            for state in states:
+                self._add(state['entity_id'], _display_name(state))
+
+    def upsert(self, state: dict):
+        """Index a new entity or re-index a renamed one."""
+        entity_id = state['entity_id']
+        display_name = _display_name(state)
+        with self._lock:
+            existing = self._entities.get(entity_id)
+            if existing is not None:
+                if existing.display_name == display_name:
+                    return
+                self._discard(existing)
+                self._add(entity_id, display_name, seq=existing.seq)
+            else:
+                self._add(entity_id, display_name)
+
+    def remove(self, entity_id: str):
+        """Drop an entity from the index."""
+        with self._lock:
+            existing = self._entities.pop(entity_id, None)
+            if existing is not None:
+                self._discard(existing)
+
+    def _add(self, entity_id: str, display_name: Optional[str], seq: Optional[int] = None):
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+        entry = _IndexedEntity(entity_id, display_name, seq)
+        self._entities[entity_id] = entry
+        for gram in entry.grams:
+            self._postings[gram].add(entity_id)
+        self._domains[entry.domain].add(entity_id)
+
+    def _discard(self, entry: _IndexedEntity):
+        for gram in entry.grams:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(entry.entity_id)
+                if not postings:
+                    del self._postings[gram]
+        bucket = self._domains.get(entry.domain)
+        if bucket is not None:
+            bucket.discard(entry.entity_id)
+            if not bucket:
+                del self._domains[entry.domain]
+
+    # ===== QUERIES =====
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def domain_count(self, domain: str) -> int:
+        """Number of indexed entities in a domain."""
+        return len(self._domains.get(domain, ()))
+
+    def domain_entities(self, domain: str) -> List[str]:
+        """Entity ids in a domain, in cache order."""
+        with self._lock:
+            entries = [self._entities[eid] for eid in self._domains.get(domain, ())]
+        return [entry.entity_id for entry in sorted(entries, key=lambda e: e.seq)]
+
+    def find(self, text: str, domain: str) -> Optional[str]:
+        """
+        First entity (in cache order) of a domain whose entity_id or friendly
+        name contains text, case-insensitively.
+        """
+        text = text.lower()
+        with self._lock:
+            candidates = set(self._domains.get(domain, ()))
+            for word in set(text.split()):
+                if not candidates:
+                    break
+                candidates &= self._containing(word)
+            entries = [self._entities[eid] for eid in candidates]
+        matches = [entry for entry in entries
+                   if text in entry.entity_id_lower or text in entry.friendly_name]
+        return min(matches, key=lambda e: e.seq).entity_id if matches else None
+
+    def _containing(self, token: str) -> Set[str]:
+        """Entity ids whose search text contains token."""
+        if len(token) <= NGRAM_SIZE:
+            return set(self._postings.get(token, ()))
+
+        grams = [token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)]
+        postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return candidates
+        return {eid for eid in candidates if token in self._entities[eid].search_text}
+
+    def search(self, query: str) -> List[dict]:
+        """
+        Score entities against a query.
+
+        Args:
+            query: Search text; tokens are lowercased but whole-query matches use
+                it as given, like the original scan
+
+        Returns:
+            List of {'entity_id', 'friendly_name', 'score'} sorted by score
+        """
+        query_tokens = query.lower().split()
+
+        with self._lock:
+            if query_tokens:
+                # Every text tier requires all tokens somewhere in id + name
+                candidates = None
+                for token in sorted(set(query_tokens), key=len, reverse=True):
+                    matches = self._containing(token)
+                    candidates = matches if candidates is None else candidates & matches
+                    if not candidates:
+                        break
+            else:
+                candidates = set(self._entities)
+
+            boosted_domains = {domain for keyword, domain in DOMAIN_KEYWORDS.items()
+                               if keyword in query_tokens}
+            for domain in boosted_domains:
+                candidates |= self._domains.get(domain, set())
+
+            entries = sorted((self._entities[eid] for eid in candidates), key=lambda e: e.seq)
+
+        results = []
+        for entry in entries:
+            friendly_name = entry.friendly_name
+            entity_id = entry.entity_id_lower
+
+            score = 0
+            if query == friendly_name:
+                score = 100
+            elif query in friendly_name:
+                score = 80
+            elif all(token in friendly_name for token in query_tokens):
+                score = 60
+            elif query in entity_id:
+                score = 40
+            elif all(token in entity_id for token in query_tokens):
+                score = 20
+            elif all(token in entry.search_text for token in query_tokens):
+                score = 10
+
+            if entry.domain in boosted_domains:
+                score += DOMAIN_BOOST
+
+            if score > 0:
+                results.append({
+                    'entity_id': entry.entity_id,
+                    'friendly_name': entry.display_name if entry.display_name is not None else 'Unknown',
+                    'score': score
+                })
+
+        results.sort(key=lambda x: x['score'], reverse=True)
+        return results
+
+
+def _display_name(state: dict) -> Optional[str]:
+    """Friendly name as shown in search results (None if the entity has none)."""
+    return state.get('attributes', {}).get('friendly_name')
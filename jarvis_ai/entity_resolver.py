@@ -0,0 +1,251 @@
+"""
+Local fuzzy resolution of entity ids the model got wrong.
+Ranks the cached entity set by token and edit-distance similarity (after
+synonym and domain alias normalisation), and memoises resolutions until the
+entity registry changes. The only network call is confirming a cache miss
+while the WebSocket feed is down.
+"""
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from entity_cache import EntityStateCache, get_entity_cache
+
+logger = logging.getLogger(__name__)
+
+# Domains a control request may fall back to, besides the requested one
+TARGET_DOMAINS = ('light', 'switch', 'input_boolean')
+
+# Domain names the model tends to invent, mapped to the real HA domain
+DOMAIN_ALIASES = {
+    'lights': 'light',
+    'lamp': 'light',
+    'switches': 'switch',
+    'plug': 'switch',
+    'socket': 'switch',
+    'thermostat': 'climate',
+    'fans': 'fan',
+    'locks': 'lock',
+    'covers': 'cover',
+    'blind': 'cover',
+    'blinds': 'cover',
+}
+
+# Words normalised to one form on both sides before comparing names
+WORD_SYNONYMS = {
+    'lights': 'light',
+    'lamp': 'light',
+    'lamps': 'light',
+    'bulb': 'light',
+    'bulbs': 'light',
+    'lounge': 'living',
+    'sitting': 'living',
+    'television': 'tv',
+    'telly': 'tv',
+    'socket': 'plug',
+    'outlet': 'plug',
+    'aircon': 'ac',
+    'thermostat': 'climate',
+    'blinds': 'blind',
+    'shades': 'blind',
+    'shade': 'blind',
+}
+
+# Words that say what kind of device it is rather than which one; ignored
+# when comparing names unless they are all the request has
+GENERIC_WORDS = {'light', 'switch', 'sensor', 'the'}
+
+# Minimum similarity (0-1) for a fuzzy match to be accepted
+MIN_SIMILARITY = 0.7
+
+# Bonus for candidates in the same domain as the requested entity_id
+SAME_DOMAIN_BONUS = 0.05
+
+# Resolutions remembered per registry version
+MAX_MEMO_ENTRIES = 1024
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercased word tokens with synonyms normalised."""
+    return [WORD_SYNONYMS.get(word, word) for word in _WORD_RE.findall(text.lower())]
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def _similarity(a: str, b: str) -> float:
+    """Edit-distance similarity in 0-1 (1 is identical)."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return 1.0 - _edit_distance(a, b) / max(len(a), len(b))
+
+
+def _specific(tokens: List[str]) -> List[str]:
+    """Drop generic device words, unless nothing else is left."""
+    specific = [token for token in tokens if token not in GENERIC_WORDS]
+    return specific or tokens
+
+
+def _token_similarity(query_tokens: List[str], candidate_tokens: List[str]) -> float:
+    """Average over query tokens of their best match among the candidate's tokens."""
+    if not query_tokens or not candidate_tokens:
+        return 0.0
+    total = 0.0
+    for query_token in query_tokens:
+        best = 0.0
+        for candidate_token in candidate_tokens:
+            if query_token == candidate_token:
+                best = 1.0
+                break
+            score = _similarity(query_token, candidate_token)
+            # Partial words ("kitch" / "kitchen") count as a strong match
+            shorter = min(len(query_token), len(candidate_token))
+            if shorter >= 3 and (query_token in candidate_token or candidate_token in query_token):
+                score = max(score, 0.9)
+            best = max(best, score)
+        total += best
+    return total / len(query_tokens)
+
+
+def _is_excluded(requested_domain: str, entity_id: str, friendly_name: str) -> bool:
+    """Exclusion Rule: If looking for a light, don't fallback to a Plug/Socket."""
+    entity_id = entity_id.lower()
+    friendly_name = friendly_name.lower()
+    return requested_domain == "light" and (
+        "plug" in friendly_name or "plug" in entity_id or "socket" in friendly_name
+    )
+
+
+class EntityResolver:
+    """Ranks real entities against a requested entity_id using only the local cache."""
+
+    def __init__(self, cache: EntityStateCache):
+        """
+        Args:
+            cache: Entity state cache to resolve against
+        """
+        self.cache = cache
+        self._memo: Dict[str, Tuple[str, bool]] = {}
+        self._memo_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def rank(self, entity_id: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank candidate entities for a requested entity_id.
+
+        Args:
+            entity_id: Requested (possibly wrong) entity_id
+            limit: Maximum number of candidates returned
+
+        Returns:
+            List of (entity_id, similarity) best first, all above MIN_SIMILARITY
+        """
+        requested_domain, _, object_id = entity_id.lower().partition(".")
+        if not object_id:
+            requested_domain, object_id = "", requested_domain
+        requested_domain = DOMAIN_ALIASES.get(requested_domain, requested_domain)
+
+        query_tokens = _specific(_tokens(object_id))
+        if not query_tokens:
+            return []
+        query_text = " ".join(query_tokens)
+
+        domains = set(TARGET_DOMAINS)
+        if requested_domain:
+            domains.add(requested_domain)
+
+        ranked = []
+        for domain in domains:
+            for state in self.cache.get_domain_states(domain):
+                candidate_id = state['entity_id']
+                friendly_name = state.get('attributes', {}).get('friendly_name', '') or ''
+                if _is_excluded(requested_domain, candidate_id, friendly_name):
+                    continue
+
+                id_tokens = _specific(_tokens(candidate_id.split(".", 1)[-1]))
+                name_tokens = _specific(_tokens(friendly_name))
+                score = max(
+                    _token_similarity(query_tokens, id_tokens + name_tokens),
+                    _similarity(query_text, " ".join(id_tokens)),
+                    _similarity(query_text, " ".join(name_tokens)),
+                )
+                if score < MIN_SIMILARITY:
+                    continue
+                if domain == requested_domain:
+                    score += SAME_DOMAIN_BONUS
+                ranked.append((candidate_id, score))
+
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def resolve(self, entity_id: str) -> Tuple[str, bool]:
+        """
+        Resolve a potentially incorrect entity_id to a real one.
+
+        While the cache is not fed by the WebSocket it can miss entities added
+        since the last REST refresh, so a miss is confirmed with a live lookup
+        before anything is fuzzy-matched (a command must never go to another
+        device just because the cache is behind).
+
+        Returns:
+            (resolved_entity_id, was_resolved)
+
+        Raises:
+            requests.RequestException: If the live lookup fails
+        """
+        if entity_id in self.cache:
+            return entity_id, False
+        if not self.cache.is_live and self.cache.get_state(entity_id, fresh=True) is not None:
+            return entity_id, False
+
+        with self._lock:
+            if self._memo_version != self.cache.registry_version:
+                self._memo.clear()
+                self._memo_version = self.cache.registry_version
+            cached = self._memo.get(entity_id)
+        if cached is not None:
+            return cached
+
+        ranked = self.rank(entity_id, limit=1)
+        result = (ranked[0][0], True) if ranked else (entity_id, False)
+        if ranked:
+            logger.info(f"Resolved '{entity_id}' to '{ranked[0][0]}' (similarity {ranked[0][1]:.2f})")
+
+        with self._lock:
+            if len(self._memo) >= MAX_MEMO_ENTRIES:
+                self._memo.clear()
+            self._memo[entity_id] = result
+        return result
+
+
+_resolver: Optional[EntityResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_entity_resolver() -> EntityResolver:
+    """Get the process-wide entity resolver."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = EntityResolver(get_entity_cache())
+    return _resolver
@@ -0,0 +1,101 @@
+"""
+Shared HTTP client for the Home Assistant REST API.
+One pooled keep-alive session with shared auth headers, default timeouts and
+retry with backoff, used by every tool instead of ad-hoc requests.get/post calls.
+"""
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config_helper as config
+
+logger = logging.getLogger(__name__)
+
+# Default timeout (seconds) for HA calls that don't pass their own
+DEFAULT_TIMEOUT = 10
+
+
+class HomeAssistantClient:
+    """Pooled, authenticated session for the Home Assistant REST API."""
+
+    def __init__(self, base_url: str, token: str, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = 3, backoff_factor: float = 0.3, pool_maxsize: int = 10):
+        """
+        Args:
+            base_url: Home Assistant URL (e.g. http://supervisor/core)
+            token: Long-lived or supervisor token
+            timeout: Default request timeout in seconds
+            retries: Retries for connection errors and 502/503/504 responses
+            backoff_factor: Exponential backoff factor between retries
+            pool_maxsize: Keep-alive connections kept open to HA
+        """
+        self.base_url = (base_url or "").rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        })
+
+        # Only idempotent methods are retried on bad responses; connection
+        # failures are retried for every method since nothing reached HA
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def configured(self) -> bool:
+        """True if both URL and token are set."""
+        return bool(self.base_url and self.token)
+
+    def url(self, path: str) -> str:
+        """Build a full URL from an API path like /api/states."""
+        return f"{self.base_url}{path}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request to HA, applying the default timeout."""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        """GET an HA API path."""
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        """POST to an HA API path."""
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+
+_client: Optional[HomeAssistantClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ha_client() -> HomeAssistantClient:
+    """Get the process-wide Home Assistant client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HomeAssistantClient(config.HA_URL, config.HA_TOKEN)
+                logger.info(f"Home Assistant client ready for {config.HA_URL}")
+    return _client
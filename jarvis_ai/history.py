@@ -0,0 +1,162 @@
+"""
+Chat history compaction for Jarvis.
+Keeps the last few exchanges verbatim and folds older turns (including bulky
+"Function results:" messages) into a short rolling summary, so the payload sent
+to Gemini each turn stays flat no matter how long the add-on has been running.
+"""
+import logging
+from typing import List
+
+from vertexai.generative_models import Content, Part
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate used for budgeting (Gemini averages ~4 chars per token)
+CHARS_PER_TOKEN = 4
+
+# Messages Jarvis sends on the user's behalf during function calling
+_TOOL_RESULT_PREFIXES = ("Function results:", "Based on these results")
+
+SUMMARY_HEADER = "EARLIER CONVERSATION (summary):"
+SUMMARY_ACK = "Understood, Sir."
+
+
+def content_text(content) -> str:
+    """Join the text parts of a Content, ignoring function call parts."""
+    texts = []
+    for part in content.parts:
+        try:
+            if part.text:
+                texts.append(part.text)
+        except (AttributeError, ValueError):
+            continue
+    return "".join(texts)
+
+
+def _function_names(content) -> List[str]:
+    """Names of the functions called in a model Content."""
+    names = []
+    for part in content.parts:
+        function_call = getattr(part, "function_call", None)
+        if function_call and getattr(function_call, "name", None):
+            names.append(function_call.name)
+    return names
+
+
+def _shorten(text: str, limit: int) -> str:
+    """Collapse whitespace and truncate text for the summary."""
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class HistoryCompactor:
+    """Token-budgeted history compaction with a rolling summary."""
+
+    def __init__(self, token_budget: int = 4000, keep_exchanges: int = 3, summary_max_chars: int = 2000):
+        """
+        Args:
+            token_budget: Estimated tokens of history allowed before compacting
+            keep_exchanges: Most recent exchanges kept verbatim
+            summary_max_chars: Size cap for the rolling summary (oldest lines dropped first)
+        """
+        self.token_budget = token_budget
+        self.keep_exchanges = max(1, keep_exchanges)
+        self.summary_max_chars = summary_max_chars
+
+    @staticmethod
+    def estimate_tokens(history) -> int:
+        """Estimate the token size of a chat history."""
+        return sum(len(content_text(content)) for content in history) // CHARS_PER_TOKEN
+
+    @staticmethod
+    def _is_user_turn(content) -> bool:
+        """True for a real user message (not a function results message)."""
+        return content.role == "user" and not content_text(content).startswith(_TOOL_RESULT_PREFIXES)
+
+    def _split_exchanges(self, history) -> List[list]:
+        """Group history into exchanges, each starting at a real user message."""
+        exchanges = []
+        for content in history:
+            if self._is_user_turn(content) or not exchanges:
+                exchanges.append([content])
+            else:
+                exchanges[-1].append(content)
+        return exchanges
+
+    @staticmethod
+    def _summarise_exchange(exchange: list) -> str:
+        """One summary line for an exchange: what was asked, which tools ran, what was answered."""
+        user_text = content_text(exchange[0])
+        # The opening message carries the system prompt before the user's words
+        if "\n\nUser: " in user_text:
+            user_text = user_text.rsplit("\n\nUser: ", 1)[1]
+
+        tools_used = []
+        answer = ""
+        for content in exchange[1:]:
+            if content.role == "model":
+                tools_used.extend(_function_names(content))
+                text = content_text(content)
+                if text:
+                    answer = text
+
+        line = f"- User: {_shorten(user_text, 120)}"
+        if tools_used:
+            line += f" | Tools: {', '.join(dict.fromkeys(tools_used))}"
+        if answer:
+            line += f" | You: {_shorten(answer, 160)}"
+        return line
+
+    def _merge_summary(self, summary: str, new_lines: List[str]) -> str:
+        """Append new lines to the rolling summary, dropping the oldest past the size cap."""
+        lines = [line for line in summary.splitlines() if line] + new_lines
+        while len(lines) > 1 and len("\n".join(lines)) > self.summary_max_chars:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def compact(self, session, chat_factory) -> bool:
+        """
+        Compact a session's chat if its history is over budget.
+
+        Args:
+            session: ConversationSession (uses .chat, .summary and .preamble)
+            chat_factory: Callable accepting history= that returns a new chat
+
+        Returns:
+            bool: True if the chat was replaced with a compacted one
+        """
+        history = list(session.chat.history)
+        if self.estimate_tokens(history) <= self.token_budget:
+            return False
+
+        # A previous compaction left the summary pair at the head of the history
+        if session.summary and len(history) >= 2:
+            history = history[2:]
+
+        exchanges = self._split_exchanges(history)
+        if len(exchanges) <= self.keep_exchanges:
+            return False
+
+        old, recent = exchanges[:-self.keep_exchanges], exchanges[-self.keep_exchanges:]
+        session.summary = self._merge_summary(
+            session.summary, [self._summarise_exchange(exchange) for exchange in old]
+        )
+
+        opening = f"{SUMMARY_HEADER}\n{session.summary}"
+        if session.preamble:
+            opening = f"{session.preamble}\n\n{opening}"
+
+        new_history = [
+            Content(role="user", parts=[Part.from_text(opening)]),
+            Content(role="model", parts=[Part.from_text(SUMMARY_ACK)]),
+        ]
+        for exchange in recent:
+            new_history.extend(exchange)
+
+        before = self.estimate_tokens(session.chat.history)
+        session.chat = chat_factory(history=new_history)
+        logger.info(
+            f"Compacted conversation '{session.conversation_id}': folded {len(old)} exchange(s), "
+            f"~{before} -> ~{self.estimate_tokens(new_history)} tokens"
+        )
+        return True
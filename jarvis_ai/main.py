@@ -4,12 +4,19 @@ Runs both Wyoming protocol server and HTTP API server concurrently.
 """
 import asyncio
 import logging
+import signal
 import sys
 
 from wyoming_handler import run_wyoming_server
 from api_server import run_http_server
 from conversation import JarvisConversation
+import config_helper as config
 from memory import Memory
+from semantic_memory import create_embedder
+from entity_cache import get_entity_cache
+from metrics import install_http_instrumentation
+from spotify_client import warm_spotify_token
+from arr_metadata import warm_arr_metadata
 
 # Configure logging
 logging.basicConfig(
@@ -27,8 +34,13 @@ async def run_servers():
     logger.info("Starting Home Assistant Add-on...")
     logger.info("=" * 60)
     
+    # Time outbound HTTP calls (HA, weather, Spotify, ...) for /metrics
+    install_http_instrumentation()
+    
     # Initialize memory (shared between servers)
-    memory = Memory(db_path="/data/jarvis_memory.db")
+    memory = Memory(db_path="/data/jarvis_memory.db", embedder=create_embedder(
+        config.MEMORY_EMBEDDER, project=config.GCP_PROJECT_ID, location=config.GCP_LOCATION
+    ))
     stats = memory.get_stats()
     logger.info(f"Memory stats: {stats}")
     
@@ -41,16 +53,27 @@ async def run_servers():
     else:
         logger.info("No preferences found in persistent storage")
     
+    # Fetch the Spotify token in the background so the first play_music doesn't wait for it
+    asyncio.get_running_loop().run_in_executor(None, warm_spotify_token)
+    
+    # Likewise Radarr/Sonarr root folders and quality profiles, so adds are a single POST
+    asyncio.get_running_loop().run_in_executor(None, warm_arr_metadata)
+    
     # Initialize Jarvis brain (shared between servers)
     jarvis = JarvisConversation(memory=memory)
     
-    # Run both servers concurrently
+    # The Supervisor stops the add-on with SIGTERM; cancel the servers so the
+    # finally below still commits queued memory writes
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    
+    # Run both servers and the entity state cache feed concurrently
     try:
         await asyncio.gather(
             run_wyoming_server(host="0.0.0.0", port=10400, jarvis=jarvis),
-            run_http_server(jarvis=jarvis, host="0.0.0.0", port=10401)
+            run_http_server(jarvis=jarvis, host="0.0.0.0", port=10401),
+            get_entity_cache().run()
         )
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("Shutting down gracefully...")
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
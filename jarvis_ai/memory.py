@@ -1,11 +1,189 @@
 import sqlite3
+import copy
 import json
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Dict, Any, Callable, IO, Union
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import TimedConnection
+from memory_writer import MemoryWriter, configure_connection
+from memory_migrations import SCHEMA_VERSION, migrate
+from context_retention import CONTEXT_RETENTION_DAYS, retention_cutoff, roll_up_expired
+from semantic_memory import SOURCE_CONTEXT, SOURCE_FACT, SemanticIndex, format_exchange, format_fact
+
+if TYPE_CHECKING:
+    from async_memory import AsyncMemory
 
 logger = logging.getLogger(__name__)
 
+# Header "format" of memory snapshot files
+SNAPSHOT_FORMAT = "jarvis-memory-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Rows per executemany() when importing, so memory stays bounded
+SNAPSHOT_BATCH_ROWS = 500
+
+# Snapshot record tag -> (table, columns); one JSON array per line: [tag, *columns]
+SNAPSHOT_TABLES = {
+    'p': ('preferences', ('key', 'value', 'updated_at')),
+    'f': ('facts', ('entity_id', 'fact_key', 'fact_value', 'source', 'learned_at')),
+    'l': ('last_interaction', ('context_type', 'entity_id', 'action', 'timestamp')),
+    'r': ('context_rollup', ('day', 'exchanges', 'errors', 'top_intents', 'first_at', 'last_at')),
+}
+
+# Seconds between checks for preference changes made by other processes
+PREFERENCE_RECHECK_SECONDS = 5
+
+
+class PreferenceCache:
+    """
+    Decoded preferences for one database, shared by every Memory on it.
+    
+    Loaded once, then kept current write-through by set/delete; `version`
+    is bumped on every change so callers can tell when derived data is stale.
+    Values are replaced copy-on-write, so a dict returned by `current()` or
+    `load()` is a consistent snapshot that is safe to read without the lock.
+    
+    Every preference change made in this process goes through the cache, so
+    reads never touch SQLite. Writes from other processes (e.g.
+    set_garden_camera.py) are caught by checking PRAGMA data_version at most
+    every PREFERENCE_RECHECK_SECONDS; since that counter also moves on our own
+    context writes, a reload compares the raw rows first and only decodes
+    them when the preferences really changed.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, recheck_interval: float = PREFERENCE_RECHECK_SECONDS):
+        """
+        Args:
+            db_path: Database file to watch for outside commits (None to never reload)
+            recheck_interval: Seconds between checks for outside commits
+        """
+        self._values: Optional[Dict[str, Any]] = None
+        # key -> JSON text as stored, to tell a real change from an unrelated commit
+        self._raw: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self._db_path = db_path
+        self.recheck_interval = recheck_interval
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._checked_at = 0.0
+    
+    def data_version(self) -> Optional[int]:
+        """Database change counter; moves whenever any other connection commits."""
+        if self._db_path is None:
+            return None
+        with self._lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def current(self) -> Optional[Dict[str, Any]]:
+        """The cached values, or None if not loaded yet or another connection may have changed them."""
+        values = self._values
+        if values is None or self._db_path is None:
+            return values
+        if time.monotonic() - self._checked_at < self.recheck_interval:
+            return values
+        data_version = self.data_version()
+        if data_version != self._data_version:
+            return None
+        self._checked_at = time.monotonic()
+        return values
+    
+    def load(self, rows, data_version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Fill the cache from (key, json_value) rows.
+        
+        Args:
+            rows: (key, json_value) rows read from the preferences table
+            data_version: data_version() taken before the rows were read
+        
+        Returns:
+            Dict[str, Any]: The cached values snapshot
+        """
+        raw = {key: value for key, value in rows}
+        with self._lock:
+            self._data_version = data_version
+            self._checked_at = time.monotonic()
+            # Rechecks usually follow unrelated commits; unchanged rows are not decoded again
+            if self._values is not None and raw == self._raw:
+                return self._values
+        values = {key: json.loads(value) for key, value in raw.items()}
+        with self._lock:
+            if values != self._values:
+                self._values = values
+                self.version += 1
+            self._raw = raw
+            return self._values
+    
+    @staticmethod
+    def copy(value: Any) -> Any:
+        """Copy containers so callers can't mutate the cached value."""
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    
+    def set(self, key: str, value: Any, encoded: str):
+        """Cache a written value (encoded is its JSON text as stored)."""
+        with self._lock:
+            if self._values is not None:
+                self._values = {**self._values, key: value}
+                self._raw = {**self._raw, key: encoded}
+            self.version += 1
+    
+    def delete(self, key: str):
+        with self._lock:
+            if self._values is not None:
+                self._values = {k: v for k, v in self._values.items() if k != key}
+                self._raw = {k: v for k, v in self._raw.items() if k != key}
+            self.version += 1
+    
+    def clear(self):
+        with self._lock:
+            if self._values is not None:
+                self._values = {}
+                self._raw = {}
+            self.version += 1
+    
+    def invalidate(self):
+        """Drop the cached values so the next read reloads them (after bulk changes)."""
+        with self._lock:
+            self._values = None
+            self._raw = {}
+            self.version += 1
+
+
+_preference_caches: Dict[str, PreferenceCache] = {}
+_preference_caches_lock = threading.Lock()
+
+
+def _get_preference_cache(db_path: str) -> PreferenceCache:
+    """Process-wide preference cache for a database file (private for :memory:)."""
+    if db_path == ":memory:":
+        return PreferenceCache()
+    key = os.path.abspath(db_path)
+    with _preference_caches_lock:
+        cache = _preference_caches.get(key)
+        if cache is None:
+            cache = _preference_caches[key] = PreferenceCache(key)
+        return cache
+
+
+_semantic_indexes: Dict[str, SemanticIndex] = {}
+_semantic_indexes_lock = threading.Lock()
+
+
+def _vector_path(db_path: str) -> Optional[str]:
+    """Vector file stored next to the database (None for :memory:)."""
+    if db_path == ":memory:":
+        return None
+    return os.path.splitext(os.path.abspath(db_path))[0] + ".vectors"
+
+
 class Memory:
     """
     Persistent memory system for Jarvis.
@@ -13,112 +191,220 @@ class Memory:
     CRITICAL RULES:
     1. NEVER store HA entity states (always query live from HA)
     2. ONLY store user preferences and learned context
-    3. Auto-prune conversation history older than 7 days
+    3. Roll conversation history older than 7 days into per-day usage stats
     4. Facts are for knowledge, NOT real-time data
+    
+    Writes are write-behind by default: they are queued to a background
+    writer thread and committed in batches, and reads flush pending writes
+    first so callers always see their own changes.
+    
+    Reads use one connection per thread, so concurrent turns read in
+    parallel without sharing a cursor. Async callers use `memory.aio`
+    (AsyncMemory), which runs the same methods on a reader thread pool.
     """
     
-    def __init__(self, db_path: str = "/data/jarvis_memory.db"):
-        """Initialize memory database."""
+    def __init__(self, db_path: str = "/data/jarvis_memory.db", write_behind: bool = True, embedder=None):
+        """
+        Initialize memory database.
+        
+        Args:
+            db_path: SQLite database file
+            write_behind: Queue writes to a background writer thread (ignored
+                for :memory: databases, which cannot be shared between connections)
+            embedder: Embedder for semantic recall (see semantic_memory.create_embedder);
+                None disables recall and indexing
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # TimedConnection records every statement as a sqlite span on /metrics
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, factory=TimedConnection)
         self.conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            configure_connection(self.conn)
         self._init_db()
+        # Serialises use of self.conn (in-line writes, and all reads for :memory:)
+        self._conn_lock = threading.RLock()
+        self._readers = threading.local()
+        self._reader_conns = []
+        self._aio = None
+        
+        self._preferences = _get_preference_cache(db_path)
+        # Bumped whenever stored conversation context changes
+        self.context_version = 0
+        # UTC day retention last ran for, when it runs in line (no writer thread)
+        self._retention_day = None
+        
+        # The writer thread starts on the first write, so read-only instances stay cheap
+        self._write_behind = write_behind and db_path != ":memory:"
+        self._writer: Optional[MemoryWriter] = None
+        self._writer_lock = threading.Lock()
+        
+        self._semantic = self._get_semantic_index(embedder) if embedder is not None else None
+        # Embedding can be a network call (vertex), so index updates run on their
+        # own thread, in submission order, instead of inside the caller's turn
+        self._indexer: Optional[ThreadPoolExecutor] = None
         logger.info(f"Memory system initialized at {db_path}")
     
-    def _init_db(self):
-        """Create database schema if not exists."""
-        cursor = self.conn.cursor()
-        
-        # User Preferences (Static settings)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS preferences (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Learned Facts (Contextual knowledge, NOT states)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS facts (
-                entity_id TEXT,
-                fact_key TEXT,
-                fact_value TEXT,
-                source TEXT,
-                learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (entity_id, fact_key)
-            )
-        """)
-        
-        # Conversation Context (Auto-pruned after 7 days)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS context (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_input TEXT,
-                assistant_response TEXT,
-                is_error INTEGER DEFAULT 0,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Migrate existing context table to add is_error column if not exists
-        try:
-            cursor.execute("ALTER TABLE context ADD COLUMN is_error INTEGER DEFAULT 0")
+    def _write(self, *statements):
+        """Run (sql, params) write statements as one transaction, behind or in line."""
+        if not statements:
+            return
+        if self._write_behind:
+            self._write_behind_writer().submit(*statements)
+            return
+        with self._conn_lock:
+            cursor = self.conn.cursor()
+            for sql, params in statements:
+                cursor.execute(sql, params)
             self.conn.commit()
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        
-        # Last Interactions (For follow-up commands like "turn it off")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS last_interaction (
-                context_type TEXT PRIMARY KEY,
-                entity_id TEXT,
-                action TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+    
+    def _index(self, update: Callable[[], list]):
+        """Queue a semantic index update; the statements it returns are written when it runs."""
+        if self._indexer is None:
+            with self._writer_lock:
+                if self._indexer is None:
+                    self._indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-index")
+        
+        def run():
+            try:
+                self._write(*update())
+            except Exception as e:
+                logger.warning(f"Semantic memory update failed: {e}")
         
-        self.conn.commit()
-        logger.info("Memory database schema initialized")
+        self._indexer.submit(run)
+    
+    def _write_behind_writer(self) -> MemoryWriter:
+        """The writer thread, started on first use."""
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    # Context pruning runs as periodic maintenance on the writer thread
+                    self._writer = MemoryWriter(self.db_path, maintenance=self._apply_retention)
+        return self._writer
+    
+    def _reader_conn(self) -> sqlite3.Connection:
+        """This thread's read connection (WAL lets them read alongside the writer)."""
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=TimedConnection)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._readers.conn = conn
+            with self._writer_lock:
+                self._reader_conns.append(conn)
+        return conn
+    
+    @contextmanager
+    def _read(self, *tables: str):
+        """Cursor for a read, after committing pending writes to the tables read."""
+        if self._writer is not None:
+            self._writer.flush(tables or None)
+        if self.db_path == ":memory:":
+            # A :memory: database exists only on self.conn
+            with self._conn_lock:
+                yield self.conn.cursor()
+        else:
+            yield self._reader_conn().cursor()
+    
+    @property
+    def aio(self) -> "AsyncMemory":
+        """Async facade over this memory for use from the event loop."""
+        if self._aio is None:
+            from async_memory import AsyncMemory
+            with self._writer_lock:
+                if self._aio is None:
+                    self._aio = AsyncMemory(self)
+        return self._aio
+    
+    def _transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run func(conn) in one write transaction, serialised with all other writes."""
+        if self._write_behind:
+            return self._write_behind_writer().call(func)
+        with self._conn_lock:
+            self.conn.execute("BEGIN")
+            try:
+                result = func(self.conn)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            return result
+    
+    def flush(self):
+        """Block until all queued writes (and semantic index updates) are committed."""
+        if self._indexer is not None:
+            # One worker runs updates in order, so this waits for everything queued before it
+            self._indexer.submit(lambda: None).result()
+        if self._writer is not None:
+            self._writer.flush(timeout=None)
+    
+    def _get_semantic_index(self, embedder) -> SemanticIndex:
+        """Process-wide semantic index for this database, loaded on first use."""
+        key = _vector_path(self.db_path)
+        with _semantic_indexes_lock:
+            index = _semantic_indexes.get(key) if key else None
+            if index is None or index.embedder.name != embedder.name:
+                if index is not None:
+                    index.close()
+                index = SemanticIndex(key, embedder)
+                cursor = self.conn.cursor()
+                cursor.execute("SELECT slot, source, key, text, created_at, embedder FROM memory_vectors")
+                self._write(*index.load(cursor.fetchall()))
+                if key:
+                    _semantic_indexes[key] = index
+        return index
+    
+    def _init_db(self):
+        """Create or upgrade the database schema (no-op once it is current)."""
+        if migrate(self.conn):
+            logger.info("Memory database schema initialized")
     
     # ===== PREFERENCES =====
     
+    @property
+    def preferences_version(self) -> int:
+        """Bumped whenever any preference is set, deleted or cleared."""
+        return self._preferences.version
+    
+    def _ensure_preferences(self) -> Dict[str, Any]:
+        """Cached preferences, (re)loaded on first use or after another process committed."""
+        values = self._preferences.current()
+        if values is None:
+            data_version = self._preferences.data_version()
+            with self._read('preferences') as cursor:
+                cursor.execute("SELECT key, value FROM preferences")
+                rows = cursor.fetchall()
+            values = self._preferences.load(rows, data_version)
+        return values
+    
     def set_preference(self, key: str, value: Any):
         """
         Store a user preference.
         Examples: temperature_unit, skip_unit_suffix, favorite_color
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        encoded = json.dumps(value)
+        # Load first so the write-through below lands in a complete cache
+        self._ensure_preferences()
+        self._write(("""
             INSERT OR REPLACE INTO preferences (key, value, updated_at)
             VALUES (?, ?, CURRENT_TIMESTAMP)
-        """, (key, json.dumps(value)))
-        self.conn.commit()
+        """, (key, encoded)))
+        # Cache the value as it will read back from the database
+        self._preferences.set(key, json.loads(encoded), encoded)
         logger.info(f"Preference set: {key} = {value}")
     
     def get_preference(self, key: str, default: Any = None) -> Any:
-        """Retrieve a user preference."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM preferences WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        if row:
-            return json.loads(row[0])
-        return default
+        """Retrieve a user preference (from the in-memory cache)."""
+        return PreferenceCache.copy(self._ensure_preferences().get(key, default))
     
     def get_all_preferences(self) -> Dict[str, Any]:
-        """Get all user preferences as a dictionary."""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT key, value FROM preferences")
-        prefs = {}
-        for row in cursor.fetchall():
-            prefs[row[0]] = json.loads(row[1])
-        return prefs
+        """Get all user preferences as a dictionary (from the in-memory cache)."""
+        return {key: PreferenceCache.copy(value) for key, value in self._ensure_preferences().items()}
     
     def delete_preference(self, key: str):
         """Delete a user preference."""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM preferences WHERE key = ?", (key,))
-        self.conn.commit()
+        self._ensure_preferences()
+        self._write(("DELETE FROM preferences WHERE key = ?", (key,)))
+        self._preferences.delete(key)
         logger.info(f"Preference deleted: {key}")
     
     # ===== FACTS =====
@@ -130,42 +416,45 @@ class Memory:
         
         WARNING: Do NOT store current states! Only contextual knowledge.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._write(("""
             INSERT OR REPLACE INTO facts (entity_id, fact_key, fact_value, source, learned_at)
             VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (entity_id, fact_key, fact_value, source))
-        self.conn.commit()
+        """, (entity_id, fact_key, fact_value, source)))
+        if self._semantic is not None:
+            text = format_fact(entity_id, fact_key, fact_value)
+            self._index(lambda: self._semantic.add(SOURCE_FACT, text, key=f"{entity_id}.{fact_key}"))
         logger.info(f"Fact remembered: {entity_id}.{fact_key} = {fact_value} (source: {source})")
     
     def recall_fact(self, entity_id: str, fact_key: str) -> Optional[str]:
         """Retrieve a learned fact about an entity."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT fact_value FROM facts 
-            WHERE entity_id = ? AND fact_key = ?
-        """, (entity_id, fact_key))
-        row = cursor.fetchone()
+        with self._read('facts') as cursor:
+            cursor.execute("""
+                SELECT fact_value FROM facts 
+                WHERE entity_id = ? AND fact_key = ?
+            """, (entity_id, fact_key))
+            row = cursor.fetchone()
         return row[0] if row else None
     
     def get_entity_facts(self, entity_id: str) -> Dict[str, str]:
         """Get all facts about a specific entity."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT fact_key, fact_value FROM facts WHERE entity_id = ?
-        """, (entity_id,))
+        with self._read('facts') as cursor:
+            cursor.execute("""
+                SELECT fact_key, fact_value FROM facts WHERE entity_id = ?
+            """, (entity_id,))
+            rows = cursor.fetchall()
         facts = {}
-        for row in cursor.fetchall():
+        for row in rows:
             facts[row[0]] = row[1]
         return facts
     
     def delete_fact(self, entity_id: str, fact_key: str):
         """Delete a specific fact."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._write(("""
             DELETE FROM facts WHERE entity_id = ? AND fact_key = ?
-        """, (entity_id, fact_key))
-        self.conn.commit()
+        """, (entity_id, fact_key)))
+        if self._semantic is not None:
+            # Queued behind any pending add of the same fact
+            self._index(lambda: self._semantic.remove(SOURCE_FACT, f"{entity_id}.{fact_key}"))
         logger.info(f"Fact deleted: {entity_id}.{fact_key}")
     
     # ===== CONVERSATION CONTEXT =====
@@ -177,16 +466,27 @@ class Memory:
             user_input: User's input text
             assistant_response: Jarvis's response
             is_error: Whether this was an error response (to filter out later)
+        
+        Append-only: expired days are rolled up by periodic maintenance, not on this path.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._write(("""
             INSERT INTO context (user_input, assistant_response, is_error, timestamp)
             VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        """, (user_input, assistant_response, 1 if is_error else 0))
-        self.conn.commit()
+        """, (user_input, assistant_response, 1 if is_error else 0)))
+        # Error exchanges are never recalled, so they are not indexed either
+        if self._semantic is not None and not is_error:
+            text = format_exchange(user_input, assistant_response)
+            self._index(lambda: self._semantic.add(SOURCE_CONTEXT, text))
+        self.context_version += 1
         
-        # Auto-prune old context
-        self._prune_old_context()
+        # Without a writer thread there is no maintenance loop; roll up in line,
+        # once per day since a day only expires at midnight
+        today = datetime.utcnow().date()
+        if not self._write_behind and self._retention_day != today:
+            self._retention_day = today
+            with self._conn_lock:
+                self._apply_retention(self.conn)
+                self.conn.commit()
     
     def get_recent_context(self, limit: int = 5, include_errors: bool = False) -> list:
         """Get recent conversation exchanges, filtering out errors by default.
@@ -195,8 +495,6 @@ class Memory:
             limit: Maximum number of context entries to return
             include_errors: If True, include error responses; if False, filter them out
         """
-        cursor = self.conn.cursor()
-        
         if include_errors:
             query = """
                 SELECT user_input, assistant_response, timestamp
@@ -204,7 +502,6 @@ class Memory:
                 ORDER BY timestamp DESC
                 LIMIT ?
             """
-            cursor.execute(query, (limit,))
         else:
             # Exclude errors - only get successful interactions
             query = """
@@ -214,10 +511,12 @@ class Memory:
                 ORDER BY timestamp DESC
                 LIMIT ?
             """
+        with self._read('context') as cursor:
             cursor.execute(query, (limit,))
+            rows = cursor.fetchall()
         
         context = []
-        for row in cursor.fetchall():
+        for row in rows:
             context.append({
                 'user': row[0],
                 'assistant': row[1],
@@ -225,17 +524,76 @@ class Memory:
             })
         return list(reversed(context))  # Return in chronological order
     
-    def _prune_old_context(self):
-        """Delete conversation context older than 7 days."""
-        cursor = self.conn.cursor()
-        cutoff = datetime.now() - timedelta(days=7)
-        cursor.execute("""
-            DELETE FROM context WHERE timestamp < ?
-        """, (cutoff,))
-        deleted = cursor.rowcount
-        self.conn.commit()
-        if deleted > 0:
-            logger.info(f"Pruned {deleted} old context entries")
+    def recall(self, query: str, limit: int = 3, sources=None) -> list:
+        """Find the stored exchanges and facts most relevant to a query.
+        
+        Args:
+            query: Text to match, usually the user's request
+            limit: Maximum number of memories to return
+            sources: Restrict to 'context' and/or 'fact' (default both)
+        
+        Returns:
+            List of {'source', 'key', 'text', 'created_at', 'score'}, most
+            relevant first; empty when semantic recall is disabled
+        """
+        if self._semantic is None:
+            return []
+        return self._semantic.search(query, limit=limit, sources=sources)
+    
+    def clear_context(self) -> int:
+        """Delete all conversation context (preferences and facts are kept). Returns the count."""
+        with self._read('context') as cursor:
+            cursor.execute("SELECT COUNT(*) FROM context")
+            count = cursor.fetchone()[0]
+        self._write(("DELETE FROM context", ()))
+        if self._semantic is not None:
+            self._index(lambda: self._semantic.clear(SOURCE_CONTEXT))
+        self.context_version += 1
+        logger.info(f"Cleared {count} context entries")
+        return count
+    
+    def apply_retention(self):
+        """
+        Roll expired context days into context_rollup now.
+        
+        This normally happens on its own (writer maintenance, or once a day in
+        line); calling it is for tools and benchmarks that need it at a known time.
+        """
+        self._transaction(self._apply_retention)
+    
+    def _apply_retention(self, conn: sqlite3.Connection):
+        """Roll expired context days into context_rollup (caller commits)."""
+        if roll_up_expired(conn, retention_days=CONTEXT_RETENTION_DAYS) > 0:
+            self.context_version += 1
+        
+        # Recalled exchanges expire with the context they came from
+        if self._semantic is not None:
+            cutoff = datetime.fromisoformat(retention_cutoff(retention_days=CONTEXT_RETENTION_DAYS))
+            for sql, params in self._semantic.prune(SOURCE_CONTEXT, cutoff):
+                conn.execute(sql, params)
+    
+    def get_usage_stats(self, days: int = 30) -> list:
+        """Per-day conversation stats rolled up from expired context, newest first.
+        
+        Args:
+            days: Maximum number of days to return
+        
+        Returns:
+            List of {'day', 'exchanges', 'errors', 'error_rate', 'top_intents'}
+        """
+        with self._read('context_rollup') as cursor:
+            cursor.execute("""
+                SELECT day, exchanges, errors, top_intents FROM context_rollup
+                ORDER BY day DESC LIMIT ?
+            """, (days,))
+            rows = cursor.fetchall()
+        return [{
+            'day': row[0],
+            'exchanges': row[1],
+            'errors': row[2],
+            'error_rate': round(row[2] / row[1], 3) if row[1] else 0.0,
+            'top_intents': json.loads(row[3] or "{}"),
+        } for row in rows]
     
     # ===== LAST INTERACTION =====
     
@@ -244,22 +602,20 @@ class Memory:
         Save the last entity interaction for follow-up commands.
         context_type: 'light', 'climate', 'media', etc.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._write(("""
             INSERT OR REPLACE INTO last_interaction (context_type, entity_id, action, timestamp)
             VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        """, (context_type, entity_id, action))
-        self.conn.commit()
+        """, (context_type, entity_id, action)))
         logger.debug(f"Last interaction saved: {context_type} -> {entity_id} ({action})")
     
     def get_last_interaction(self, context_type: str) -> Optional[Dict[str, str]]:
         """Get the last interaction for a given context type."""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT entity_id, action, timestamp FROM last_interaction
-            WHERE context_type = ?
-        """, (context_type,))
-        row = cursor.fetchone()
+        with self._read('last_interaction') as cursor:
+            cursor.execute("""
+                SELECT entity_id, action, timestamp FROM last_interaction
+                WHERE context_type = ?
+            """, (context_type,))
+            row = cursor.fetchone()
         if row:
             return {
                 'entity_id': row[0],
@@ -268,38 +624,221 @@ class Memory:
             }
         return None
     
+    # ===== SPOTIFY SEARCH CACHE =====
+    
+    def get_spotify_cache_entries(self, limit: int) -> list:
+        """Most requested cached Spotify searches, as dicts."""
+        with self._read('spotify_search_cache') as cursor:
+            cursor.execute("""
+                SELECT query, search_text, uri, name, fetched_at, hits, last_used FROM spotify_search_cache
+                ORDER BY hits DESC LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def save_spotify_cache_entries(self, entries: list):
+        """Store (or replace) resolved Spotify searches in one transaction."""
+        self._write(*[("""
+            INSERT OR REPLACE INTO spotify_search_cache (query, search_text, uri, name, fetched_at, hits, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (entry['query'], entry['search_text'], entry['uri'], entry['name'], entry['fetched_at'],
+              entry['hits'], entry['last_used'])) for entry in entries])
+    
+    def delete_spotify_cache_entries(self, queries: list):
+        """Forget cached Spotify searches (evicted from the cache)."""
+        self._write(*[("DELETE FROM spotify_search_cache WHERE query = ?", (query,)) for query in queries])
+    
+    def prune_spotify_cache(self, keep: int):
+        """Drop all but the `keep` most requested cached Spotify searches."""
+        self._write(("""
+            DELETE FROM spotify_search_cache WHERE query NOT IN (
+                SELECT query FROM spotify_search_cache ORDER BY hits DESC LIMIT ?
+            )
+        """, (keep,)))
+    
+    # ===== SNAPSHOTS =====
+    
+    def export_snapshot(self, destination: Union[str, IO[str]]) -> Dict[str, int]:
+        """
+        Write preferences, facts, last interactions and usage rollups as a JSON-lines snapshot.
+        
+        The first line is a header object; every other line is one row as a
+        JSON array [tag, *columns] (see SNAPSHOT_TABLES). Rows are streamed
+        from a single read transaction, so the snapshot is consistent and
+        memory use does not grow with the database.
+        
+        Args:
+            destination: File path or text file object
+        
+        Returns:
+            Rows written per table
+        """
+        if isinstance(destination, str):
+            with open(destination, "w", encoding="utf-8") as f:
+                return self.export_snapshot(f)
+        
+        counts = {}
+        destination.write(json.dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION,
+                                      "schema": SCHEMA_VERSION,
+                                      "created_at": datetime.utcnow().isoformat(timespec="seconds")}) + "\n")
+        with self._read() as cursor:
+            cursor.execute("BEGIN")
+            try:
+                for tag, (table, columns) in SNAPSHOT_TABLES.items():
+                    cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+                    count = 0
+                    for row in cursor:
+                        values = list(row)
+                        if tag == 'p':
+                            # Preferences are stored JSON-encoded; snapshot the value itself
+                            values[1] = json.loads(values[1])
+                        destination.write(json.dumps([tag] + values, separators=(",", ":")) + "\n")
+                        count += 1
+                    counts[table] = count
+            finally:
+                cursor.execute("COMMIT")
+        logger.info(f"Exported memory snapshot: {counts}")
+        return counts
+    
+    def import_snapshot(self, source: Union[str, IO[str]], replace: bool = False) -> Dict[str, int]:
+        """
+        Load a snapshot written by export_snapshot in one transaction.
+        
+        Lines are read one pass and inserted with executemany() in batches of
+        SNAPSHOT_BATCH_ROWS; existing rows with the same key are replaced. A
+        malformed snapshot rolls back the whole import.
+        
+        Args:
+            source: File path or text file object
+            replace: Delete existing rows of the snapshot tables first
+        
+        Returns:
+            Rows imported per table
+        """
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8") as f:
+                return self.import_snapshot(f, replace=replace)
+        
+        header = json.loads(source.readline() or "{}")
+        if header.get("format") != SNAPSHOT_FORMAT or header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(f"Not a supported memory snapshot: {header}")
+        
+        statements = {
+            tag: f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join('?' for _ in columns[:-1])}, COALESCE(?, CURRENT_TIMESTAMP))"
+            for tag, (table, columns) in SNAPSHOT_TABLES.items()
+        }
+        
+        def load(conn: sqlite3.Connection) -> Dict[str, int]:
+            if replace:
+                for table, _ in SNAPSHOT_TABLES.values():
+                    conn.execute(f"DELETE FROM {table}")
+            
+            counts = {table: 0 for table, _ in SNAPSHOT_TABLES.values()}
+            batches = {tag: [] for tag in SNAPSHOT_TABLES}
+            
+            def write_batch(tag: str):
+                conn.executemany(statements[tag], batches[tag])
+                counts[SNAPSHOT_TABLES[tag][0]] += len(batches[tag])
+                batches[tag].clear()
+            
+            for line_number, line in enumerate(source, 2):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                tag, values = record[0], record[1:]
+                if tag not in SNAPSHOT_TABLES or len(values) != len(SNAPSHOT_TABLES[tag][1]):
+                    raise ValueError(f"Bad snapshot record on line {line_number}: {line.strip()[:80]}")
+                if tag == 'p':
+                    values[1] = json.dumps(values[1])
+                batches[tag].append(values)
+                if len(batches[tag]) >= SNAPSHOT_BATCH_ROWS:
+                    write_batch(tag)
+            for tag in SNAPSHOT_TABLES:
+                write_batch(tag)
+            return counts
+        
+        try:
+            counts = self._transaction(load)
+        finally:
+            # Reload preferences from the database on next use
+            self._preferences.invalidate()
+        if self._semantic is not None:
+            self._index(lambda: self._reindex_facts(clear=replace))
+        logger.info(f"Imported memory snapshot: {counts}")
+        return counts
+    
+    def _reindex_facts(self, clear: bool = False):
+        """
+        Re-embed facts from the database for semantic recall (streamed, in batches).
+        
+        Returns:
+            list: Statements of the last, partial batch, for the caller to write
+        """
+        statements = self._semantic.clear(SOURCE_FACT) if clear else []
+        with self._read('facts') as cursor:
+            cursor.execute("SELECT entity_id, fact_key, fact_value FROM facts")
+            for entity_id, fact_key, fact_value in cursor:
+                statements += self._semantic.add(SOURCE_FACT, format_fact(entity_id, fact_key, fact_value),
+                                                 key=f"{entity_id}.{fact_key}")
+                if len(statements) >= SNAPSHOT_BATCH_ROWS:
+                    self._write(*statements)
+                    statements = []
+        return statements
+    
     # ===== UTILITY =====
     
     def clear_all_memory(self):
         """Clear all memory (use with caution!)."""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM preferences")
-        cursor.execute("DELETE FROM facts")
-        cursor.execute("DELETE FROM context")
-        cursor.execute("DELETE FROM last_interaction")
-        self.conn.commit()
+        self._ensure_preferences()
+        statements = [
+            ("DELETE FROM preferences", ()),
+            ("DELETE FROM facts", ()),
+            ("DELETE FROM context", ()),
+            ("DELETE FROM last_interaction", ()),
+            ("DELETE FROM context_rollup", ()),
+        ]
+        self._write(*statements)
+        if self._semantic is not None:
+            self._index(lambda: self._semantic.clear())
+        self._preferences.clear()
+        self.context_version += 1
         logger.warning("All memory cleared!")
     
     def get_stats(self) -> Dict[str, int]:
         """Get memory database statistics."""
-        cursor = self.conn.cursor()
-        
         stats = {}
-        cursor.execute("SELECT COUNT(*) FROM preferences")
-        stats['preferences'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM facts")
-        stats['facts'] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM context")
-        stats['context_entries'] = cursor.fetchone()[0]
+        with self._read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM preferences")
+            stats['preferences'] = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM facts")
+            stats['facts'] = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM context")
+            stats['context_entries'] = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM last_interaction")
+            stats['last_interactions'] = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(*) FROM context_rollup")
+            stats['rollup_days'] = cursor.fetchone()[0]
         
-        cursor.execute("SELECT COUNT(*) FROM last_interaction")
-        stats['last_interactions'] = cursor.fetchone()[0]
+        if self._semantic is not None:
+            stats['semantic_entries'] = len(self._semantic)
         
         return stats
     
     def close(self):
-        """Close database connection."""
+        """Commit queued writes and close database connections."""
+        if self._aio is not None:
+            self._aio.shutdown()
+        if self._indexer is not None:
+            self._indexer.shutdown(wait=True)
+        if self._writer is not None:
+            self._writer.close()
+        for conn in self._reader_conns:
+            conn.close()
+        if self._semantic is not None:
+            self._semantic.flush()
         self.conn.close()
         logger.info("Memory database closed")
@@ -0,0 +1,166 @@
+"""
+Versioned schema migrations for the Jarvis memory database.
+The schema version is kept in PRAGMA user_version; startup applies only the
+migrations above it, and does no work at all once the schema is current.
+"""
+import logging
+import sqlite3
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _initial_schema(conn: sqlite3.Connection):
+    """Tables as created before migrations existed (safe on existing databases)."""
+    # User Preferences (Static settings)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS preferences (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Learned Facts (Contextual knowledge, NOT states)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS facts (
+            entity_id TEXT,
+            fact_key TEXT,
+            fact_value TEXT,
+            source TEXT,
+            learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (entity_id, fact_key)
+        )
+    """)
+
+    # Conversation Context (Auto-pruned after 7 days)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS context (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_input TEXT,
+            assistant_response TEXT,
+            is_error INTEGER DEFAULT 0,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Databases from before error tracking lack is_error
+    if not _column_exists(conn, "context", "is_error"):
+        conn.execute("ALTER TABLE context ADD COLUMN is_error INTEGER DEFAULT 0")
+
+    # Last Interactions (For follow-up commands like "turn it off")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS last_interaction (
+            context_type TEXT PRIMARY KEY,
+            entity_id TEXT,
+            action TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _retention_indexes(conn: sqlite3.Connection):
+    """Indexes for recent-context reads, pruning and per-entity fact lookups."""
+    # get_recent_context: WHERE is_error = 0 ORDER BY timestamp DESC LIMIT n
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_context_error_time ON context(is_error, timestamp)")
+    # context_retention.roll_up_expired (run by Memory._apply_retention) and unfiltered
+    # recent context: range/order on timestamp alone
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_context_time ON context(timestamp)")
+    # get_entity_facts: covering, so the lookup never touches the table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_entity ON facts(entity_id, fact_key, fact_value)")
+
+
+def _memory_vectors(conn: sqlite3.Connection):
+    """Slot -> text mapping for the semantic memory vector file."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS memory_vectors (
+            slot INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            key TEXT,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            embedder TEXT
+        )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_memory_vectors_key ON memory_vectors(source, key)")
+
+
+def _context_rollup(conn: sqlite3.Connection):
+    """Per-day usage stats that expired context is rolled up into."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS context_rollup (
+            day TEXT PRIMARY KEY,
+            exchanges INTEGER NOT NULL,
+            errors INTEGER NOT NULL,
+            top_intents TEXT,
+            first_at TIMESTAMP,
+            last_at TIMESTAMP
+        )
+    """)
+
+
+def _spotify_search_cache(conn: sqlite3.Connection):
+    """Resolved Spotify searches, so repeat requests skip the API."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS spotify_search_cache (
+            query TEXT PRIMARY KEY,
+            search_text TEXT NOT NULL,
+            uri TEXT NOT NULL,
+            name TEXT,
+            fetched_at REAL NOT NULL,
+            hits INTEGER DEFAULT 0,
+            last_used REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_spotify_cache_hits ON spotify_search_cache(hits)")
+
+
+# (version, description, migration) in order; append new migrations, never edit old ones
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "initial schema", _initial_schema),
+    (2, "context and facts indexes", _retention_indexes),
+    (3, "semantic memory vectors", _memory_vectors),
+    (4, "context rollups", _context_rollup),
+    (5, "spotify search cache", _spotify_search_cache),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database schema up to SCHEMA_VERSION.
+
+    Each migration runs in its own transaction together with the
+    user_version bump, so an interrupted upgrade resumes where it stopped.
+
+    Returns:
+        int: Number of migrations applied
+    """
+    current = get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        return 0
+
+    applied = 0
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied += 1
+        logger.info(f"Memory schema migrated to v{version} ({description})")
+    return applied
@@ -0,0 +1,261 @@
+"""
+Write-behind SQLite writer for Jarvis memory.
+Writes are queued and committed by one background thread in batched
+transactions, so conversation turns never wait on disk and SD-card hosts see
+one fsync per batch instead of one per write. The same thread runs periodic
+maintenance (context pruning) while idle.
+"""
+import atexit
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import TimedConnection
+
+logger = logging.getLogger(__name__)
+
+# Seconds the writer keeps collecting writes into one transaction
+WRITE_BATCH_WINDOW = 1.0
+
+# Upper bound on statements per transaction
+MAX_BATCH_STATEMENTS = 500
+
+# Seconds between maintenance runs
+MAINTENANCE_INTERVAL = 3600
+
+Statement = Tuple[str, Sequence]
+
+_TABLE_RE = re.compile(r"\b(?:INTO|FROM|UPDATE)\s+([A-Za-z_][A-Za-z0-9_]*)", re.IGNORECASE)
+
+
+def _table_of(sql: str) -> str:
+    match = _TABLE_RE.search(sql)
+    return match.group(1).lower() if match else ""
+
+
+def configure_connection(conn: sqlite3.Connection):
+    """WAL journal with synchronous=NORMAL: commits append to the WAL without an fsync."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+
+class _Flush:
+    """Queue marker: commit now and signal the waiting reader."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _Call(_Flush):
+    """Queue item: commit now, then run a function in its own transaction."""
+
+    def __init__(self, func: Callable[[sqlite3.Connection], object]):
+        super().__init__()
+        self.func = func
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+_STOP = object()
+
+
+class MemoryWriter:
+    """Background thread owning the write connection to the memory database."""
+
+    def __init__(self, db_path: str, maintenance: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 batch_window: float = WRITE_BATCH_WINDOW, maintenance_interval: float = MAINTENANCE_INTERVAL):
+        """
+        Args:
+            db_path: SQLite database file (not :memory:, which is per connection)
+            maintenance: Called with the write connection at startup and every
+                maintenance_interval seconds, inside a transaction
+            batch_window: Seconds to keep collecting writes into one transaction
+            maintenance_interval: Seconds between maintenance runs
+        """
+        self.batch_window = batch_window
+        self.maintenance_interval = maintenance_interval
+        self._maintenance = maintenance
+        self._queue: "queue.Queue" = queue.Queue()
+        # Uncommitted statements per table, so reads only wait on their own tables
+        self._pending: Counter = Counter()
+        self._pending_lock = threading.Lock()
+
+        # Autocommit mode: transactions are opened explicitly per batch
+        self._conn = sqlite3.connect(db_path, check_same_thread=False,
+                                     isolation_level=None, factory=TimedConnection)
+        configure_connection(self._conn)
+
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+        # The thread is a daemon, so commit what is still queued when the interpreter
+        # exits (scripts that never call close(), or main() after SIGTERM)
+        atexit.register(self.close)
+
+    @property
+    def pending(self) -> int:
+        """Statements queued but not yet committed."""
+        return sum(self._pending.values())
+
+    def submit(self, *statements: Statement):
+        """Queue statements to be committed together (never blocks)."""
+        if not statements:
+            return
+        with self._pending_lock:
+            self._pending.update(_table_of(sql) for sql, _ in statements)
+        self._queue.put(list(statements))
+
+    def flush(self, tables: Optional[Iterable[str]] = None, timeout: Optional[float] = 10) -> bool:
+        """
+        Commit everything queued so far.
+
+        Returns immediately when nothing is pending (for the given tables), so
+        reads can call it on every access to see their own writes.
+
+        Args:
+            tables: Only wait if one of these tables has pending writes
+            timeout: Seconds to wait for the commit (None waits forever)
+
+        Returns:
+            bool: True if the queue was committed within the timeout
+        """
+        with self._pending_lock:
+            if tables is None:
+                waiting = sum(self._pending.values()) > 0
+            else:
+                waiting = any(self._pending[table] > 0 for table in tables)
+        if not waiting or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def call(self, func: Callable[[sqlite3.Connection], object]):
+        """
+        Run func(conn) on the writer thread in one transaction and return its result.
+
+        Writes queued before the call are committed first; the transaction
+        is rolled back and the exception re-raised if func fails.
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("Memory writer is closed")
+        item = _Call(func)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def close(self):
+        """Commit outstanding writes and stop the writer thread."""
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._conn.close()
+
+    # ===== WRITER THREAD =====
+
+    def _run(self):
+        self._run_maintenance()
+        next_maintenance = time.monotonic() + self.maintenance_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_maintenance - time.monotonic()))
+            except queue.Empty:
+                self._run_maintenance()
+                next_maintenance = time.monotonic() + self.maintenance_interval
+                continue
+
+            batch: List[List[Statement]] = []
+            waiters: List[_Flush] = []
+            stop = self._collect(item, batch, waiters)
+
+            # Keep gathering writes for the batch window unless a reader is waiting
+            deadline = time.monotonic() + self.batch_window
+            while not stop and not waiters and sum(len(s) for s in batch) < MAX_BATCH_STATEMENTS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                stop = self._collect(item, batch, waiters)
+
+            self._commit(batch)
+            for waiter in waiters:
+                if isinstance(waiter, _Call):
+                    self._run_call(waiter)
+                waiter.done.set()
+            if stop:
+                return
+
+    @staticmethod
+    def _collect(item, batch: list, waiters: list) -> bool:
+        """Sort a queue item into the batch; returns True on the stop marker."""
+        if item is _STOP:
+            return True
+        if isinstance(item, _Flush):
+            waiters.append(item)
+        else:
+            batch.append(item)
+        return False
+
+    def _commit(self, batch: List[List[Statement]]):
+        """Commit a batch in one transaction, falling back to one per group on error."""
+        if not batch:
+            return
+        count = sum(len(group) for group in batch)
+        try:
+            self._execute(batch)
+        except sqlite3.Error as e:
+            logger.warning(f"Memory batch of {count} writes failed ({e}); retrying individually")
+            for group in batch:
+                try:
+                    self._execute([group])
+                except sqlite3.Error as group_error:
+                    logger.error(f"Memory write failed: {group_error} ({group[0][0].split()[0]} ...)")
+        finally:
+            with self._pending_lock:
+                self._pending.subtract(_table_of(sql) for group in batch for sql, _ in group)
+                self._pending += Counter()  # drop zero counts
+        logger.debug(f"Committed {count} memory writes in one transaction")
+
+    def _execute(self, batch: List[List[Statement]]):
+        self._conn.execute("BEGIN")
+        try:
+            for group in batch:
+                for sql, params in group:
+                    self._conn.execute(sql, params)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _run_call(self, call: _Call):
+        self._conn.execute("BEGIN")
+        try:
+            call.result = call.func(self._conn)
+            self._conn.execute("COMMIT")
+        except BaseException as e:
+            self._conn.execute("ROLLBACK")
+            call.error = e
+
+    def _run_maintenance(self):
+        if self._maintenance is None:
+            return
+        try:
+            self._conn.execute("BEGIN")
+            self._maintenance(self._conn)
+            self._conn.execute("COMMIT")
+        except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            logger.error(f"Memory maintenance failed: {e}")
@@ -0,0 +1,296 @@
+"""
+Latency instrumentation for Jarvis.
+Spans time model rounds, tools, outbound HTTP calls and SQLite statements;
+they are aggregated into summaries (p50/p95/p99), counters and in-flight
+gauges served in Prometheus text format on /metrics, and broken down per
+conversation turn in the log.
+"""
+import contextvars
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Recent samples kept per series for quantiles
+SAMPLE_WINDOW = 1024
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Span kinds and their help text; each kind exports jarvis_<kind>_seconds and
+# jarvis_<kind>_total, plus its in-flight count on jarvis_in_flight
+SPAN_HELP = {
+    'turn': "Conversation turns, from user text to final response",
+    'model_round': "Gemini send_message rounds, including streaming the reply (excluding time spent by the consumer)",
+    'model_first_chunk': "Time from sending a Gemini round to its first streamed chunk",
+    'tool': "Tool (function call) executions",
+    'http': "Outbound HTTP requests",
+    'sqlite': "SQLite statements",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Series:
+    """Samples and totals for one labelled summary series."""
+
+    __slots__ = ('samples', 'count', 'total')
+
+    def __init__(self):
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        self.count = 0
+        self.total = 0.0
+
+
+class MetricsRegistry:
+    """Thread-safe store of span summaries, counters and in-flight gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries: Dict[str, Dict[Labels, _Series]] = defaultdict(dict)
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._in_flight: Dict[str, int] = defaultdict(int)
+
+    def observe(self, kind: str, seconds: float, labels: Labels, status: str):
+        """Record one finished span."""
+        with self._lock:
+            series = self._summaries[kind].get(labels)
+            if series is None:
+                series = self._summaries[kind][labels] = _Series()
+            series.samples.append(seconds)
+            series.count += 1
+            series.total += seconds
+            self._counters[kind][labels + (('status', status),)] += 1
+
+    def enter(self, kind: str):
+        with self._lock:
+            self._in_flight[kind] += 1
+
+    def exit(self, kind: str):
+        with self._lock:
+            self._in_flight[kind] -= 1
+
+    def quantiles(self, kind: str, **labels) -> Dict[float, float]:
+        """Current p50/p95/p99 for one series (empty if never observed)."""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._summaries.get(kind, {}).get(key)
+            samples = sorted(series.samples) if series else []
+        return {q: _quantile(samples, q) for q in QUANTILES} if samples else {}
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        with self._lock:
+            summaries = {kind: {labels: (sorted(s.samples), s.count, s.total)
+                                for labels, s in series.items()}
+                         for kind, series in self._summaries.items()}
+            counters = {kind: dict(values) for kind, values in self._counters.items()}
+            in_flight = dict(self._in_flight)
+
+        lines = []
+        for kind in sorted(set(SPAN_HELP) | set(summaries)):
+            help_text = SPAN_HELP.get(kind, kind)
+            name = f"jarvis_{kind}_seconds"
+            lines.append(f"# HELP {name} {help_text} (seconds)")
+            lines.append(f"# TYPE {name} summary")
+            for labels, (samples, count, total) in sorted(summaries.get(kind, {}).items()):
+                for q in QUANTILES:
+                    lines.append(f"{name}{_format_labels(labels, ('quantile', str(q)))} {_quantile(samples, q):.6f}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+            name = f"jarvis_{kind}_total"
+            lines.append(f"# HELP {name} {help_text} (count by status)")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(counters.get(kind, {}).items()):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        lines.append("# HELP jarvis_in_flight Spans currently in progress")
+        lines.append("# TYPE jarvis_in_flight gauge")
+        for kind in sorted(set(SPAN_HELP) | set(in_flight)):
+            lines.append(f"jarvis_in_flight{_format_labels((('kind', kind),))} {in_flight.get(kind, 0)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _quantile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank quantile of pre-sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+METRICS = MetricsRegistry()
+
+# Spans recorded during the current conversation turn, if one is being traced
+_turn_spans: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("jarvis_turn_spans", default=None)
+
+
+class SpanClock:
+    """Handed out by span(); time inside `paused()` is left out of the span."""
+
+    __slots__ = ('start', 'paused_seconds')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.paused_seconds = 0.0
+
+    @contextmanager
+    def paused(self):
+        """Exclude a block (e.g. a generator's yield to a slow consumer) from the span."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.paused_seconds += time.perf_counter() - start
+
+    def elapsed(self) -> float:
+        """Seconds since the span started, minus paused time."""
+        return time.perf_counter() - self.start - self.paused_seconds
+
+
+def record_span(kind: str, seconds: float, status: str = "ok", **labels):
+    """Record a span timed by the caller."""
+    key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+    METRICS.observe(kind, seconds, key, status)
+    spans = _turn_spans.get()
+    if spans is not None:
+        spans.append((kind, labels, seconds))
+
+
+@contextmanager
+def span(kind: str, **labels):
+    """
+    Time a block and record it under a span kind.
+
+    Usable from sync and async code. Exceptions are recorded with
+    status="error" (cancellation as status="cancelled") and re-raised.
+
+    Args:
+        kind: Span kind (see SPAN_HELP)
+        **labels: Extra Prometheus labels, e.g. tool="get_weather"
+
+    Yields:
+        SpanClock: Use `clock.paused()` around time that should not count
+    """
+    status = "ok"
+    METRICS.enter(kind)
+    clock = SpanClock()
+    try:
+        yield clock
+    except Exception:
+        status = "error"
+        raise
+    except BaseException:
+        status = "cancelled"
+        raise
+    finally:
+        METRICS.exit(kind)
+        record_span(kind, clock.elapsed(), status, **labels)
+
+
+def start_turn_trace():
+    """Start collecting spans for the conversation turn running in this context."""
+    _turn_spans.set([])
+
+
+def finish_turn_trace(total_seconds: float):
+    """Log where the current turn spent its time and stop collecting spans."""
+    spans = _turn_spans.get()
+    _turn_spans.set(None)
+    if spans is None:
+        return
+
+    breakdown = defaultdict(lambda: [0, 0.0])
+    for kind, labels, seconds in spans:
+        if kind == 'turn':
+            continue
+        detail = labels.get('tool') or labels.get('host') or labels.get('table') or ""
+        key = f"{kind} {detail}".strip()
+        breakdown[key][0] += 1
+        breakdown[key][1] += seconds
+
+    parts = [f"{key} {seconds:.2f}s" + (f" x{count}" if count > 1 else "")
+             for key, (count, seconds) in sorted(breakdown.items(), key=lambda item: -item[1][1])]
+    logger.info(f"Turn took {total_seconds:.2f}s" + (f": {', '.join(parts)}" if parts else ""))
+
+
+# ===== OUTBOUND HTTP =====
+
+_http_installed = False
+
+
+def install_http_instrumentation():
+    """Time every outbound `requests` call by host (idempotent)."""
+    global _http_installed
+    if _http_installed:
+        return
+    import requests
+
+    original_send = requests.Session.send
+
+    def timed_send(session, request, **kwargs):
+        host = urlparse(request.url).hostname or "unknown"
+        with span('http', host=host):
+            return original_send(session, request, **kwargs)
+
+    requests.Session.send = timed_send
+    _http_installed = True
+
+
+# ===== SQLITE =====
+
+_SQL_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?:\s+IF\s+(?:NOT\s+)?EXISTS)?)\s+([A-Za-z_][A-Za-z0-9_]*)",
+                           re.IGNORECASE)
+
+
+def _sql_labels(sql: str) -> Dict[str, str]:
+    """op/table labels for a SQL statement."""
+    words = sql.split(None, 1)
+    op = words[0].upper() if words else "UNKNOWN"
+    match = _SQL_TABLE_RE.search(sql)
+    return {'op': op, 'table': match.group(1) if match else ""}
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor whose statements are recorded as sqlite spans."""
+
+    def execute(self, sql, parameters=()):
+        with span('sqlite', **_sql_labels(sql)):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with span('sqlite', **_sql_labels(sql)):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory producing TimedCursor cursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
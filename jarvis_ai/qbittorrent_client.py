@@ -0,0 +1,154 @@
+"""
+Shared HTTP client for the qBittorrent Web API.
+One keep-alive session that logs in once and keeps the session cookie (whatever
+it is named), logging in again only when qBittorrent answers 403 (session
+expired or WebUI restarted), instead of a fresh login before every query.
+"""
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config_helper as config
+
+logger = logging.getLogger(__name__)
+
+# Default timeout (seconds) for qBittorrent calls that don't pass their own
+DEFAULT_TIMEOUT = 10
+
+
+class QBittorrentAuthError(Exception):
+    """qBittorrent rejected the configured credentials (or banned this IP)."""
+
+
+class QBittorrentClient:
+    """Pooled qBittorrent session that re-authenticates only when the WebUI session expires."""
+
+    def __init__(self, base_url: str, username: str = "", password: str = "",
+                 timeout: float = DEFAULT_TIMEOUT, retries: int = 2, backoff_factor: float = 0.3):
+        """
+        Args:
+            base_url: qBittorrent WebUI URL (e.g. http://192.168.1.20:8080)
+            username: WebUI username (empty when auth is bypassed for this host)
+            password: WebUI password
+            timeout: Default request timeout in seconds
+            retries: Retries for connection errors and 502/503/504 responses
+            backoff_factor: Exponential backoff factor between retries
+        """
+        self.base_url = (base_url or "").rstrip("/")
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._login_lock = threading.Lock()
+        # Bumped on every successful login (0 = not logged in)
+        self._login_count = 0
+
+        self.session = requests.Session()
+        # qBittorrent's CSRF check compares Referer with the WebUI host
+        self.session.headers.update({"Referer": self.base_url})
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def configured(self) -> bool:
+        """True if the WebUI URL is set."""
+        return bool(self.base_url)
+
+    @property
+    def uses_auth(self) -> bool:
+        """True if credentials are configured (otherwise the WebUI must allow this host)."""
+        return bool(self.username and self.password)
+
+    @property
+    def logged_in(self) -> bool:
+        """True once a login succeeded (the session holds its cookie)."""
+        return self._login_count > 0
+
+    def url(self, path: str) -> str:
+        """Build a full URL from an API path like /api/v2/app/version."""
+        return f"{self.base_url}{path}"
+
+    def login(self, stale_login: Optional[int] = None):
+        """
+        Log in; the session keeps the cookie qBittorrent sets for later requests.
+
+        Success is read from the "Ok."/"Fails." body rather than a cookie name,
+        since WebUI\\SessionCookieName or a reverse proxy can rename the cookie.
+
+        Args:
+            stale_login: Login count when a request was just rejected; if another
+                thread has logged in again since, the login is skipped
+
+        Raises:
+            QBittorrentAuthError: If the credentials are rejected
+        """
+        with self._login_lock:
+            if self.logged_in and self._login_count != stale_login:
+                return
+            response = self.session.post(
+                self.url("/api/v2/auth/login"),
+                data={"username": self.username, "password": self.password},
+                timeout=self.timeout,
+            )
+            if response.status_code != 200 or "Fails" in response.text:
+                if response.status_code == 403:
+                    raise QBittorrentAuthError("qBittorrent banned this IP after too many failed logins")
+                raise QBittorrentAuthError("qBittorrent authentication failed")
+            self._login_count += 1
+            logger.debug("Logged in to qBittorrent")
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request, logging in first if needed and once more on 403."""
+        kwargs.setdefault("timeout", self.timeout)
+        if self.uses_auth and not self.logged_in:
+            self.login()
+        login = self._login_count
+        response = self.session.request(method, self.url(path), **kwargs)
+        if response.status_code == 403 and self.uses_auth:
+            logger.info("qBittorrent session expired, logging in again")
+            self.login(stale_login=login)
+            response = self.session.request(method, self.url(path), **kwargs)
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        """GET a qBittorrent API path."""
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        """POST to a qBittorrent API path."""
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+
+_client: Optional[QBittorrentClient] = None
+_client_lock = threading.Lock()
+
+
+def get_qbittorrent_client() -> QBittorrentClient:
+    """Get the process-wide qBittorrent client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = QBittorrentClient(config.QBITTORRENT_URL, config.QBITTORRENT_USERNAME,
+                                            config.QBITTORRENT_PASSWORD)
+                logger.info(f"qBittorrent client ready for {config.QBITTORRENT_URL}")
+    return _client
@@ -28,6 +28,13 @@ export UNIFI_CONTROLLER_API_TOKEN=$(bashio::config 'unifi_controller_api_token')
 export UNIFI_CONTROLLER_USERNAME=$(bashio::config 'unifi_controller_username')
 export UNIFI_CONTROLLER_PASSWORD=$(bashio::config 'unifi_controller_password')
 export UNIFI_SITE_ID=$(bashio::config 'unifi_site_id')
+export MAX_CONVERSATIONS=$(bashio::config 'max_conversations')
+export CONVERSATION_TIMEOUT_MINUTES=$(bashio::config 'conversation_timeout_minutes')
+export HISTORY_TOKEN_BUDGET=$(bashio::config 'history_token_budget')
+export HISTORY_KEEP_EXCHANGES=$(bashio::config 'history_keep_exchanges')
+export STREAM_RESPONSES=$(bashio::config 'stream_responses')
+export MEMORY_EMBEDDER=$(bashio::config 'memory_embedder')
+export MEMORY_RECALL_LIMIT=$(bashio::config 'memory_recall_limit')
 
 
 # Home Assistant connection (auto-provided by add-on framework)
@@ -0,0 +1,448 @@
+"""
+Semantic recall for Jarvis memory.
+Past exchanges and learned facts are embedded and kept as float32 rows in a
+memory-mapped vector file next to the SQLite database (which maps each row to
+its text), so the prompt can carry only the few entries most similar to what
+the user just said instead of an ever-growing history.
+"""
+import heapq
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+import zlib
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python scoring fallback
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Dimensions of the default hashing embedder
+HASHING_DIM = 512
+
+# Vertex AI embedding model used by the "vertex" embedder
+VERTEX_EMBEDDING_MODEL = "text-embedding-004"
+
+# Texts per embedding request when (re)indexing
+EMBED_BATCH_SIZE = 32
+
+# Vector file capacity grows in steps of this many rows
+VECTOR_FILE_GROWTH = 1024
+
+# Cosine similarity below which a memory is not considered relevant
+MIN_RECALL_SCORE = 0.3
+
+SOURCE_CONTEXT = "context"
+SOURCE_FACT = "fact"
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Words too common to say anything about what an exchange was about
+# ("user"/"you" are the exchange labels themselves)
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'at', 'be', 'for', 'i', 'in', 'is', 'it', 'me', 'my', 'of',
+    'on', 'please', 'sir', 'the', 'to', 'user', 'what', 'you', 'your',
+})
+
+Statement = Tuple[str, Sequence]
+
+
+def format_exchange(user: str, assistant: str) -> str:
+    """Text indexed for a conversation exchange (as shown in the prompt)."""
+    return f"User: {user}\nYou: {assistant}"
+
+
+def format_fact(entity_id: str, fact_key: str, fact_value: str) -> str:
+    """Text indexed for a learned fact."""
+    return f"{entity_id} {fact_key}: {fact_value}".replace("_", " ")
+
+
+def _timestamp(when: Optional[datetime] = None) -> str:
+    """UTC timestamp in SQLite CURRENT_TIMESTAMP format."""
+    return (when or datetime.utcnow()).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+# ===== EMBEDDERS =====
+
+class HashingEmbedder:
+    """
+    Local embedder: signed feature hashing of words and word pairs.
+
+    No model or network needed; similar wording gives similar vectors,
+    which is enough to find the exchange about "the garden camera" again.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM):
+        """
+        Args:
+            dim: Vector dimensions
+        """
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in _WORD_RE.findall(text.lower()) if w not in STOP_WORDS]
+        # Crude stemming so "lights"/"light" and "playing"/"play" share a feature
+        words = [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words]
+        words = [w[:-3] if len(w) > 5 and w.endswith("ing") else w for w in words]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode("utf-8"))
+                weight = 0.5 if " " in feature else 1.0
+                vector[h % self.dim] += weight if (h >> 16) & 1 else -weight
+            vectors.append(_normalize(vector))
+        return vectors
+
+
+class VertexEmbedder:
+    """
+    Vertex AI text embeddings.
+
+    Calls the regional prediction endpoint directly rather than through
+    vertexai.init(), which is process-global and would move the chat model to
+    the embedding region.
+    """
+
+    def __init__(self, model_name: str = VERTEX_EMBEDDING_MODEL, dim: int = 768,
+                 project: Optional[str] = None, location: Optional[str] = None):
+        """
+        Args:
+            model_name: Vertex AI embedding model
+            dim: Output dimensions of the model
+            project: GCP project (without one, the existing vertexai.init settings are used)
+            location: GCP region of the embedding endpoint
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.project = project
+        self.location = location or "us-central1"
+        self.name = f"vertex-{model_name}"
+        self._client = None
+        self._model = None
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not self.project:
+            # Reuse whatever project/region the process already initialised
+            if self._model is None:
+                from vertexai.language_models import TextEmbeddingModel
+                self._model = TextEmbeddingModel.from_pretrained(self.model_name)
+            return [_normalize(list(e.values)) for e in self._model.get_embeddings(texts)]
+
+        from google.cloud import aiplatform_v1
+        from google.protobuf import json_format, struct_pb2
+        if self._client is None:
+            self._client = aiplatform_v1.PredictionServiceClient(
+                client_options={"api_endpoint": f"{self.location}-aiplatform.googleapis.com"})
+        endpoint = (f"projects/{self.project}/locations/{self.location}"
+                    f"/publishers/google/models/{self.model_name}")
+        instances = [json_format.ParseDict({"content": text}, struct_pb2.Value()) for text in texts]
+        response = self._client.predict(endpoint=endpoint, instances=instances)
+        return [_normalize(list(prediction["embeddings"]["values"])) for prediction in response.predictions]
+
+
+def create_embedder(kind: str, project: Optional[str] = None, location: Optional[str] = None):
+    """
+    Build the configured embedder.
+
+    Args:
+        kind: "hashing" (local, default), "vertex", or "off"
+        project: GCP project for the vertex embedder
+        location: GCP region for the vertex embedder
+
+    Returns:
+        Embedder, or None when semantic recall is disabled
+    """
+    kind = (kind or "hashing").lower()
+    if kind in ("off", "none", "disabled"):
+        return None
+    if kind == "vertex":
+        return VertexEmbedder(project=project, location=location)
+    if kind != "hashing":
+        logger.warning(f"Unknown memory embedder '{kind}', using hashing")
+    return HashingEmbedder()
+
+
+# ===== VECTOR FILE =====
+
+class VectorFile:
+    """Fixed-width float32 rows in a memory-mapped file (anonymous memory if no path)."""
+
+    def __init__(self, path: Optional[str], dim: int):
+        """
+        Args:
+            path: Vector file, created if missing; None keeps vectors in memory only
+            dim: Floats per row
+        """
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self._fd = None
+        self._mm: Optional[mmap.mmap] = None
+        self._view = None
+        self._matrix = None
+        self.capacity = 0
+
+        if path is not None:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            size = os.fstat(self._fd).st_size
+            # A torn tail row from a crash is dropped
+            self.capacity = size // self.row_bytes
+        self._map(max(self.capacity, VECTOR_FILE_GROWTH))
+
+    def _map(self, capacity: int):
+        """(Re)map the rows at a new capacity, keeping their contents."""
+        old_mm, old_capacity = self._mm, self.capacity
+        if self._fd is not None:
+            if os.fstat(self._fd).st_size < capacity * self.row_bytes:
+                os.ftruncate(self._fd, capacity * self.row_bytes)
+            mm = mmap.mmap(self._fd, capacity * self.row_bytes)
+        else:
+            mm = mmap.mmap(-1, capacity * self.row_bytes)
+            if old_mm is not None:
+                mm[:old_capacity * self.row_bytes] = old_mm[:old_capacity * self.row_bytes]
+        self._unmap()
+        self._mm = mm
+        self.capacity = capacity
+        self._view = memoryview(mm).cast("f")
+        if np is not None:
+            self._matrix = np.frombuffer(mm, dtype=np.float32).reshape(capacity, self.dim)
+
+    def _unmap(self):
+        if self._mm is None:
+            return
+        # Views into the map must be released before it can be closed
+        self._matrix = None
+        self._view.release()
+        self._view = None
+        if self._fd is not None:
+            self._mm.flush()
+        self._mm.close()
+        self._mm = None
+
+    def ensure(self, rows: int):
+        """Grow the file to hold at least `rows` rows."""
+        if rows > self.capacity:
+            self._map(VECTOR_FILE_GROWTH * math.ceil(rows / VECTOR_FILE_GROWTH))
+
+    def write(self, row: int, vector: Sequence[float]):
+        self.ensure(row + 1)
+        start = row * self.dim
+        self._view[start:start + self.dim] = array("f", vector)
+
+    def clear(self, row: int):
+        if row < self.capacity:
+            start = row * self.row_bytes
+            self._mm[start:start + self.row_bytes] = bytes(self.row_bytes)
+
+    def is_empty(self, row: int) -> bool:
+        if row >= self.capacity:
+            return True
+        start = row * self.row_bytes
+        return not any(self._mm[start:start + self.row_bytes])
+
+    def scores(self, query: Sequence[float], rows: List[int]) -> List[float]:
+        """Dot products of the query with the given rows."""
+        if not rows:
+            return []
+        if self._matrix is not None:
+            q = np.asarray(query, dtype=np.float32)
+            return (self._matrix[rows] @ q).tolist()
+        # Only the query's non-zero dimensions contribute (few, for hashed vectors)
+        nonzero = [(i, v) for i, v in enumerate(query) if v]
+        view, dim = self._view, self.dim
+        return [sum(v * view[row * dim + i] for i, v in nonzero) for row in rows]
+
+    def flush(self):
+        if self._fd is not None and self._mm is not None:
+            self._mm.flush()
+
+    def close(self):
+        self._unmap()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# ===== INDEX =====
+
+class _Entry:
+    __slots__ = ("source", "key", "text", "created_at")
+
+    def __init__(self, source: str, key: Optional[str], text: str, created_at: str):
+        self.source = source
+        self.key = key
+        self.text = text
+        self.created_at = created_at
+
+
+class SemanticIndex:
+    """
+    Top-k similarity search over embedded memories.
+
+    The vector file holds one row per slot; the memory_vectors table maps
+    slots to their source, key and text. Mutating methods update the
+    in-memory index at once and return the SQL statements that persist the
+    change, so Memory commits them through its normal (write-behind) path.
+    """
+
+    def __init__(self, vector_path: Optional[str], embedder):
+        """
+        Args:
+            vector_path: Memory-mapped vector file (None for in-memory only)
+            embedder: Object with .name, .dim and .embed(texts) -> vectors
+        """
+        self.embedder = embedder
+        self.vectors = VectorFile(vector_path, embedder.dim)
+        self._entries: Dict[int, _Entry] = {}
+        self._keys: Dict[Tuple[str, str], int] = {}
+        self._free: List[int] = []
+        self._next_slot = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, rows: Iterable) -> List[Statement]:
+        """
+        Load (slot, source, key, text, created_at, embedder) rows.
+
+        Rows whose vector is missing (not flushed before a crash) or was made
+        by a different embedder are re-embedded from their stored text.
+
+        Returns:
+            Statements recording the embedder for re-embedded rows
+        """
+        stale = []
+        with self._lock:
+            for slot, source, key, text, created_at, embedder_name in rows:
+                self._entries[slot] = _Entry(source, key, text, created_at)
+                if key is not None:
+                    self._keys[(source, key)] = slot
+                if embedder_name != self.embedder.name or self.vectors.is_empty(slot):
+                    stale.append(slot)
+            self._next_slot = max(self._entries, default=-1) + 1
+            self._free = [slot for slot in range(self._next_slot) if slot not in self._entries]
+            for slot in self._free:
+                self.vectors.clear(slot)
+
+            for i in range(0, len(stale), EMBED_BATCH_SIZE):
+                batch = stale[i:i + EMBED_BATCH_SIZE]
+                for slot, vector in zip(batch, self.embedder.embed([self._entries[s].text for s in batch])):
+                    self.vectors.write(slot, vector)
+            self.vectors.flush()
+
+        if stale:
+            logger.info(f"Re-embedded {len(stale)} memories with {self.embedder.name}")
+        logger.info(f"Semantic memory loaded: {len(self._entries)} entries ({self.embedder.name})")
+        return [("UPDATE memory_vectors SET embedder = ? WHERE slot = ?", (self.embedder.name, slot))
+                for slot in stale]
+
+    def add(self, source: str, text: str, key: Optional[str] = None) -> List[Statement]:
+        """Embed and index a memory; a keyed memory replaces the previous one with that key."""
+        vector = self.embedder.embed([text])[0]
+        created_at = _timestamp()
+        with self._lock:
+            slot = self._keys.get((source, key)) if key is not None else None
+            if slot is None:
+                slot = self._free.pop() if self._free else self._next_slot
+                self._next_slot = max(self._next_slot, slot + 1)
+            self.vectors.write(slot, vector)
+            self._entries[slot] = _Entry(source, key, text, created_at)
+            if key is not None:
+                self._keys[(source, key)] = slot
+        return [("""
+            INSERT OR REPLACE INTO memory_vectors (slot, source, key, text, created_at, embedder)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (slot, source, key, text, created_at, self.embedder.name))]
+
+    def _drop(self, slots: List[int]) -> List[Statement]:
+        """Remove slots (caller holds the lock)."""
+        for slot in slots:
+            entry = self._entries.pop(slot)
+            if entry.key is not None:
+                self._keys.pop((entry.source, entry.key), None)
+            self.vectors.clear(slot)
+            self._free.append(slot)
+        return [("DELETE FROM memory_vectors WHERE slot = ?", (slot,)) for slot in slots]
+
+    def remove(self, source: str, key: str) -> List[Statement]:
+        """Remove a keyed memory."""
+        with self._lock:
+            slot = self._keys.get((source, key))
+            return self._drop([slot]) if slot is not None else []
+
+    def clear(self, source: Optional[str] = None) -> List[Statement]:
+        """Remove every memory (of one source)."""
+        with self._lock:
+            self._drop([slot for slot, entry in self._entries.items()
+                        if source is None or entry.source == source])
+        if source is None:
+            return [("DELETE FROM memory_vectors", ())]
+        return [("DELETE FROM memory_vectors WHERE source = ?", (source,))]
+
+    def prune(self, source: str, before: datetime) -> List[Statement]:
+        """Remove memories of a source created before a (UTC) time."""
+        cutoff = _timestamp(before)
+        with self._lock:
+            slots = [slot for slot, entry in self._entries.items()
+                     if entry.source == source and entry.created_at < cutoff]
+            if not slots:
+                return []
+            self._drop(slots)
+        return [("DELETE FROM memory_vectors WHERE source = ? AND created_at < ?", (source, cutoff))]
+
+    def search(self, query: str, limit: int = 3, sources: Optional[Iterable[str]] = None,
+               min_score: float = MIN_RECALL_SCORE) -> List[Dict]:
+        """
+        Find the memories most similar to a query.
+
+        Args:
+            query: Text to compare against (usually the user's request)
+            limit: Maximum results
+            sources: Only search these sources (default all)
+            min_score: Minimum cosine similarity
+
+        Returns:
+            List of {'source', 'key', 'text', 'created_at', 'score'}, best first
+        """
+        if not query or not self._entries:
+            return []
+        vector = self.embedder.embed([query])[0]
+        sources = set(sources) if sources is not None else None
+        with self._lock:
+            slots = [slot for slot, entry in self._entries.items()
+                     if sources is None or entry.source in sources]
+            scored = zip(self.vectors.scores(vector, slots), slots)
+            best = heapq.nlargest(limit, ((s, slot) for s, slot in scored if s >= min_score))
+            return [{'source': self._entries[slot].source,
+                     'key': self._entries[slot].key,
+                     'text': self._entries[slot].text,
+                     'created_at': self._entries[slot].created_at,
+                     'score': round(score, 3)}
+                    for score, slot in best]
+
+    def flush(self):
+        with self._lock:
+            self.vectors.flush()
+
+    def close(self):
+        with self._lock:
+            self.vectors.close()
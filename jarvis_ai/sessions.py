@@ -0,0 +1,110 @@
+"""
+Per-conversation chat sessions for Jarvis.
+Each conversation_id (HTTP API or Wyoming transcript context) gets its own Gemini chat,
+bounded by an LRU cap and an idle TTL so a long-running add-on stays small.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Used when a caller does not supply a conversation_id
+DEFAULT_CONVERSATION_ID = "default"
+
+
+class ConversationSession:
+    """A single conversation: its chat plus a lock so its turns never interleave."""
+
+    def __init__(self, conversation_id: str, chat):
+        self.conversation_id = conversation_id
+        self.chat = chat
+        self.lock = asyncio.Lock()
+        # System prompt sent with the opening message, and the rolling summary
+        # of exchanges folded out of the chat history by the compactor
+        self.preamble: Optional[str] = None
+        self.summary = ""
+        # Memory texts already in this chat (recent context and recalled
+        # memories), so semantic recall never repeats them
+        self.recalled: Set[str] = set()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    def touch(self):
+        """Mark the session as used now."""
+        self.last_used = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        """Seconds since the session was last used."""
+        return time.monotonic() - self.last_used
+
+
+class SessionManager:
+    """
+    Keeps one ConversationSession per conversation_id.
+
+    Sessions are evicted when idle for longer than ttl_seconds, and the least
+    recently used session is evicted once more than max_sessions are live.
+    """
+
+    def __init__(self, chat_factory: Callable, max_sessions: int = 32, ttl_seconds: float = 1800):
+        """
+        Args:
+            chat_factory: Callable returning a fresh chat (e.g. model.start_chat)
+            max_sessions: Maximum number of live sessions
+            ttl_seconds: Idle time after which a session is discarded
+        """
+        self._chat_factory = chat_factory
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+
+    def get(self, conversation_id: Optional[str] = None) -> ConversationSession:
+        """Get the session for conversation_id, creating it if needed."""
+        conversation_id = conversation_id or DEFAULT_CONVERSATION_ID
+        self.evict_expired()
+
+        session = self._sessions.get(conversation_id)
+        if session is None:
+            session = ConversationSession(conversation_id, self._chat_factory())
+            self._sessions[conversation_id] = session
+            logger.info(f"Started conversation session '{conversation_id}' ({len(self._sessions)} live)")
+            self._evict_overflow()
+        else:
+            self._sessions.move_to_end(conversation_id)
+
+        session.touch()
+        return session
+
+    def reset(self, conversation_id: Optional[str] = None):
+        """Drop one session, or all sessions if conversation_id is None."""
+        if conversation_id is None:
+            self._sessions.clear()
+        else:
+            self._sessions.pop(conversation_id, None)
+
+    def evict_expired(self) -> int:
+        """Discard sessions idle for longer than the TTL. Returns the number evicted."""
+        if not self.ttl_seconds:
+            return 0
+        expired = [cid for cid, s in self._sessions.items()
+                   if s.idle_seconds() > self.ttl_seconds and not s.lock.locked()]
+        for cid in expired:
+            del self._sessions[cid]
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle conversation session(s)")
+        return len(expired)
+
+    def _evict_overflow(self):
+        """Evict least recently used sessions beyond max_sessions."""
+        while len(self._sessions) > self.max_sessions:
+            cid, _ = self._sessions.popitem(last=False)
+            logger.info(f"Evicted least recently used conversation session '{cid}'")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._sessions
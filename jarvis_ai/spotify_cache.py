@@ -0,0 +1,255 @@
+"""
+Spotify search result cache for Jarvis.
+Resolved play_music queries are kept in an LRU with a TTL, persisted in the
+memory database so they survive restarts; repeat requests skip the Spotify
+round trip entirely, and frequently requested items are refreshed in the
+background before they expire.
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from spotify_client import search_spotify
+
+logger = logging.getLogger(__name__)
+
+# Cached queries kept (least recently used are evicted first)
+CACHE_MAX_ENTRIES = 512
+
+# Seconds a resolved query is served without asking Spotify again
+CACHE_TTL_SECONDS = 3 * 86400
+
+# Requests after which an entry counts as popular and is refreshed ahead of expiry
+POPULAR_HITS = 3
+
+# Popular entries older than this share of the TTL are refreshed in the background
+REFRESH_AGE_FRACTION = 0.5
+
+# Seconds between background refresh passes, and entries refreshed per pass
+REFRESH_INTERVAL_SECONDS = 3600
+REFRESH_BATCH = 20
+
+# Hit counts are written back once this many entries changed (or on each refresh pass)
+PERSIST_BATCH = 20
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalise_query(query: str) -> str:
+    """Case, accent-width, punctuation and spacing insensitive cache key."""
+    text = unicodedata.normalize("NFKC", query or "").casefold()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class SpotifySearchCache:
+    """
+    TTL + LRU cache of normalised search queries to resolved Spotify items.
+
+    Entries are dicts with search_text (the query as first asked, used for
+    refreshes), uri, name, fetched_at, hits and last_used. Misses (Spotify
+    found nothing) are not cached, so a later release still resolves.
+    """
+
+    def __init__(self, memory=None, search: Callable[[str], Optional[Tuple[str, str]]] = search_spotify,
+                 max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        """
+        Args:
+            memory: Memory used to persist entries (None keeps the cache in process only)
+            search: Function resolving a query to (uri, name) or None
+            max_entries: Entries kept before least recently used ones are evicted
+            ttl: Seconds an entry is served before it is resolved again
+        """
+        self.memory = memory
+        self.search = search
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # Keys whose hits/last_used changed since they were last written
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._load()
+
+    def _load(self):
+        """Warm the cache with the most requested entries from the database."""
+        if self.memory is None:
+            return
+        try:
+            self.memory.prune_spotify_cache(self.max_entries)
+            rows = self.memory.get_spotify_cache_entries(self.max_entries)
+        except Exception as e:
+            logger.warning(f"Could not load Spotify search cache: {e}")
+            return
+        # Least recently used first, so OrderedDict order matches recency
+        for row in sorted(rows, key=lambda r: r['last_used'] or 0):
+            self._entries[row['query']] = {
+                'search_text': row['search_text'],
+                'uri': row['uri'],
+                'name': row['name'],
+                'fetched_at': row['fetched_at'],
+                'hits': row['hits'] or 0,
+                'last_used': row['last_used'] or row['fetched_at'],
+            }
+        if self._entries:
+            logger.info(f"Loaded {len(self._entries)} cached Spotify searches")
+
+    def _persist(self, *keys: str):
+        """Write entries to the database (dropping them from the dirty set)."""
+        with self._lock:
+            self._dirty.difference_update(keys)
+            entries = [dict(self._entries[key], query=key) for key in keys if key in self._entries]
+        if entries and self.memory is not None:
+            self.memory.save_spotify_cache_entries(entries)
+
+    def _mark_used(self, key: str):
+        """Queue an entry's new hit count for the next batched write."""
+        with self._lock:
+            self._dirty.add(key)
+            due = len(self._dirty) >= PERSIST_BATCH
+        if due:
+            self.persist_hits()
+
+    def persist_hits(self):
+        """Write back the hit counts and last-used times changed since the last write."""
+        with self._lock:
+            keys = list(self._dirty)
+        self._persist(*keys)
+
+    def _store(self, key: str, entry: Dict):
+        """Insert or update an entry, evicting the least recently used past max_entries."""
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+        self._persist(key)
+        if evicted and self.memory is not None:
+            self.memory.delete_spotify_cache_entries(evicted)
+
+    def resolve(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        Resolve a query to a Spotify item, from the cache when fresh.
+
+        A stale entry is still served if Spotify cannot be reached.
+
+        Returns:
+            (uri, display name), or None if Spotify has no match
+        """
+        self._start_refresher()
+        key = normalise_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry = dict(entry, hits=entry['hits'] + 1, last_used=now)
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+
+        if entry is not None and now - entry['fetched_at'] < self.ttl:
+            logger.debug(f"Spotify search cache hit: '{key}' -> {entry['uri']}")
+            self._mark_used(key)
+            return entry['uri'], entry['name']
+
+        try:
+            result = self.search(query)
+        except Exception as e:
+            if entry is None:
+                raise
+            logger.warning(f"Spotify search failed, using cached result for '{key}': {e}")
+            self._mark_used(key)
+            return entry['uri'], entry['name']
+
+        if result is None:
+            return None
+        uri, name = result
+        self._store(key, {
+            'search_text': entry['search_text'] if entry else query,
+            'uri': uri,
+            'name': name,
+            'fetched_at': time.time(),
+            'hits': entry['hits'] if entry else 1,
+            'last_used': now,
+        })
+        return uri, name
+
+    # ===== BACKGROUND REFRESH =====
+
+    def _start_refresher(self):
+        if self._refresher is None:
+            with self._lock:
+                if self._refresher is None:
+                    self._refresher = threading.Thread(target=self._refresh_loop,
+                                                       name="spotify-cache-refresh", daemon=True)
+                    self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(REFRESH_INTERVAL_SECONDS):
+            try:
+                self.persist_hits()
+                self.refresh_popular()
+            except Exception as e:
+                logger.warning(f"Spotify search cache refresh failed: {e}")
+
+    def refresh_popular(self, limit: int = REFRESH_BATCH) -> int:
+        """
+        Re-resolve the most requested entries that are past REFRESH_AGE_FRACTION
+        of their TTL, so they are fresh when next requested.
+
+        Returns:
+            int: Entries refreshed
+        """
+        cutoff = time.time() - self.ttl * REFRESH_AGE_FRACTION
+        with self._lock:
+            due = [(key, dict(entry)) for key, entry in self._entries.items()
+                   if entry['hits'] >= POPULAR_HITS and entry['fetched_at'] < cutoff]
+        due.sort(key=lambda item: item[1]['hits'], reverse=True)
+
+        refreshed = 0
+        for key, entry in due[:limit]:
+            if self._stop.is_set():
+                break
+            # Search with the words the user asked, not the normalised key ("AC/DC", not "ac dc")
+            result = self.search(entry['search_text'])
+            if result is None:
+                continue
+            with self._lock:
+                current = self._entries.get(key)
+                if current is None:
+                    # Evicted while we were searching
+                    continue
+                self._entries[key] = dict(current, uri=result[0], name=result[1], fetched_at=time.time())
+            self._persist(key)
+            refreshed += 1
+        if refreshed:
+            logger.info(f"Refreshed {refreshed} popular Spotify searches")
+        return refreshed
+
+    def stop(self):
+        """Stop the background refresh thread and write back pending hit counts."""
+        self._stop.set()
+        self.persist_hits()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[SpotifySearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_spotify_search_cache(memory=None) -> SpotifySearchCache:
+    """Get the process-wide search cache (persisted in memory when given on first use)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SpotifySearchCache(memory)
+    return _cache
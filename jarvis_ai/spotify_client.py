@@ -0,0 +1,148 @@
+"""
+Shared Spotify Web API client for Jarvis.
+One long-lived spotipy client whose client-credentials token is cached and
+refreshed ahead of expiry, over a pooled keep-alive session, instead of a new
+client and token exchange for every play_music call.
+"""
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config_helper as config
+
+# Spotify support (optional)
+try:
+    import spotipy
+    from spotipy.cache_handler import MemoryCacheHandler
+    from spotipy.oauth2 import SpotifyClientCredentials
+    SPOTIFY_AVAILABLE = True
+except ImportError:
+    SPOTIFY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Refresh the access token this many seconds before it expires (tokens last an hour)
+TOKEN_REFRESH_MARGIN = 300
+
+# Timeout (seconds) for Spotify API and token requests
+REQUEST_TIMEOUT = 10
+
+
+def _build_session(pool_maxsize: int = 4, retries: int = 3, backoff_factor: float = 0.3) -> requests.Session:
+    """Keep-alive session shared by API calls and token exchanges."""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
+
+
+if SPOTIFY_AVAILABLE:
+    class CachedClientCredentials(SpotifyClientCredentials):
+        """
+        Client-credentials auth that refreshes TOKEN_REFRESH_MARGIN seconds
+        early, with one exchange at a time even when calls race.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._token_lock = threading.Lock()
+
+        def is_token_expired(self, token_info) -> bool:
+            return token_info["expires_at"] - int(time.time()) < TOKEN_REFRESH_MARGIN
+
+        def get_access_token(self, as_dict=False, check_cache=True):
+            with self._token_lock:
+                return super().get_access_token(as_dict=as_dict, check_cache=check_cache)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_spotify_client():
+    """
+    Get the process-wide spotipy client.
+
+    Returns:
+        spotipy.Spotify, or None if spotipy is missing or credentials are not configured
+    """
+    global _client
+    if not SPOTIFY_AVAILABLE or not config.SPOTIPY_CLIENT_ID or not config.SPOTIPY_CLIENT_SECRET:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                session = _build_session()
+                auth_manager = CachedClientCredentials(
+                    client_id=config.SPOTIPY_CLIENT_ID,
+                    client_secret=config.SPOTIPY_CLIENT_SECRET,
+                    requests_session=session,
+                    requests_timeout=REQUEST_TIMEOUT,
+                    # The default handler writes a .cache file into the working directory
+                    cache_handler=MemoryCacheHandler(),
+                )
+                _client = spotipy.Spotify(
+                    auth_manager=auth_manager,
+                    requests_session=session,
+                    requests_timeout=REQUEST_TIMEOUT,
+                )
+                logger.info("Spotify client ready")
+    return _client
+
+
+def warm_spotify_token() -> bool:
+    """Fetch the access token ahead of the first request (no-op if Spotify is off)."""
+    client = get_spotify_client()
+    if client is None:
+        return False
+    try:
+        client.auth_manager.get_access_token()
+        return True
+    except Exception as e:
+        logger.warning(f"Spotify token prefetch failed: {e}")
+        return False
+
+
+def search_spotify(query: str) -> Optional[Tuple[str, str]]:
+    """
+    Resolve a free-text request to the best Spotify item.
+
+    Tracks win over albums, then artists, then playlists.
+
+    Returns:
+        (uri, display name), or None if Spotify has no match
+    """
+    client = get_spotify_client()
+    if client is None:
+        return None
+    results = client.search(q=query, limit=1, type='track,album,artist,playlist')
+
+    if results['tracks']['items']:
+        item = results['tracks']['items'][0]
+        return item['uri'], f"{item['name']} by {item['artists'][0]['name']}"
+    if results['albums']['items']:
+        item = results['albums']['items'][0]
+        return item['uri'], f"Album: {item['name']}"
+    if results['artists']['items']:
+        item = results['artists']['items'][0]
+        return item['uri'], f"Artist: {item['name']}"
+    if results['playlists']['items']:
+        item = results['playlists']['items'][0]
+        return item['uri'], f"Playlist: {item['name']}"
+    return None
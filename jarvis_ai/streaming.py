@@ -0,0 +1,56 @@
+"""
+Sentence chunking for streamed Jarvis responses.
+Model output arrives in arbitrary fragments; TTS wants whole sentences, so
+fragments are buffered and released one sentence (or line) at a time.
+"""
+import re
+from typing import List
+
+# A sentence ends at . ! ? (optionally followed by closing quotes/brackets) or a
+# newline, followed by whitespace. "21.5" and "e.g.x" do not split.
+_SENTENCE_END_RE = re.compile(r"(?:[.!?][\"')\]]*\s+|\n\s*)")
+
+# Chunks shorter than this are held back and merged with the next sentence, so
+# "Sir. " or "1. " is never spoken on its own
+MIN_CHUNK_CHARS = 12
+
+
+class SentenceChunker:
+    """
+    Buffers streamed text and releases sentence-sized chunks.
+
+    Chunks are exact slices of the input (trailing whitespace included), so
+    joining everything returned by feed() and flush() gives back the full text.
+    """
+
+    def __init__(self, min_chars: int = MIN_CHUNK_CHARS):
+        """
+        Args:
+            min_chars: Minimum chunk length released before the end of the text
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; returns any complete sentence chunks."""
+        if not text:
+            return []
+        self._buffer += text
+
+        chunks = []
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(self._buffer):
+            end = match.end()
+            # Whitespace may still be streaming in; wait for the next word
+            if end == len(self._buffer):
+                break
+            if end - start >= self.min_chars:
+                chunks.append(self._buffer[start:end])
+                start = end
+        self._buffer = self._buffer[start:]
+        return chunks
+
+    def flush(self) -> str:
+        """Return whatever text is still buffered."""
+        rest, self._buffer = self._buffer, ""
+        return rest
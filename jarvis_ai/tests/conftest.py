@@ -0,0 +1,8 @@
+"""
+Shared pytest setup for the Jarvis add-on.
+The add-on runs its modules flat from jarvis_ai/, so tests import them the same way.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+"""HTTP API: plain and Server-Sent Events replies from /conversation."""
+import asyncio
+import json
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from api_server import JarvisHTTPAPI
+from sessions import DEFAULT_CONVERSATION_ID
+
+REPLY = "The garden camera shows two foxes, Sir."
+
+
+class FakeJarvis:
+    """Streams a sentence that a function call later replaced, like a real tool turn."""
+
+    def __init__(self):
+        self.turns = []
+
+    async def aprocess(self, text, conversation_id=None):
+        self.turns.append((text, conversation_id))
+        return REPLY
+
+    async def astream(self, text, conversation_id=None, response=None):
+        self.turns.append((text, conversation_id))
+        yield "Let me look. "
+        yield REPLY
+        if response is not None:
+            response[:] = [REPLY]
+
+
+def _post(payload, headers=None):
+    async def run():
+        jarvis = FakeJarvis()
+        async with TestClient(TestServer(JarvisHTTPAPI(jarvis).app)) as client:
+            reply = await client.post('/conversation', json=payload, headers=headers)
+            return jarvis, reply.status, reply.headers.get('Content-Type', ''), await reply.text()
+    return asyncio.run(run())
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+def test_plain_reply():
+    jarvis, status, _, body = _post({'text': 'what is in the garden', 'conversation_id': 'kitchen'})
+    assert status == 200
+    assert json.loads(body) == {'response': REPLY, 'conversation_id': 'kitchen'}
+    assert jarvis.turns == [('what is in the garden', 'kitchen')]
+
+
+def test_streamed_reply_ends_with_the_turn_response():
+    _, status, content_type, body = _post({'text': 'what is in the garden', 'stream': True})
+    assert status == 200
+    assert content_type.startswith('text/event-stream')
+    assert _events(body) == [
+        ('message', {'text': 'Let me look. '}),
+        ('message', {'text': REPLY}),
+        ('done', {'response': REPLY, 'conversation_id': DEFAULT_CONVERSATION_ID}),
+    ]
+
+
+def test_accept_header_selects_streaming():
+    _, _, content_type, _ = _post({'text': 'hello'}, headers={'Accept': 'text/event-stream'})
+    assert content_type.startswith('text/event-stream')
+
+
+def test_missing_text_is_rejected():
+    jarvis, status, _, _ = _post({'conversation_id': 'kitchen'})
+    assert status == 400
+    assert jarvis.turns == []
@@ -0,0 +1,140 @@
+"""ArrMetadataCache TTL, refresh-ahead and invalidation."""
+import threading
+
+import pytest
+import requests
+
+import arr_metadata
+from arr_metadata import REFRESH_AHEAD_FRACTION, ArrMetadataCache
+
+TTL = 100
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, text=""):
+        self.status_code = status_code
+        self.data = data
+        self.text = text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Answers GETs with a new list each time, counting requests per resource."""
+
+    def __init__(self):
+        self.headers = {}
+        self.calls = []
+        self.status_code = 200
+
+    def get(self, url, timeout=None):
+        resource = url.rsplit("/", 1)[-1]
+        self.calls.append(resource)
+        return FakeResponse(self.status_code, [{'id': len(self.calls), 'resource': resource}])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(arr_metadata.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache():
+    cache = ArrMetadataCache("Radarr", "http://radarr:7878/", "key", ttl=TTL)
+    session = FakeSession()
+    session.headers = cache.session.headers
+    cache.session = session
+    return cache
+
+
+def test_served_from_cache_within_the_ttl(cache, clock):
+    first = cache.root_folders()
+    clock.now += TTL * REFRESH_AHEAD_FRACTION - 1
+    assert cache.root_folders() is first
+    assert cache.session.calls == ['rootfolder']
+
+
+def test_refetched_after_the_ttl(cache, clock):
+    first = cache.quality_profiles()
+    clock.now += TTL
+    assert cache.quality_profiles() != first
+    assert cache.session.calls == ['qualityprofile', 'qualityprofile']
+
+
+def test_refreshed_in_the_background_near_expiry(cache, clock, monkeypatch):
+    started = []
+    monkeypatch.setattr(cache, "refresh_in_background", started.append)
+    first = cache.root_folders()
+    clock.now += TTL * REFRESH_AHEAD_FRACTION
+    assert cache.root_folders() is first
+    assert started == ['rootfolder']
+
+
+def test_one_background_refresh_per_resource(cache, clock):
+    release = threading.Event()
+    fetch = cache.session.get
+
+    def slow_get(url, timeout=None):
+        release.wait(5)
+        return fetch(url, timeout)
+
+    cache.session.get = slow_get
+    cache.refresh_in_background('rootfolder')
+    cache.refresh_in_background('rootfolder')
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "radarr-metadata":
+            thread.join(5)
+    assert cache.session.calls == ['rootfolder']
+    assert cache.get('rootfolder')[0]['id'] == 1
+
+
+def test_failed_background_refresh_keeps_the_cached_copy(cache, clock):
+    first = cache.root_folders()
+    cache.session.status_code = 500
+    cache.refresh_in_background('rootfolder')
+    for thread in threading.enumerate():
+        if thread.name == "radarr-metadata":
+            thread.join(5)
+    assert cache.root_folders() is first
+
+
+@pytest.mark.parametrize('status, text, invalidated', [
+    (404, "", True),
+    (422, "", True),
+    (400, '[{"propertyName": "RootFolderPath", "errorMessage": "Folder does not exist"}]', True),
+    (400, '[{"propertyName": "QualityProfileId", "errorMessage": "Must be greater than 0"}]', True),
+    (400, '[{"propertyName": "TmdbId", "errorMessage": "This movie has already been added"}]', False),
+    (500, "", False),
+])
+def test_invalidated_only_for_metadata_errors(cache, clock, status, text, invalidated):
+    cache.warm()
+    assert cache.invalidate_for_error(FakeResponse(status, text=text)) is invalidated
+    cache.root_folders()
+    cache.quality_profiles()
+    refetched = ['rootfolder', 'qualityprofile'] if invalidated else []
+    assert cache.session.calls == ['rootfolder', 'qualityprofile'] + refetched
+
+
+def test_warm_is_skipped_when_not_configured():
+    assert ArrMetadataCache("Sonarr", "", "").warm() is False
+
+
+def test_warm_reports_failures(cache):
+    cache.session.status_code = 503
+    assert cache.warm() is False
@@ -0,0 +1,91 @@
+"""AsyncMemory runs Memory calls on its reader pool, off the event loop."""
+import asyncio
+import threading
+
+import pytest
+
+from async_memory import AsyncMemory
+from memory import Memory
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    yield memory
+    memory.close()
+
+
+def test_calls_match_the_sync_api(memory):
+    async def run():
+        await memory.aio.set_preference("temperature_unit", "celsius")
+        await memory.aio.save_context("what's the weather", "Sunny, Sir.")
+        await memory.aio.remember_fact("light.office", "brightness", "40")
+        return (
+            await memory.aio.get_preference("temperature_unit"),
+            await memory.aio.get_all_preferences(),
+            await memory.aio.get_recent_context(limit=1),
+            await memory.aio.recall_fact("light.office", "brightness"),
+        )
+
+    preference, preferences, context, fact = asyncio.run(run())
+
+    assert preference == "celsius"
+    assert preferences == memory.get_all_preferences()
+    assert context == memory.get_recent_context(limit=1)
+    assert context[0]['assistant'] == "Sunny, Sir."
+    assert fact == "40"
+
+
+def test_calls_run_on_the_reader_pool(memory, monkeypatch):
+    threads = []
+    get_preference = memory.get_preference
+
+    def recording_get_preference(*args):
+        threads.append(threading.current_thread().name)
+        return get_preference(*args)
+
+    monkeypatch.setattr(memory, "get_preference", recording_get_preference)
+    asyncio.run(memory.aio.get_preference("temperature_unit"))
+
+    assert threads[0].startswith("memory-reader")
+
+
+def test_slow_reads_do_not_block_the_loop(memory, monkeypatch):
+    release = threading.Event()
+
+    def slow_get_all_preferences():
+        assert release.wait(timeout=5)
+        return {}
+
+    monkeypatch.setattr(memory, "get_all_preferences", slow_get_all_preferences)
+
+    async def run():
+        read = asyncio.create_task(memory.aio.get_all_preferences())
+        await asyncio.sleep(0.05)
+        # The loop is still free while the read waits in its thread
+        release.set()
+        return await read
+
+    assert asyncio.run(run()) == {}
+
+
+def test_reader_threads_read_in_parallel(memory, monkeypatch):
+    aio = AsyncMemory(memory, readers=2)
+    both_in = threading.Barrier(2, timeout=5)
+
+    def get_preference(key, default=None):
+        # Only passes once two reads are in flight at the same time
+        both_in.wait()
+        return key
+
+    monkeypatch.setattr(memory, "get_preference", get_preference)
+
+    async def run():
+        return await asyncio.gather(aio.get_preference("a"), aio.get_preference("b"))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    aio.shutdown()
+
+
+def test_aio_is_created_once(memory):
+    assert memory.aio is memory.aio
@@ -0,0 +1,23 @@
+"""The memory benchmark runs end to end on a tiny data set."""
+import json
+
+import pytest
+
+import benchmark_memory
+
+
+@pytest.mark.parametrize('extra', [[], ['--no-write-behind', '--embedder', 'off']])
+def test_benchmark_report(tmp_path, extra):
+    output = tmp_path / "report.json"
+    args = ['--rows', '600', '--facts', '40', '--preferences', '5', '--iterations', '4',
+            '--threads', '2', '--output', str(output)] + extra
+    assert benchmark_memory.main(args) == 0
+
+    result = json.loads(output.read_text())['results'][0]
+    assert result['final_stats']['facts'] == 40
+    assert result['final_stats']['preferences'] == 5
+    # Seeded history reaches back past the retention window, so days were rolled up
+    assert result['final_stats']['rollup_days'] > 0
+    assert {'get_all_preferences', 'save_context', 'retention_noop'} <= set(result['single'])
+    assert ('recall' in result['single']) == ('off' not in extra)
+    assert set(result['concurrent']) == set(result['single']) - {'retention_noop'}
@@ -0,0 +1,104 @@
+"""Context retention: expired days roll up into context_rollup and their raw rows go."""
+import json
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from context_retention import classify_intent, retention_cutoff, roll_up_expired
+from memory import Memory
+from memory_migrations import migrate
+
+NOW = datetime(2026, 10, 17, 12, 0, 0)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "memory.db"))
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+def _add(conn, user_input, timestamp, is_error=False):
+    conn.execute("""
+        INSERT INTO context (user_input, assistant_response, is_error, timestamp) VALUES (?, 'ok', ?, ?)
+    """, (user_input, int(is_error), timestamp))
+
+
+def _rollups(conn):
+    rows = conn.execute("SELECT day, exchanges, errors, top_intents, first_at, last_at FROM context_rollup "
+                        "ORDER BY day").fetchall()
+    return [(day, exchanges, errors, json.loads(intents), first_at, last_at)
+            for day, exchanges, errors, intents, first_at, last_at in rows]
+
+
+def test_classify_intent():
+    assert classify_intent("turn on the office lights") == 'lights'
+    assert classify_intent("play some jazz") == 'music'
+    assert classify_intent("will it rain tomorrow") == 'weather'
+    assert classify_intent("hmm") == 'other'
+    assert classify_intent(None) == 'other'
+
+
+def test_cutoff_keeps_today_and_the_previous_days():
+    assert retention_cutoff(NOW, retention_days=7) == "2026-10-11 00:00:00"
+    assert retention_cutoff(NOW, retention_days=1) == "2026-10-17 00:00:00"
+
+
+def test_expired_days_are_rolled_up_and_deleted(conn):
+    _add(conn, "turn on the office lights", "2026-10-01 08:00:00")
+    _add(conn, "dim the lamp", "2026-10-01 09:30:00")
+    _add(conn, "will it rain", "2026-10-01 20:15:00", is_error=True)
+    _add(conn, "play some jazz", "2026-10-02 07:00:00")
+    _add(conn, "what's the weather", "2026-10-11 00:00:00")
+
+    assert roll_up_expired(conn, now=NOW, retention_days=7) == 4
+
+    assert _rollups(conn) == [
+        ("2026-10-01", 3, 1, {"lights": 2, "weather": 1}, "2026-10-01 08:00:00", "2026-10-01 20:15:00"),
+        ("2026-10-02", 1, 0, {"music": 1}, "2026-10-02 07:00:00", "2026-10-02 07:00:00"),
+    ]
+    # The oldest retained day is untouched
+    assert conn.execute("SELECT user_input FROM context").fetchall() == [("what's the weather",)]
+
+
+def test_nothing_expired_is_a_no_op(conn):
+    _add(conn, "turn on the office lights", "2026-10-16 08:00:00")
+
+    assert roll_up_expired(conn, now=NOW, retention_days=7) == 0
+    assert _rollups(conn) == []
+
+
+def test_late_rows_merge_into_an_existing_rollup(conn):
+    _add(conn, "turn on the office lights", "2026-10-01 08:00:00")
+    roll_up_expired(conn, now=NOW, retention_days=7)
+
+    # e.g. restored from an older backup
+    _add(conn, "play some jazz", "2026-10-01 06:00:00", is_error=True)
+    roll_up_expired(conn, now=NOW, retention_days=7)
+
+    assert _rollups(conn) == [
+        ("2026-10-01", 2, 1, {"lights": 1, "music": 1}, "2026-10-01 06:00:00", "2026-10-01 08:00:00"),
+    ]
+
+
+def test_memory_usage_stats_come_from_the_rollup(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"), write_behind=False)
+    memory.conn.execute("""
+        INSERT INTO context (user_input, assistant_response, is_error, timestamp)
+        VALUES ('turn on the office lights', 'Done, Sir.', 0, '2020-01-01 08:00:00'),
+               ('turn off the office lights', 'Sorry, Sir.', 1, '2020-01-01 09:00:00')
+    """)
+    memory.conn.commit()
+    version = memory.context_version
+
+    memory.apply_retention()
+
+    assert memory.get_usage_stats() == [
+        {'day': '2020-01-01', 'exchanges': 2, 'errors': 1, 'error_rate': 0.5, 'top_intents': {'lights': 2}},
+    ]
+    # The prompt's recent context may have changed
+    assert memory.context_version == version + 1
+    assert memory.get_recent_context(limit=5, include_errors=True) == []
+    memory.close()
@@ -0,0 +1,289 @@
+"""Conversation turns against a scripted Gemini stand-in: tool execution and the sync wrapper."""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import config_helper
+import conversation
+import metrics
+import tools
+from memory import Memory
+
+
+class FakePart:
+    def __init__(self, text=None, function_call=None):
+        self.text = text
+        self.function_call = function_call
+
+
+class FakeChunk:
+    def __init__(self, part):
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(role='model', parts=[part]))]
+
+
+class FakeChat:
+    """Chat session whose replies come from the model's script."""
+
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    async def send_message_async(self, message, generation_config=None, stream=False):
+        self.model.messages.append(message)
+        parts = self.model.script(message)
+        self.history.append(SimpleNamespace(role='user', parts=[FakePart(text=message)]))
+        self.history.append(SimpleNamespace(role='model', parts=parts))
+
+        async def chunks():
+            for part in parts:
+                yield FakeChunk(part)
+        return chunks()
+
+
+class FakeModel:
+    def __init__(self, model_name, tools=None, system_instruction=None):
+        self.system_instruction = system_instruction
+        self.messages = []
+        self.script = lambda message: [FakePart(text="Hello, Sir.")]
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+
+class FakeMemory:
+    """Just enough of Memory for a turn: no preferences, context or recall."""
+
+    preferences_version = 0
+    context_version = 0
+
+    def __init__(self):
+        self.saved = []
+        self.aio = self
+
+    async def get_all_preferences(self):
+        return {}
+
+    async def get_recent_context(self, limit=3, include_errors=False):
+        return []
+
+    async def recall(self, text, limit=3):
+        return []
+
+    async def save_context(self, user, assistant, is_error=False):
+        self.saved.append((user, assistant, is_error))
+
+
+def call(name, **args):
+    return FakePart(function_call=SimpleNamespace(name=name, args=args))
+
+
+@pytest.fixture
+def jarvis(monkeypatch):
+    monkeypatch.setattr(config_helper, 'GCP_PROJECT_ID', 'test-project')
+    monkeypatch.setattr(conversation.vertexai, 'init', lambda **kwargs: None)
+    monkeypatch.setattr(conversation, 'GenerativeModel', FakeModel)
+    monkeypatch.setattr(tools, 'set_memory', lambda memory: None)
+    monkeypatch.setattr(conversation, '_FUNCTION_MAP', {})
+    instance = conversation.JarvisConversation(memory=FakeMemory())
+    yield instance
+    instance._tool_executor.shutdown(wait=False)
+
+
+def _tool_turn(jarvis, *calls, reply="Done, Sir."):
+    """Script one round of function calls followed by a text reply."""
+    def script(message):
+        if message.startswith("Function results"):
+            return [FakePart(text=reply)]
+        return list(calls)
+    jarvis.model.script = script
+
+
+# ===== TOOL OFFLOAD =====
+
+def test_sync_tool_runs_in_the_tool_executor_with_the_turn_trace(jarvis):
+    seen = {}
+
+    def get_current_time():
+        seen['thread'] = threading.current_thread().name
+        seen['spans'] = metrics._turn_spans.get()
+        return "12:00"
+
+    conversation._FUNCTION_MAP['get_current_time'] = get_current_time
+    _tool_turn(jarvis, call('get_current_time'), reply="It is noon, Sir.")
+
+    assert asyncio.run(jarvis.aprocess("what time is it")) == "It is noon, Sir."
+    assert seen['thread'].startswith("jarvis-tool")
+    # The copied context carries the turn's span list into the worker thread
+    assert isinstance(seen['spans'], list)
+    assert jarvis.model.messages[-1] == "Function results:\nget_current_time: 12:00"
+
+
+def test_sync_tool_does_not_block_the_event_loop(jarvis):
+    release = threading.Event()
+
+    def get_weather():
+        # Only returns once the loop has run the other coroutine
+        assert release.wait(timeout=5)
+        return "sunny"
+
+    conversation._FUNCTION_MAP['get_weather'] = get_weather
+    _tool_turn(jarvis, call('get_weather'))
+
+    async def run():
+        turn = asyncio.create_task(jarvis.aprocess("weather"))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await turn
+
+    assert asyncio.run(run()) == "Done, Sir."
+    assert jarvis.model.messages[-1] == "Function results:\nget_weather: sunny"
+
+
+def test_coroutine_tool_is_awaited_on_the_loop(jarvis):
+    seen = {}
+
+    async def get_ha_state(entity_id):
+        seen['thread'] = threading.current_thread()
+        return f"{entity_id} is on"
+
+    conversation._FUNCTION_MAP['get_ha_state'] = get_ha_state
+    _tool_turn(jarvis, call('get_ha_state', entity_id='light.office'))
+
+    assert asyncio.run(jarvis.aprocess("is the office light on")) == "Done, Sir."
+    assert seen['thread'] is threading.main_thread()
+    assert jarvis.model.messages[-1] == "Function results:\nget_ha_state: light.office is on"
+
+
+def test_tool_exception_is_reported_to_the_model(jarvis):
+    def get_weather():
+        raise RuntimeError("weather API down")
+
+    conversation._FUNCTION_MAP['get_weather'] = get_weather
+    _tool_turn(jarvis, call('get_weather'), reply="The weather service is down, Sir.")
+
+    asyncio.run(jarvis.aprocess("weather"))
+    assert jarvis.model.messages[-1] == "Function results:\nget_weather: Error - weather API down"
+
+
+def test_process_wraps_aprocess(jarvis):
+    assert jarvis.process("hello") == "Hello, Sir."
+    assert jarvis.memory.saved == [("hello", "Hello, Sir.", False)]
+
+
+# ===== PARALLEL TOOL CALLS =====
+
+def test_parallel_calls_return_results_in_call_order(jarvis):
+    async def get_weather():
+        await asyncio.sleep(0.05)
+        return "sunny"
+
+    async def get_ha_state(entity_id):
+        return f"{entity_id} is on"
+
+    conversation._FUNCTION_MAP.update(get_weather=get_weather, get_ha_state=get_ha_state)
+    _tool_turn(jarvis, call('get_weather'), call('get_ha_state', entity_id='light.office'))
+
+    asyncio.run(jarvis.aprocess("weather and the office light"))
+    # get_ha_state finished first, but its result stays second
+    assert jarvis.model.messages[-1] == (
+        "Function results:\nget_weather: sunny\nget_ha_state: light.office is on"
+    )
+
+
+def test_independent_calls_overlap_and_writes_to_one_entity_stay_ordered(jarvis):
+    log = []
+
+    async def control_home_assistant(entity_id, action):
+        log.append(('start', entity_id, action))
+        await asyncio.sleep(0.05)
+        log.append(('end', entity_id, action))
+        return "ok"
+
+    async def get_weather():
+        log.append(('start', 'weather', None))
+        await asyncio.sleep(0.05)
+        log.append(('end', 'weather', None))
+        return "sunny"
+
+    conversation._FUNCTION_MAP.update(control_home_assistant=control_home_assistant, get_weather=get_weather)
+    _tool_turn(
+        jarvis,
+        call('control_home_assistant', entity_id='light.office', action='turn_on'),
+        call('get_weather'),
+        call('control_home_assistant', entity_id='Light.Office', action='turn_off'),
+    )
+
+    asyncio.run(jarvis.aprocess("office light on then off, and the weather"))
+
+    # The weather read overlaps the first write
+    assert log[:2] == [('start', 'light.office', 'turn_on'), ('start', 'weather', None)]
+    # The second write to the same entity waits for the first
+    office = [entry for entry in log if entry[1].lower() == 'light.office']
+    assert office == [
+        ('start', 'light.office', 'turn_on'), ('end', 'light.office', 'turn_on'),
+        ('start', 'Light.Office', 'turn_off'), ('end', 'Light.Office', 'turn_off'),
+    ]
+
+
+def test_ordering_keys():
+    assert conversation._ordering_key('get_weather', {}) is None
+    assert conversation._ordering_key('control_home_assistant', {'entity_id': 'Light.Office'}) == 'light.office'
+    # Different write tools on one device share a key
+    assert conversation._ordering_key('play_music', {'entity_id': 'media_player.office'}) == 'media_player.office'
+    assert conversation._ordering_key('save_preference', {'name': 'Units'}) == 'preference:units'
+    assert conversation._ordering_key('delete_preference', {'name': 'units'}) == 'preference:units'
+    assert conversation._ordering_key('add_calendar_event', {'title': 'Dentist'}) == 'add_calendar_event'
+
+
+# ===== SYSTEM PROMPT =====
+
+@pytest.fixture
+def memory(jarvis, tmp_path):
+    jarvis.memory = Memory(str(tmp_path / "memory.db"))
+    yield jarvis.memory
+    jarvis.memory.close()
+
+
+def test_static_prompt_is_the_system_instruction(jarvis):
+    assert jarvis.model.system_instruction == conversation.STATIC_SYSTEM_PROMPT
+
+
+def test_dynamic_prompt_opens_each_new_chat(jarvis, memory):
+    memory.set_preference("temperature_unit", "celsius")
+
+    jarvis.process("hello", conversation_id="kitchen")
+    jarvis.process("how are you", conversation_id="kitchen")
+
+    opening, follow_up = jarvis.model.messages
+    assert opening.startswith("USER PREFERENCES (from memory):\n- temperature_unit: celsius\n")
+    assert opening.endswith("\n\nUser: hello")
+    # Later turns in the same chat carry only the user's words
+    assert follow_up == "how are you"
+
+
+def test_dynamic_prompt_is_reused_until_memory_changes(jarvis, memory, monkeypatch):
+    reads = []
+    get_all_preferences = memory.aio.get_all_preferences
+
+    async def counting_get_all_preferences():
+        reads.append(1)
+        return await get_all_preferences()
+
+    monkeypatch.setattr(memory.aio, "get_all_preferences", counting_get_all_preferences)
+    memory.set_preference("temperature_unit", "celsius")
+
+    prompt = asyncio.run(jarvis._build_system_prompt())
+    assert asyncio.run(jarvis._build_system_prompt()) is prompt
+    assert len(reads) == 1
+
+    memory.set_preference("temperature_unit", "fahrenheit")
+    assert "temperature_unit: fahrenheit" in asyncio.run(jarvis._build_system_prompt())
+    assert len(reads) == 2
+
+    # A finished turn is saved as context, which the next new chat should see
+    jarvis.process("hello", conversation_id="kitchen")
+    prompt = asyncio.run(jarvis._build_system_prompt())
+    assert len(reads) == 3
+    assert "RECENT CONTEXT:\nUser: hello\nYou: Hello, Sir.\n" in prompt
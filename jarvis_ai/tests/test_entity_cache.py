@@ -0,0 +1,189 @@
+"""Entity state cache: REST load, state_changed upkeep, live vs fresh reads and the WebSocket feed."""
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import config_helper
+import entity_cache
+from entity_cache import EntityStateCache
+
+
+def _state(entity_id, friendly_name, state='off'):
+    return {'entity_id': entity_id, 'state': state, 'attributes': {'friendly_name': friendly_name}}
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"{self.status_code} error")
+
+    def json(self):
+        return self.data
+
+
+class FakeHAClient:
+    """Serves /api/states and /api/states/<id> from a dict of states."""
+
+    def __init__(self, states):
+        self.states = {s['entity_id']: s for s in states}
+        self.paths = []
+
+    def get(self, path):
+        self.paths.append(path)
+        if path == "/api/states":
+            return FakeResponse(200, list(self.states.values()))
+        state = self.states.get(path.rsplit("/", 1)[-1])
+        return FakeResponse(200, state) if state else FakeResponse(404)
+
+
+@pytest.fixture
+def ha(monkeypatch):
+    client = FakeHAClient([
+        _state('light.kitchen', 'Kitchen Light'),
+        _state('switch.coffee_machine', 'Coffee Machine'),
+    ])
+    monkeypatch.setattr(entity_cache, "get_ha_client", lambda: client)
+    return client
+
+
+# ===== LOAD AND UPKEEP =====
+
+def test_first_read_loads_all_states_once(ha):
+    cache = EntityStateCache()
+
+    assert cache.get_state('light.kitchen')['state'] == 'off'
+    assert 'switch.coffee_machine' in cache
+    assert len(cache) == 2
+    assert ha.paths == ["/api/states"]
+    assert [e['entity_id'] for e in cache.search('coffee')] == ['switch.coffee_machine']
+
+
+def test_state_changes_do_not_bump_the_registry_version(ha):
+    cache = EntityStateCache()
+    cache.ensure_loaded()
+    version = cache.registry_version
+
+    cache.apply_state_changed({'entity_id': 'light.kitchen', 'new_state': _state('light.kitchen', 'Kitchen Light', 'on')})
+
+    assert cache.get_state('light.kitchen')['state'] == 'on'
+    assert cache.registry_version == version
+
+
+def test_adds_renames_and_removals_update_the_index(ha):
+    cache = EntityStateCache()
+    cache.ensure_loaded()
+    version = cache.registry_version
+
+    cache.apply_state_changed({'entity_id': 'light.porch', 'new_state': _state('light.porch', 'Porch Light')})
+    assert cache.registry_version == version + 1
+    assert cache.index.find('porch', 'light') == 'light.porch'
+
+    cache.apply_state_changed({'entity_id': 'light.porch', 'new_state': _state('light.porch', 'Front Door Light')})
+    assert cache.registry_version == version + 2
+    assert cache.index.find('front door', 'light') == 'light.porch'
+    assert cache.index.find('porch light', 'light') is None
+
+    cache.apply_state_changed({'entity_id': 'light.porch', 'new_state': None})
+    assert cache.registry_version == version + 3
+    assert 'light.porch' not in cache
+    assert cache.index.domain_entities('light') == ['light.kitchen']
+
+
+def test_reload_without_registry_changes_keeps_the_version(ha):
+    cache = EntityStateCache()
+    cache.load()
+    version = cache.registry_version
+
+    ha.states['light.kitchen'] = _state('light.kitchen', 'Kitchen Light', 'on')
+    cache.load()
+
+    assert cache.registry_version == version
+    assert cache.get_state('light.kitchen')['state'] == 'on'
+
+
+# ===== LIVE VS FRESH READS =====
+
+def test_fresh_read_goes_to_ha_while_not_live(ha):
+    cache = EntityStateCache()
+    cache.ensure_loaded()
+    ha.states['light.kitchen'] = _state('light.kitchen', 'Kitchen Light', 'on')
+
+    # A plain read may be stale; a reported state is read live
+    assert cache.get_state('light.kitchen')['state'] == 'off'
+    assert cache.get_state('light.kitchen', fresh=True)['state'] == 'on'
+    assert ha.paths[-1] == "/api/states/light.kitchen"
+    assert cache.get_state('light.kitchen')['state'] == 'on'
+
+
+def test_fresh_read_of_a_deleted_entity_drops_it(ha):
+    cache = EntityStateCache()
+    cache.ensure_loaded()
+    del ha.states['switch.coffee_machine']
+
+    assert cache.get_state('switch.coffee_machine', fresh=True) is None
+    assert 'switch.coffee_machine' not in cache
+
+
+def test_fresh_read_uses_the_cache_while_live(ha):
+    cache = EntityStateCache()
+    cache.ensure_loaded()
+    cache._live = True
+    ha.paths.clear()
+
+    assert cache.get_state('light.kitchen', fresh=True)['state'] == 'off'
+    assert len(cache.get_states(fresh=True)) == 2
+    assert ha.paths == []
+
+
+# ===== WEBSOCKET =====
+
+def test_websocket_events_keep_the_cache_current(ha, monkeypatch):
+    async def websocket(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({'type': 'auth_required'})
+        assert (await ws.receive_json())['access_token'] == 'secret'
+        await ws.send_json({'type': 'auth_ok'})
+        subscribe = await ws.receive_json()
+        assert subscribe['event_type'] == 'state_changed'
+        await ws.send_json({'id': subscribe['id'], 'type': 'result', 'success': True})
+        await ws.send_json({'type': 'event', 'event': {'data': {
+            'entity_id': 'light.kitchen', 'new_state': _state('light.kitchen', 'Kitchen Light', 'on'),
+        }}})
+        await ws.send_json({'type': 'event', 'event': {'data': {
+            'entity_id': 'switch.coffee_machine', 'new_state': None,
+        }}})
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get('/websocket', websocket)
+
+    async def run():
+        async with TestServer(app) as server:
+            monkeypatch.setattr(config_helper, 'HA_URL', str(server.make_url('')))
+            monkeypatch.setattr(config_helper, 'HA_TOKEN', 'secret')
+            cache = EntityStateCache()
+            async with aiohttp.ClientSession() as session:
+                await cache._subscribe(session)
+            return cache
+
+    cache = asyncio.run(run())
+
+    assert cache.get_state('light.kitchen')['state'] == 'on'
+    assert 'switch.coffee_machine' not in cache
+
+
+def test_websocket_url_follows_the_rest_url(monkeypatch):
+    monkeypatch.setattr(config_helper, 'HA_URL', 'https://ha.example.com/')
+    assert EntityStateCache()._websocket_url() == 'wss://ha.example.com/websocket'
+
+    monkeypatch.setattr(config_helper, 'HA_URL', 'http://supervisor/core')
+    assert EntityStateCache()._websocket_url() == 'ws://supervisor/core/websocket'
@@ -0,0 +1,124 @@
+"""EntitySearchIndex must rank exactly like the linear scan it replaced."""
+import pytest
+
+from entity_index import EntitySearchIndex
+
+
+def _state(entity_id, friendly_name=None):
+    attributes = {'friendly_name': friendly_name} if friendly_name is not None else {}
+    return {'entity_id': entity_id, 'state': 'on', 'attributes': attributes}
+
+
+STATES = [
+    _state('light.kitchen', 'Kitchen Light'),
+    _state('light.kitchen_spots', 'Kitchen Spots'),
+    _state('light.living_room', 'Living Room Lamp'),
+    _state('switch.kitchen_plug', 'Kitchen Plug'),
+    _state('switch.garden_pump', 'Garden Pump'),
+    _state('camera.garden', 'Garden Camera'),
+    _state('camera.front_door', 'Front Door'),
+    _state('sensor.garden_temperature', 'Garden Temperature'),
+    _state('sensor.living_room_humidity', 'Living Room Humidity'),
+    _state('climate.hallway', 'Hallway Thermostat'),
+    _state('media_player.living_room_tv', 'Living Room TV'),
+    _state('input_boolean.guest_mode'),
+    _state('binary_sensor.front_door_contact', 'Front Door Contact'),
+]
+
+QUERIES = [
+    'kitchen light', 'Kitchen Light', 'kitchen', 'garden', 'garden camera', 'camera',
+    'light', 'front door', 'door front', 'living room', 'room', 'temperature garden',
+    'guest', 'guest_mode', 'input_boolean', 'tv', 'sensor', 'climate', 'hallway thermostat',
+    'humidity sensor', 'pump switch', 'kit', 'zz', 'ch', 'light.kitchen', 'oo', '',
+]
+
+
+def _linear_search(states, query):
+    """The original scan over /api/states, kept here as the reference."""
+    query_tokens = query.lower().split()
+    domain_keywords = ['camera', 'light', 'switch', 'sensor', 'climate']
+    results = []
+    for entity in states:
+        entity_id = entity['entity_id'].lower()
+        friendly_name = entity.get('attributes', {}).get('friendly_name', '').lower()
+        search_text = f"{entity_id} {friendly_name}"
+
+        score = 0
+        if query == friendly_name:
+            score = 100
+        elif query in friendly_name:
+            score = 80
+        elif all(token in friendly_name for token in query_tokens):
+            score = 60
+        elif query in entity_id:
+            score = 40
+        elif all(token in entity_id for token in query_tokens):
+            score = 20
+        elif all(token in search_text for token in query_tokens):
+            score = 10
+
+        for keyword in domain_keywords:
+            if keyword in query_tokens and entity_id.startswith(f"{keyword}."):
+                score += 50
+                break
+
+        if score > 0:
+            results.append({
+                'entity_id': entity['entity_id'],
+                'friendly_name': entity.get('attributes', {}).get('friendly_name', 'Unknown'),
+                'score': score
+            })
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results
+
+
+def _linear_find(states, text, domain):
+    """The original media player lookup: first match in cache order."""
+    text = text.lower()
+    for state in states:
+        if not state['entity_id'].startswith(f"{domain}."):
+            continue
+        name = state.get('attributes', {}).get('friendly_name', '').lower()
+        if text in state['entity_id'].lower() or text in name:
+            return state['entity_id']
+    return None
+
+
+@pytest.fixture
+def index():
+    index = EntitySearchIndex()
+    index.rebuild(STATES)
+    return index
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_matches_linear_scan(index, query):
+    assert index.search(query) == _linear_search(STATES, query)
+
+
+def test_incremental_updates_match_rebuild(index):
+    states = [dict(s) for s in STATES]
+    renamed = _state('light.kitchen', 'Galley Light')
+    added = _state('camera.garage', 'Garage Camera')
+    index.upsert(renamed)
+    index.upsert(added)
+    index.remove('switch.garden_pump')
+    states[0] = renamed
+    states = [s for s in states if s['entity_id'] != 'switch.garden_pump'] + [added]
+
+    for query in QUERIES + ['galley', 'garage', 'pump']:
+        assert index.search(query) == _linear_search(states, query)
+    assert len(index) == len(states)
+    assert index.domain_count('camera') == 3
+    assert index.domain_entities('light') == ['light.kitchen', 'light.kitchen_spots', 'light.living_room']
+
+
+def test_rename_keeps_cache_order_for_ties(index):
+    index.upsert(_state('light.kitchen', 'Kitchen Ceiling'))
+    ids = [r['entity_id'] for r in index.search('kitchen') if r['score'] == 80]
+    assert ids[:2] == ['light.kitchen', 'light.kitchen_spots']
+
+
+@pytest.mark.parametrize('text', ['living room', 'TV', 'tv', 'media_player.living', 'bedroom', 'ing r'])
+def test_find_matches_linear_lookup(index, text):
+    assert index.find(text, 'media_player') == _linear_find(STATES, text, 'media_player')
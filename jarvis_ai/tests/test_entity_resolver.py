@@ -0,0 +1,165 @@
+"""EntityResolver resolves the ids the old search-based fallback did, without HA calls."""
+import pytest
+import requests
+
+import entity_cache
+from entity_cache import EntityStateCache
+from entity_resolver import EntityResolver
+
+
+def _state(entity_id, friendly_name):
+    return {'entity_id': entity_id, 'state': 'off', 'attributes': {'friendly_name': friendly_name}}
+
+
+STATES = [
+    _state('light.kitchen', 'Kitchen Light'),
+    _state('light.living_room', 'Living Room Lamp'),
+    _state('light.bedroom_ceiling', 'Bedroom Ceiling'),
+    _state('switch.kitchen_plug', 'Kitchen Plug'),
+    _state('switch.coffee_machine', 'Coffee Machine'),
+    _state('input_boolean.guest_mode', 'Guest Mode'),
+    _state('climate.hallway', 'Hallway Thermostat'),
+    _state('sensor.kitchen_temperature', 'Kitchen Temperature'),
+]
+
+
+@pytest.fixture
+def cache():
+    cache = EntityStateCache()
+    # Filled through the push path, so no REST load is attempted
+    cache._loaded = True
+    cache._live = True
+    for state in STATES:
+        cache.apply_state_changed({'entity_id': state['entity_id'], 'new_state': state})
+    return cache
+
+
+@pytest.fixture
+def resolver(cache):
+    return EntityResolver(cache)
+
+
+def _search_fallback(cache, entity_id):
+    """The original fallback: first search hit in the requested or a target domain."""
+    query_name = entity_id.split(".")[-1].replace("_", " ")
+    original_domain = entity_id.split(".")[0]
+    for ent in cache.search(query_name):
+        e_id = ent['entity_id']
+        e_domain = e_id.split(".")[0]
+        e_name = ent.get('friendly_name', '').lower()
+        if original_domain == "light" and ("plug" in e_name or "plug" in e_id or "socket" in e_name):
+            continue
+        if e_domain in ['light', 'switch', 'input_boolean'] or e_domain == original_domain:
+            return e_id, True
+    return entity_id, False
+
+
+@pytest.mark.parametrize('requested', [
+    'light.kitchen_light',
+    'light.living_room_lamp',
+    'switch.coffee_machine_switch',
+    'input_boolean.guest',
+    'light.bedroom',
+    'climate.hallway_thermostat',
+])
+def test_resolves_what_the_search_fallback_resolved(cache, resolver, requested):
+    expected = _search_fallback(cache, requested)
+    assert expected[1]
+    assert resolver.resolve(requested) == expected
+
+
+@pytest.mark.parametrize('requested, expected', [
+    ('light.kitchen_lights', 'light.kitchen'),
+    ('lights.kitchen', 'light.kitchen'),
+    ('light.lounge_lamp', 'light.living_room'),
+    ('light.bedroom_celing', 'light.bedroom_ceiling'),
+    ('switch.cofee_machine', 'switch.coffee_machine'),
+    ('thermostat.hallway', 'climate.hallway'),
+])
+def test_resolves_variants_the_search_fallback_missed(resolver, requested, expected):
+    assert resolver.resolve(requested) == (expected, True)
+
+
+def test_existing_entity_is_returned_unchanged(resolver):
+    assert resolver.resolve('switch.kitchen_plug') == ('switch.kitchen_plug', False)
+
+
+def test_light_request_never_falls_back_to_a_plug(resolver):
+    ranked = [entity_id for entity_id, _ in resolver.rank('light.kitchen_plug_light')]
+    assert 'switch.kitchen_plug' not in ranked
+
+
+def test_unrelated_request_is_not_resolved(resolver):
+    assert resolver.resolve('light.garage_door') == ('light.garage_door', False)
+
+
+def test_memo_is_dropped_when_the_registry_changes(cache, resolver):
+    assert resolver.resolve('light.garage_lamp') == ('light.garage_lamp', False)
+    cache.apply_state_changed({'entity_id': 'light.garage', 'new_state': _state('light.garage', 'Garage Lamp')})
+    assert resolver.resolve('light.garage_lamp') == ('light.garage', True)
+
+    cache.apply_state_changed({'entity_id': 'light.garage', 'new_state': None})
+    assert resolver.resolve('light.garage_lamp') == ('light.garage_lamp', False)
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def json(self):
+        return self.data
+
+
+class FakeHAClient:
+    """Serves /api/states/<id> from a dict of states HA knows but the cache doesn't yet."""
+
+    def __init__(self, states, status_code=None):
+        self.states = states
+        self.status_code = status_code
+        self.paths = []
+
+    def get(self, path):
+        self.paths.append(path)
+        if self.status_code is not None:
+            return FakeResponse(self.status_code)
+        state = self.states.get(path.rsplit("/", 1)[-1])
+        return FakeResponse(200, state) if state else FakeResponse(404)
+
+
+@pytest.fixture
+def offline_cache(cache, monkeypatch):
+    """The cache while the WebSocket is down; HA has one entity the cache hasn't seen."""
+    cache._live = False
+    client = FakeHAClient({'light.kitchen_island': _state('light.kitchen_island', 'Kitchen Island')})
+    monkeypatch.setattr(entity_cache, "get_ha_client", lambda: client)
+    cache.client = client
+    return cache
+
+
+def test_offline_miss_is_confirmed_before_fuzzy_matching(offline_cache):
+    resolver = EntityResolver(offline_cache)
+    assert resolver.resolve('light.kitchen_island') == ('light.kitchen_island', False)
+    assert offline_cache.client.paths == ['/api/states/light.kitchen_island']
+    assert 'light.kitchen_island' in offline_cache
+
+
+def test_offline_confirmed_miss_is_fuzzy_matched(offline_cache):
+    resolver = EntityResolver(offline_cache)
+    assert resolver.resolve('light.kitchen_lights') == ('light.kitchen', True)
+    assert offline_cache.client.paths == ['/api/states/light.kitchen_lights']
+
+
+def test_offline_lookup_failure_is_not_fuzzy_matched(offline_cache):
+    offline_cache.client.status_code = 500
+    with pytest.raises(requests.HTTPError):
+        EntityResolver(offline_cache).resolve('light.kitchen_lights')
+
+
+def test_live_cache_miss_needs_no_lookup(cache, monkeypatch):
+    monkeypatch.setattr(entity_cache, "get_ha_client", lambda: pytest.fail("unexpected HA call"))
+    assert EntityResolver(cache).resolve('light.kitchen_lights') == ('light.kitchen', True)
@@ -0,0 +1,108 @@
+"""Pooled Home Assistant client: auth, default timeout and the retry policy."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ha_client
+from ha_client import HomeAssistantClient
+
+
+class FlakyHA(BaseHTTPRequestHandler):
+    """Answers 503 until `failures` requests have been seen, then 200."""
+
+    failures = 0
+    requests = []
+
+    def _reply(self):
+        type(self).requests.append((self.command, self.path, self.headers.get("Authorization")))
+        if self.headers.get("Content-Length"):
+            self.rfile.read(int(self.headers["Content-Length"]))
+        status = 503 if len(type(self).requests) <= type(self).failures else 200
+        body = b'{"state": "on"}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FlakyHA.failures = 0
+    FlakyHA.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHA)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/core/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_carry_the_token(server):
+    client = HomeAssistantClient(server, "secret", backoff_factor=0)
+
+    reply = client.get("/api/states/light.office")
+
+    assert reply.json() == {"state": "on"}
+    assert FlakyHA.requests == [("GET", "/core/api/states/light.office", "Bearer secret")]
+    client.close()
+
+
+def test_get_is_retried_through_a_gateway_error(server):
+    FlakyHA.failures = 2
+    client = HomeAssistantClient(server, "secret", retries=3, backoff_factor=0)
+
+    assert client.get("/api/states").status_code == 200
+    assert len(FlakyHA.requests) == 3
+    client.close()
+
+
+def test_get_gives_up_after_the_retry_budget(server):
+    FlakyHA.failures = 10
+    client = HomeAssistantClient(server, "secret", retries=2, backoff_factor=0)
+
+    # raise_on_status=False hands the last response back instead of raising
+    assert client.get("/api/states").status_code == 503
+    assert len(FlakyHA.requests) == 3
+    client.close()
+
+
+def test_post_is_not_retried_on_a_bad_response(server):
+    FlakyHA.failures = 1
+    client = HomeAssistantClient(server, "secret", backoff_factor=0)
+
+    # A service call may already have run; repeating it could toggle twice
+    assert client.post("/api/services/light/toggle", json={"entity_id": "light.office"}).status_code == 503
+    assert len(FlakyHA.requests) == 1
+    client.close()
+
+
+def test_default_timeout_is_applied(monkeypatch):
+    client = HomeAssistantClient("http://ha.local", "secret", timeout=4)
+    seen = {}
+    monkeypatch.setattr(client.session, "request", lambda method, url, **kwargs: seen.update(kwargs, url=url))
+
+    client.get("/api/states")
+    assert seen == {"timeout": 4, "url": "http://ha.local/api/states"}
+
+    client.get("/api/states", timeout=30)
+    assert seen["timeout"] == 30
+
+
+def test_configured_needs_url_and_token():
+    assert HomeAssistantClient("http://ha.local", "secret").configured
+    assert not HomeAssistantClient("http://ha.local", "").configured
+    assert not HomeAssistantClient(None, "secret").configured
+
+
+def test_client_is_shared(monkeypatch):
+    monkeypatch.setattr(ha_client, "_client", None)
+
+    assert ha_client.get_ha_client() is ha_client.get_ha_client()
@@ -0,0 +1,107 @@
+"""Chat history compaction: token budget, rolling summary and the verbatim tail."""
+from vertexai.generative_models import Content, Part
+
+from history import SUMMARY_ACK, SUMMARY_HEADER, HistoryCompactor, content_text
+from sessions import ConversationSession
+
+
+class FakeChat:
+    def __init__(self, history=None):
+        self.history = list(history or [])
+
+
+def _user(text):
+    return Content(role="user", parts=[Part.from_text(text)])
+
+
+def _model(text):
+    return Content(role="model", parts=[Part.from_text(text)])
+
+
+def _call(name):
+    return Content(role="model", parts=[Part.from_dict({"function_call": {"name": name, "args": {}}})])
+
+
+def _exchange(n):
+    return [_user(f"question {n} " + "x" * 200), _model(f"answer {n} " + "y" * 200)]
+
+
+def _session(history, preamble=None):
+    session = ConversationSession("kitchen", FakeChat(history))
+    session.preamble = preamble
+    return session
+
+
+def test_history_under_budget_is_left_alone():
+    session = _session(_exchange(1) + _exchange(2))
+    chat = session.chat
+
+    assert not HistoryCompactor(token_budget=10_000).compact(session, FakeChat)
+    assert session.chat is chat
+    assert session.summary == ""
+
+
+def test_old_exchanges_fold_into_a_summary():
+    history = [content for n in range(1, 6) for content in _exchange(n)]
+    session = _session(history)
+
+    assert HistoryCompactor(token_budget=100, keep_exchanges=2).compact(session, FakeChat)
+
+    new_history = session.chat.history
+    assert content_text(new_history[0]).startswith(SUMMARY_HEADER)
+    assert content_text(new_history[1]) == SUMMARY_ACK
+    # The last two exchanges stay verbatim
+    assert new_history[2:] == history[-4:]
+    assert len(session.summary.splitlines()) == 3
+    assert "question 1" in session.summary and "question 3" in session.summary
+    assert "question 4" not in session.summary
+
+
+def test_tool_rounds_stay_in_their_exchange():
+    history = [
+        _user("System prompt\n\nUser: what's the weather"),
+        _call("get_weather"),
+        _user("Function results:\nget_weather: sunny, 21 degrees"),
+        _model("It is sunny, Sir."),
+    ] + _exchange(2) + _exchange(3)
+    session = _session(history)
+
+    assert HistoryCompactor(token_budget=50, keep_exchanges=2).compact(session, FakeChat)
+
+    # The preamble and the function results message are not summarised as questions
+    assert session.summary == "- User: what's the weather | Tools: get_weather | You: It is sunny, Sir."
+
+
+def test_preamble_survives_compaction():
+    history = [content for n in range(1, 5) for content in _exchange(n)]
+    session = _session(history, preamble="USER PREFERENCES (from memory):\n- units: metric")
+
+    HistoryCompactor(token_budget=100, keep_exchanges=1).compact(session, FakeChat)
+
+    assert content_text(session.chat.history[0]).startswith("USER PREFERENCES (from memory):")
+
+
+def test_recompaction_replaces_the_old_summary_pair():
+    compactor = HistoryCompactor(token_budget=100, keep_exchanges=1)
+    session = _session([content for n in range(1, 4) for content in _exchange(n)])
+    compactor.compact(session, FakeChat)
+
+    for n in range(4, 6):
+        session.chat.history.extend(_exchange(n))
+    assert compactor.compact(session, FakeChat)
+
+    summary_openings = [c for c in session.chat.history if content_text(c).startswith(SUMMARY_HEADER)]
+    assert len(summary_openings) == 1
+    assert [f"question {n}" in session.summary for n in range(1, 6)] == [True, True, True, True, False]
+
+
+def test_summary_drops_oldest_lines_past_its_cap():
+    compactor = HistoryCompactor(token_budget=10, keep_exchanges=1, summary_max_chars=700)
+    session = _session([content for n in range(1, 8) for content in _exchange(n)])
+
+    compactor.compact(session, FakeChat)
+
+    # Each line is ~300 characters, so only the two newest fit
+    assert len(session.summary) <= 700
+    assert "question 5" in session.summary and "question 6" in session.summary
+    assert "question 4" not in session.summary
@@ -0,0 +1,82 @@
+"""The memory schema migration chain, from empty and pre-migration databases."""
+import sqlite3
+
+import pytest
+
+import memory_migrations
+from memory_migrations import MIGRATIONS, SCHEMA_VERSION, get_schema_version, migrate
+
+TABLES = {'preferences', 'facts', 'context', 'last_interaction', 'memory_vectors',
+          'context_rollup', 'spotify_search_cache'}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "memory.db"))
+    yield conn
+    conn.close()
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+            if not row[0].startswith('sqlite_')}
+
+
+def test_versions_are_contiguous():
+    assert [version for version, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+    assert SCHEMA_VERSION == len(MIGRATIONS)
+
+
+def test_new_database_gets_every_migration_once(conn):
+    assert migrate(conn) == len(MIGRATIONS)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert TABLES <= _tables(conn)
+    assert {'idx_context_error_time', 'idx_context_time', 'idx_facts_entity',
+            'idx_memory_vectors_key', 'idx_spotify_cache_hits'} <= _indexes(conn)
+
+    assert migrate(conn) == 0
+    assert get_schema_version(conn) == SCHEMA_VERSION
+
+
+def test_pre_migration_database_is_upgraded_in_place(conn):
+    # Schema as shipped before error tracking and user_version existed
+    conn.execute("CREATE TABLE preferences (key TEXT PRIMARY KEY, value TEXT, updated_at TIMESTAMP)")
+    conn.execute("""CREATE TABLE facts (entity_id TEXT, fact_key TEXT, fact_value TEXT, source TEXT,
+                    learned_at TIMESTAMP, PRIMARY KEY (entity_id, fact_key))""")
+    conn.execute("""CREATE TABLE context (id INTEGER PRIMARY KEY AUTOINCREMENT, user_input TEXT,
+                    assistant_response TEXT, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    conn.execute("INSERT INTO preferences (key, value) VALUES ('units', '\"metric\"')")
+    conn.execute("INSERT INTO context (user_input, assistant_response) VALUES ('hi', 'hello')")
+    conn.commit()
+
+    assert migrate(conn) == len(MIGRATIONS)
+    assert TABLES <= _tables(conn)
+    assert conn.execute("SELECT value FROM preferences WHERE key = 'units'").fetchone() == ('"metric"',)
+    assert conn.execute("SELECT user_input, is_error FROM context").fetchall() == [('hi', 0)]
+
+
+def test_partial_upgrade_resumes_from_the_last_applied_version(conn, monkeypatch):
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+
+    def broken(c):
+        c.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("disk I/O error")
+
+    original = list(MIGRATIONS)
+    patched = [(v, d, broken if v == 4 else m) for v, d, m in original]
+    monkeypatch.setattr(memory_migrations, "MIGRATIONS", patched)
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn)
+    # v3 committed, v4 rolled back with its half-created table
+    assert get_schema_version(conn) == 3
+    assert 'memory_vectors' in _tables(conn)
+    assert 'half_done' not in _tables(conn)
+
+    monkeypatch.setattr(memory_migrations, "MIGRATIONS", original)
+    assert migrate(conn) == SCHEMA_VERSION - 3
+    assert get_schema_version(conn) == SCHEMA_VERSION
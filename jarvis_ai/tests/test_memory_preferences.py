@@ -0,0 +1,85 @@
+"""Preference reads are served from the shared cache without touching SQLite."""
+import sqlite3
+
+import pytest
+
+from memory import Memory, PreferenceCache
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    yield memory
+    memory.close()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts cache reloads and data_version checks."""
+    calls = {'load': 0, 'data_version': 0}
+    load, data_version = PreferenceCache.load, PreferenceCache.data_version
+
+    def counting_load(self, *args, **kwargs):
+        calls['load'] += 1
+        return load(self, *args, **kwargs)
+
+    def counting_data_version(self):
+        calls['data_version'] += 1
+        return data_version(self)
+
+    monkeypatch.setattr(PreferenceCache, "load", counting_load)
+    monkeypatch.setattr(PreferenceCache, "data_version", counting_data_version)
+    return calls
+
+
+def test_context_writes_do_not_reload_preferences(memory, loads):
+    memory.set_preference("temperature_unit", "celsius")
+    assert loads['load'] == 1
+    before = dict(loads)
+
+    for i in range(5):
+        memory.save_context(f"question {i}", f"answer {i}")
+        memory.get_recent_context()
+        assert memory.get_all_preferences() == {"temperature_unit": "celsius"}
+        memory.flush()
+
+    assert loads == before
+
+
+def test_own_writes_are_read_back_from_the_cache(memory, loads):
+    memory.set_preference("favorite", {"color": "blue"})
+    memory.set_preference("skip_unit_suffix", True)
+    memory.delete_preference("skip_unit_suffix")
+    value = memory.get_preference("favorite")
+    value["color"] = "red"
+    assert memory.get_all_preferences() == {"favorite": {"color": "blue"}}
+    assert loads['load'] == 1
+
+
+def test_recheck_after_unrelated_commits_keeps_the_decoded_values(memory):
+    memory.set_preference("temperature_unit", "celsius")
+    cache = memory._preferences
+    values, version = cache.current(), memory.preferences_version
+
+    memory.save_context("hello", "hi")
+    memory.flush()
+    cache.recheck_interval = 0
+    assert memory.get_all_preferences() == {"temperature_unit": "celsius"}
+    assert cache.current() is values
+    assert memory.preferences_version == version
+
+
+def test_outside_writes_are_picked_up_on_the_next_recheck(memory, tmp_path):
+    memory.set_preference("garden_camera", "camera.old")
+    memory.flush()
+
+    outside = sqlite3.connect(str(tmp_path / "memory.db"))
+    outside.execute("UPDATE preferences SET value = ? WHERE key = ?", ('"camera.new"', "garden_camera"))
+    outside.commit()
+    outside.close()
+
+    version = memory.preferences_version
+    assert memory.get_preference("garden_camera") == "camera.old"
+    memory._preferences.recheck_interval = 0
+    assert memory.get_preference("garden_camera") == "camera.new"
+    assert memory.preferences_version == version + 1
@@ -0,0 +1,109 @@
+"""Memory snapshots: JSON-lines export, import, replace and rollback."""
+import io
+import json
+
+import pytest
+
+import memory as memory_module
+from memory import SNAPSHOT_FORMAT, Memory
+from semantic_memory import SOURCE_FACT, HashingEmbedder
+
+
+@pytest.fixture
+def source(tmp_path):
+    memory = Memory(str(tmp_path / "source.db"))
+    memory.set_preference("temperature_unit", "celsius")
+    memory.set_preference("favourite_rooms", ["office", "garden"])
+    memory.remember_fact("light.office", "brightness", "40")
+    memory.save_last_interaction("light", "light.office", "turn_on")
+    yield memory
+    memory.close()
+
+
+@pytest.fixture
+def target(tmp_path):
+    memory = Memory(str(tmp_path / "target.db"))
+    yield memory
+    memory.close()
+
+
+def _export(memory):
+    buffer = io.StringIO()
+    counts = memory.export_snapshot(buffer)
+    return counts, buffer.getvalue()
+
+
+def test_export_writes_a_header_and_one_line_per_row(source):
+    counts, text = _export(source)
+    header, *records = [json.loads(line) for line in text.splitlines()]
+
+    assert header['format'] == SNAPSHOT_FORMAT
+    assert counts == {'preferences': 2, 'facts': 1, 'last_interaction': 1, 'context_rollup': 0}
+    # Preference values are snapshotted decoded, not as their stored JSON
+    assert ['p', 'favourite_rooms', ['office', 'garden']] in [record[:3] for record in records]
+    assert len(records) == 4
+
+
+def test_round_trip(source, target):
+    _, text = _export(source)
+
+    counts = target.import_snapshot(io.StringIO(text))
+
+    assert counts == {'preferences': 2, 'facts': 1, 'last_interaction': 1, 'context_rollup': 0}
+    assert target.get_all_preferences() == {"temperature_unit": "celsius", "favourite_rooms": ["office", "garden"]}
+    assert target.recall_fact("light.office", "brightness") == "40"
+    assert target.get_last_interaction("light")['entity_id'] == "light.office"
+
+
+def test_round_trip_through_a_file(source, target, tmp_path):
+    path = str(tmp_path / "snapshot.jsonl")
+    source.export_snapshot(path)
+
+    target.import_snapshot(path)
+
+    assert target.get_preference("temperature_unit") == "celsius"
+
+
+def test_import_merges_unless_replacing(source, target):
+    _, text = _export(source)
+    target.set_preference("temperature_unit", "fahrenheit")
+    target.set_preference("wake_word", "jarvis")
+
+    target.import_snapshot(io.StringIO(text))
+    assert target.get_preference("temperature_unit") == "celsius"
+    assert target.get_preference("wake_word") == "jarvis"
+
+    target.import_snapshot(io.StringIO(text), replace=True)
+    assert target.get_preference("wake_word") is None
+
+
+def test_malformed_snapshot_rolls_back(source, target, monkeypatch):
+    monkeypatch.setattr(memory_module, "SNAPSHOT_BATCH_ROWS", 1)
+    _, text = _export(source)
+    target.set_preference("wake_word", "jarvis")
+
+    with pytest.raises(ValueError, match="line 4"):
+        target.import_snapshot(io.StringIO(text.replace('["f"', '["x"')), replace=True)
+
+    # Nothing from the partial import (even flushed batches) is kept
+    assert target.get_all_preferences() == {"wake_word": "jarvis"}
+    assert target.recall_fact("light.office", "brightness") is None
+
+
+def test_foreign_or_newer_snapshot_is_refused(target):
+    with pytest.raises(ValueError):
+        target.import_snapshot(io.StringIO('{"format": "something-else"}\n'))
+    with pytest.raises(ValueError):
+        target.import_snapshot(io.StringIO(json.dumps({"format": SNAPSHOT_FORMAT, "version": 99}) + "\n"))
+
+
+def test_imported_facts_are_recallable(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_module, "_semantic_indexes", {})
+    _, text = _export(source)
+    target = Memory(str(tmp_path / "semantic.db"), embedder=HashingEmbedder())
+
+    target.import_snapshot(io.StringIO(text))
+    target.flush()
+
+    assert target.recall("office light brightness", sources=[SOURCE_FACT])[0]['text'] == "light.office brightness: 40"
+    target.close()
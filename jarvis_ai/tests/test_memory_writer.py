@@ -0,0 +1,135 @@
+"""MemoryWriter batching, flush and call semantics."""
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from memory_writer import MemoryWriter
+
+INSERT = "INSERT INTO notes (body) VALUES (?)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "memory.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT UNIQUE)")
+    conn.execute("CREATE TABLE other (id INTEGER PRIMARY KEY)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def writer(db_path):
+    # A long window, so only a flush or close ends a batch early
+    writer = MemoryWriter(db_path, batch_window=5)
+    yield writer
+    writer.close()
+
+
+def _bodies(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT body FROM notes ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def _record_batches(writer, monkeypatch):
+    batches = []
+    execute = writer._execute
+
+    def recording(batch):
+        batches.append(len(batch))
+        return execute(batch)
+
+    monkeypatch.setattr(writer, "_execute", recording)
+    return batches
+
+
+def test_queued_writes_commit_in_one_transaction(writer, db_path, monkeypatch):
+    batches = _record_batches(writer, monkeypatch)
+    writer.submit((INSERT, ("a",)))
+    writer.submit((INSERT, ("b",)), (INSERT, ("c",)))
+    writer.submit((INSERT, ("d",)))
+    assert writer.pending == 4
+
+    assert writer.flush()
+    assert batches == [3]
+    assert writer.pending == 0
+    assert _bodies(db_path) == ["a", "b", "c", "d"]
+
+
+def test_flush_only_waits_for_the_tables_asked_for(writer, db_path):
+    writer.submit((INSERT, ("a",)))
+    assert writer.flush(["other"], timeout=0)
+    assert writer.pending == 1
+    assert _bodies(db_path) == []
+
+    assert writer.flush(["notes"])
+    assert _bodies(db_path) == ["a"]
+
+
+def test_flush_with_nothing_pending_returns_immediately(writer):
+    assert writer.flush(timeout=0)
+    writer.submit()
+    assert writer.pending == 0
+
+
+def test_failed_batch_is_retried_group_by_group(writer, db_path):
+    writer.submit((INSERT, ("a",)))
+    # Second statement violates UNIQUE, so its whole group is dropped
+    writer.submit((INSERT, ("b",)), (INSERT, ("a",)))
+    writer.submit((INSERT, ("c",)))
+    assert writer.flush()
+    assert _bodies(db_path) == ["a", "c"]
+    assert writer.pending == 0
+
+
+def test_call_sees_queued_writes_and_rolls_back_on_error(writer, db_path):
+    writer.submit((INSERT, ("a",)))
+    assert writer.call(lambda conn: conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]) == 1
+
+    def failing(conn):
+        conn.execute(INSERT, ("b",))
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        writer.call(failing)
+    assert _bodies(db_path) == ["a"]
+
+
+def test_close_commits_outstanding_writes(db_path):
+    writer = MemoryWriter(db_path, batch_window=5)
+    writer.submit((INSERT, ("a",)))
+    writer.close()
+    assert _bodies(db_path) == ["a"]
+    with pytest.raises(RuntimeError):
+        writer.call(lambda conn: None)
+
+
+def test_maintenance_runs_at_startup_in_a_transaction(db_path):
+    def maintenance(conn):
+        assert conn.in_transaction
+        conn.execute(INSERT, ("maintained",))
+
+    writer = MemoryWriter(db_path, maintenance=maintenance)
+    writer.close()
+    assert _bodies(db_path) == ["maintained"]
+
+
+def test_queued_writes_are_committed_at_interpreter_exit(db_path):
+    # A script that writes through Memory's writer and exits without close()
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r})
+        from memory_writer import MemoryWriter
+        writer = MemoryWriter({db_path!r}, batch_window=60)
+        writer.submit(({INSERT!r}, ("queued",)))
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+    assert _bodies(db_path) == ["queued"]
@@ -0,0 +1,118 @@
+"""Latency spans: the metrics registry, Prometheus rendering, turn traces and /metrics."""
+import asyncio
+import sqlite3
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import metrics
+from api_server import JarvisHTTPAPI
+from metrics import MetricsRegistry, TimedConnection, record_span, span
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "METRICS", registry)
+    return registry
+
+
+def test_quantiles_use_nearest_rank(registry):
+    for ms in range(1, 101):
+        registry.observe('tool', ms / 1000, (('tool', 'get_weather'),), 'ok')
+
+    assert registry.quantiles('tool', tool='get_weather') == {0.5: 0.05, 0.95: 0.095, 0.99: 0.099}
+    assert registry.quantiles('tool', tool='never_called') == {}
+
+
+def test_span_records_status_and_in_flight(registry):
+    with span('tool', tool='get_weather'):
+        assert 'jarvis_in_flight{kind="tool"} 1' in registry.render()
+    with pytest.raises(RuntimeError):
+        with span('tool', tool='get_weather'):
+            raise RuntimeError("boom")
+
+    text = registry.render()
+    assert 'jarvis_tool_total{tool="get_weather",status="ok"} 1' in text
+    assert 'jarvis_tool_total{tool="get_weather",status="error"} 1' in text
+    assert 'jarvis_tool_seconds_count{tool="get_weather"} 2' in text
+    assert 'jarvis_in_flight{kind="tool"} 0' in text
+
+
+def test_cancelled_span_is_labelled_cancelled(registry):
+    async def run():
+        async def slow():
+            with span('model_round'):
+                await asyncio.sleep(10)
+        task = asyncio.create_task(slow())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert 'jarvis_model_round_total{status="cancelled"} 1' in registry.render()
+
+
+def test_paused_time_is_left_out_of_the_span(registry, monkeypatch):
+    now = iter([0.0, 1.0, 5.0, 6.0])
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: next(now))
+
+    with span('model_round') as clock:
+        with clock.paused():
+            pass
+
+    # 6s wall clock, 4s of it paused
+    assert registry.quantiles('model_round')[0.5] == pytest.approx(2.0)
+
+
+def test_render_declares_every_span_kind(registry):
+    text = registry.render()
+    for kind in metrics.SPAN_HELP:
+        assert f"# TYPE jarvis_{kind}_seconds summary" in text
+        assert f"# TYPE jarvis_{kind}_total counter" in text
+
+
+def test_label_values_are_escaped(registry):
+    record_span('http', 0.1, host='a"b\\c')
+    assert 'host="a\\"b\\\\c"' in registry.render()
+
+
+def test_turn_trace_collects_spans_and_logs_a_breakdown(registry, caplog):
+    metrics.start_turn_trace()
+    record_span('tool', 0.5, tool='get_weather')
+    record_span('tool', 0.25, tool='get_weather')
+    record_span('http', 0.1, host='api.weather.example')
+
+    with caplog.at_level('INFO', logger='metrics'):
+        metrics.finish_turn_trace(1.0)
+
+    assert "Turn took 1.00s: tool get_weather 0.75s x2, http api.weather.example 0.10s" in caplog.text
+    # Outside a turn nothing is collected
+    assert metrics._turn_spans.get() is None
+
+
+def test_sqlite_statements_are_timed_by_table(registry):
+    conn = sqlite3.connect(":memory:", factory=TimedConnection)
+    conn.execute("CREATE TABLE IF NOT EXISTS preferences (key TEXT, value TEXT)")
+    conn.executemany("INSERT INTO preferences VALUES (?, ?)", [("units", "metric")])
+    conn.execute("SELECT value FROM preferences").fetchall()
+    conn.close()
+
+    text = registry.render()
+    assert 'jarvis_sqlite_total{op="INSERT",table="preferences",status="ok"} 1' in text
+    assert 'jarvis_sqlite_total{op="SELECT",table="preferences",status="ok"} 1' in text
+
+
+def test_metrics_endpoint_serves_the_registry():
+    record_span('tool', 0.2, tool='metrics_endpoint_probe')
+
+    async def run():
+        async with TestClient(TestServer(JarvisHTTPAPI(jarvis=None).app)) as client:
+            reply = await client.get('/metrics')
+            return reply.status, reply.headers.get('Content-Type', ''), await reply.text()
+
+    status, content_type, body = asyncio.run(run())
+    assert status == 200
+    assert content_type.startswith('text/plain')
+    assert 'jarvis_tool_seconds_count{tool="metrics_endpoint_probe"} 1' in body
@@ -0,0 +1,99 @@
+"""QBittorrentClient login and session reuse."""
+import pytest
+
+from qbittorrent_client import QBittorrentAuthError, QBittorrentClient
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeSession:
+    """WebUI stand-in: sets a session cookie on "Ok." logins and 403s without one."""
+
+    def __init__(self, cookie_name="SID", login_body="Ok.", login_status=200):
+        self.headers = {}
+        self.cookies = {}
+        self.cookie_name = cookie_name
+        self.login_body = login_body
+        self.login_status = login_status
+        self.logins = 0
+        self.requests = []
+
+    def post(self, url, data=None, timeout=None):
+        self.logins += 1
+        if self.login_status == 200 and self.login_body == "Ok." and self.cookie_name:
+            self.cookies[self.cookie_name] = f"session-{self.logins}"
+        return FakeResponse(self.login_status, self.login_body)
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        if not self.cookies:
+            return FakeResponse(403, "Forbidden")
+        return FakeResponse(200, "v5.0.0")
+
+    def expire(self):
+        self.cookies.clear()
+
+
+def _client(session, username="admin", password="secret"):
+    client = QBittorrentClient("http://qbit:8080/", username, password)
+    client.session = session
+    return client
+
+
+@pytest.mark.parametrize('cookie_name', ["SID", "QBT_SID_8080", None])
+def test_logs_in_once_whatever_the_cookie_is_called(cookie_name):
+    # None: a reverse proxy that authenticates by its own means and sets no cookie
+    session = FakeSession(cookie_name=cookie_name)
+    if cookie_name is None:
+        session.cookies["proxy"] = "token"
+    client = _client(session)
+    for _ in range(3):
+        assert client.get("/api/v2/app/version").status_code == 200
+    assert session.logins == 1
+    assert client.logged_in
+
+
+def test_rejected_credentials_raise():
+    client = _client(FakeSession(login_body="Fails."))
+    with pytest.raises(QBittorrentAuthError, match="authentication failed"):
+        client.get("/api/v2/app/version")
+    assert not client.logged_in
+
+
+def test_banned_ip_raises():
+    client = _client(FakeSession(login_status=403, login_body="Forbidden"))
+    with pytest.raises(QBittorrentAuthError, match="banned"):
+        client.get("/api/v2/app/version")
+
+
+def test_expired_session_logs_in_again_and_retries_once():
+    session = FakeSession()
+    client = _client(session)
+    client.get("/api/v2/app/version")
+    session.expire()
+    assert client.get("/api/v2/torrents/info").status_code == 200
+    assert session.logins == 2
+    assert session.requests[-2:] == [("GET", "http://qbit:8080/api/v2/torrents/info")] * 2
+
+
+def test_stale_login_is_skipped_after_another_thread_logged_in():
+    session = FakeSession()
+    client = _client(session)
+    client.login()
+    rejected = client._login_count
+    client.login(stale_login=rejected)
+    # A second thread rejected with the same session must not log in yet again
+    client.login(stale_login=rejected)
+    assert session.logins == 2
+
+
+def test_no_login_without_credentials():
+    session = FakeSession()
+    session.cookies["bypass"] = "local"
+    client = _client(session, username="", password="")
+    assert client.get("/api/v2/app/version").status_code == 200
+    assert session.logins == 0
@@ -0,0 +1,154 @@
+"""Semantic recall: the hashing embedder, the vector index and Memory.recall()."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import memory as memory_module
+from memory import Memory
+from semantic_memory import (
+    SOURCE_CONTEXT, SOURCE_FACT, HashingEmbedder, SemanticIndex, VertexEmbedder,
+    create_embedder, format_exchange,
+)
+
+
+def _dot(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+# ===== EMBEDDER =====
+
+def test_hashing_embedder_is_stable_and_normalised():
+    embedder = HashingEmbedder(dim=64)
+    first, again = embedder.embed(["turn on the garden lights"]) + embedder.embed(["turn on the garden lights"])
+
+    assert first == again
+    assert _dot(first, first) == pytest.approx(1.0)
+
+
+def test_similar_wording_scores_higher():
+    garden, lights, weather = HashingEmbedder().embed([
+        "what is on the garden camera",
+        "show me the garden cameras",
+        "will it rain tomorrow",
+    ])
+
+    assert _dot(garden, lights) > _dot(garden, weather)
+
+
+def test_create_embedder_kinds():
+    assert isinstance(create_embedder(None), HashingEmbedder)
+    assert isinstance(create_embedder("bogus"), HashingEmbedder)
+    assert isinstance(create_embedder("vertex", project="p"), VertexEmbedder)
+    assert create_embedder("off") is None
+
+
+# ===== INDEX =====
+
+@pytest.fixture
+def index():
+    index = SemanticIndex(None, HashingEmbedder())
+    yield index
+    index.close()
+
+
+def test_search_returns_the_most_similar_first(index):
+    index.add(SOURCE_CONTEXT, format_exchange("what's on the garden camera", "Two foxes, Sir."))
+    index.add(SOURCE_CONTEXT, format_exchange("will it rain tomorrow", "Light showers, Sir."))
+
+    results = index.search("is anything on the garden camera")
+
+    assert results[0]['text'].startswith("User: what's on the garden camera")
+    assert all(r['text'] != "User: will it rain tomorrow\nYou: Light showers, Sir." for r in results)
+
+
+def test_keyed_entries_are_replaced_and_removed(index):
+    index.add(SOURCE_FACT, "office light brightness: 40", key="light.office.brightness")
+    index.add(SOURCE_FACT, "office light brightness: 80", key="light.office.brightness")
+
+    assert len(index) == 1
+    assert index.search("office light brightness")[0]['text'] == "office light brightness: 80"
+
+    index.remove(SOURCE_FACT, "light.office.brightness")
+    assert index.search("office light brightness") == []
+
+
+def test_search_can_be_limited_to_one_source(index):
+    index.add(SOURCE_CONTEXT, format_exchange("office light brightness", "Set to 40, Sir."))
+    index.add(SOURCE_FACT, "office light brightness: 40", key="light.office.brightness")
+
+    results = index.search("office light brightness", sources=[SOURCE_FACT])
+    assert [r['source'] for r in results] == [SOURCE_FACT]
+
+
+def test_prune_drops_old_entries_and_reuses_their_slots(index):
+    index.add(SOURCE_CONTEXT, "garden camera foxes")
+    statements = index.prune(SOURCE_CONTEXT, datetime.utcnow() + timedelta(seconds=1))
+
+    assert statements and len(index) == 0
+    index.add(SOURCE_CONTEXT, "kitchen radio")
+    assert index._next_slot == 1
+
+
+# ===== MEMORY =====
+
+@pytest.fixture
+def fresh_indexes(monkeypatch):
+    # Indexes are shared per database path; each test opens its own
+    monkeypatch.setattr(memory_module, "_semantic_indexes", {})
+
+
+def test_memory_recalls_saved_exchanges_and_facts(tmp_path, fresh_indexes):
+    memory = Memory(str(tmp_path / "memory.db"), embedder=HashingEmbedder())
+    memory.save_context("what's on the garden camera", "Two foxes on the lawn, Sir.")
+    memory.save_context("what's on the garden camera now", "I encountered an error, Sir.", is_error=True)
+    memory.remember_fact("light.office", "preferred_brightness", "40 percent")
+    memory.flush()
+
+    texts = [m['text'] for m in memory.recall("anything on the garden camera?", limit=5)]
+    assert texts[0] == format_exchange("what's on the garden camera", "Two foxes on the lawn, Sir.")
+    # Error replies are never indexed
+    assert not any("error" in text for text in texts)
+    assert memory.recall("office light preferred brightness", sources=[SOURCE_FACT])[0]['text'] == \
+        "light.office preferred brightness: 40 percent"
+    memory.close()
+
+
+def test_recall_is_empty_without_an_embedder(tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    memory.save_context("what's on the garden camera", "Two foxes, Sir.")
+    memory.flush()
+
+    assert memory.recall("garden camera") == []
+    memory.close()
+
+
+def test_index_survives_a_restart(tmp_path, fresh_indexes, monkeypatch):
+    db_path = str(tmp_path / "memory.db")
+    memory = Memory(db_path, embedder=HashingEmbedder())
+    memory.save_context("what's on the garden camera", "Two foxes, Sir.")
+    memory.close()
+
+    monkeypatch.setattr(memory_module, "_semantic_indexes", {})
+    embedded = []
+    embedder = HashingEmbedder()
+    embed = embedder.embed
+    monkeypatch.setattr(embedder, "embed", lambda texts: embedded.extend(texts) or embed(texts))
+
+    reopened = Memory(db_path, embedder=embedder)
+    assert reopened.recall("garden camera")[0]['text'].startswith("User: what's on the garden camera")
+    # Stored vectors were reused; only the query was embedded
+    assert embedded == ["garden camera"]
+    reopened.close()
+
+
+def test_switching_embedders_re_embeds_stored_memories(tmp_path, fresh_indexes, monkeypatch):
+    db_path = str(tmp_path / "memory.db")
+    memory = Memory(db_path, embedder=HashingEmbedder(dim=256))
+    memory.save_context("what's on the garden camera", "Two foxes, Sir.")
+    memory.close()
+
+    monkeypatch.setattr(memory_module, "_semantic_indexes", {})
+    reopened = Memory(db_path, embedder=HashingEmbedder(dim=128))
+
+    assert reopened.recall("garden camera")[0]['text'].startswith("User: what's on the garden camera")
+    reopened.close()
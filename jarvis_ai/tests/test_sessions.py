@@ -0,0 +1,108 @@
+"""Per-conversation chat sessions: isolation, LRU cap and idle TTL."""
+import asyncio
+import itertools
+
+import pytest
+
+import sessions
+from sessions import DEFAULT_CONVERSATION_ID, SessionManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "monotonic", clock)
+    return clock
+
+
+def _manager(**kwargs):
+    chats = itertools.count(1)
+    return SessionManager(chat_factory=lambda: f"chat-{next(chats)}", **kwargs)
+
+
+def test_each_conversation_gets_its_own_chat(clock):
+    manager = _manager()
+
+    kitchen = manager.get("kitchen")
+    office = manager.get("office")
+
+    assert kitchen.chat != office.chat
+    assert manager.get("kitchen") is kitchen
+    assert len(manager) == 2
+
+
+def test_missing_id_uses_the_default_session(clock):
+    manager = _manager()
+
+    assert manager.get(None) is manager.get(DEFAULT_CONVERSATION_ID)
+    assert DEFAULT_CONVERSATION_ID in manager
+
+
+def test_least_recently_used_session_is_evicted_over_the_cap(clock):
+    manager = _manager(max_sessions=2)
+    manager.get("kitchen")
+    manager.get("office")
+    # Using kitchen again makes office the least recently used
+    manager.get("kitchen")
+
+    manager.get("garage")
+
+    assert "office" not in manager
+    assert "kitchen" in manager and "garage" in manager
+
+
+def test_idle_sessions_expire_after_the_ttl(clock):
+    manager = _manager(ttl_seconds=60)
+    kitchen = manager.get("kitchen")
+    clock.now += 30
+    manager.get("office")
+
+    clock.now += 31
+    assert manager.evict_expired() == 1
+
+    assert "kitchen" not in manager
+    assert "office" in manager
+    # A later turn starts a fresh chat
+    assert manager.get("kitchen") is not kitchen
+
+
+def test_session_with_a_running_turn_is_not_expired(clock):
+    manager = _manager(ttl_seconds=60)
+    kitchen = manager.get("kitchen")
+
+    async def run():
+        async with kitchen.lock:
+            clock.now += 120
+            return manager.evict_expired()
+
+    assert asyncio.run(run()) == 0
+    assert "kitchen" in manager
+
+
+def test_zero_ttl_never_expires(clock):
+    manager = _manager(ttl_seconds=0)
+    manager.get("kitchen")
+    clock.now += 10 ** 6
+
+    assert manager.evict_expired() == 0
+    assert "kitchen" in manager
+
+
+def test_reset_one_or_all(clock):
+    manager = _manager()
+    manager.get("kitchen")
+    manager.get("office")
+
+    manager.reset("kitchen")
+    assert "kitchen" not in manager and "office" in manager
+
+    manager.reset()
+    assert len(manager) == 0
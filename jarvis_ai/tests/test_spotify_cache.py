@@ -0,0 +1,178 @@
+"""SpotifySearchCache TTL, LRU, refresh and persistence behaviour."""
+import pytest
+
+import spotify_cache
+from memory import Memory
+from spotify_cache import POPULAR_HITS, PERSIST_BATCH, SpotifySearchCache, normalise_query
+
+TTL = 1000
+
+
+class FakeSearch:
+    """Stands in for search_spotify, counting the queries it is asked."""
+
+    def __init__(self):
+        self.queries = []
+        self.results = {}
+        self.error = None
+
+    def __call__(self, query):
+        self.queries.append(query)
+        if self.error is not None:
+            raise self.error
+        return self.results.get(query, (f"spotify:track:{normalise_query(query)}", query))
+
+
+class FakeMemory:
+    """Records the cache's database writes."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.saved = []
+        self.deleted = []
+
+    def prune_spotify_cache(self, keep):
+        pass
+
+    def get_spotify_cache_entries(self, limit):
+        return self.rows[:limit]
+
+    def save_spotify_cache_entries(self, entries):
+        self.saved.append([entry['query'] for entry in entries])
+
+    def delete_spotify_cache_entries(self, queries):
+        self.deleted.extend(queries)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def no_refresher(monkeypatch):
+    # Refreshes are driven directly instead of by the background thread
+    monkeypatch.setattr(SpotifySearchCache, "_start_refresher", lambda self: None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(spotify_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def search():
+    return FakeSearch()
+
+
+def _cache(search, memory=None, **kwargs):
+    return SpotifySearchCache(memory, search=search, ttl=TTL, **kwargs)
+
+
+def test_normalise_query():
+    assert normalise_query("  AC/DC -  Back in Black! ") == "ac dc back in black"
+    assert normalise_query("Ｂｅｙｏｎｃé") == "beyoncé"
+    assert normalise_query(None) == ""
+
+
+def test_equivalent_queries_hit_the_cache_until_the_ttl(search, clock):
+    cache = _cache(search)
+    assert cache.resolve("AC/DC") == ("spotify:track:ac dc", "AC/DC")
+    assert cache.resolve("ac dc") == ("spotify:track:ac dc", "AC/DC")
+    assert search.queries == ["AC/DC"]
+
+    clock.now += TTL
+    cache.resolve("ac dc")
+    assert search.queries == ["AC/DC", "ac dc"]
+
+
+def test_misses_are_not_cached(search, clock):
+    search.results["nothing"] = None
+    cache = _cache(search)
+    assert cache.resolve("nothing") is None
+    assert cache.resolve("nothing") is None
+    assert len(search.queries) == 2
+    assert len(cache) == 0
+
+
+def test_stale_entry_is_served_when_spotify_fails(search, clock):
+    cache = _cache(search)
+    cache.resolve("daft punk")
+    clock.now += TTL
+    search.error = ConnectionError("offline")
+    assert cache.resolve("Daft Punk") == ("spotify:track:daft punk", "daft punk")
+
+    search.error = ConnectionError("offline")
+    with pytest.raises(ConnectionError):
+        cache.resolve("unknown band")
+
+
+def test_least_recently_used_entry_is_evicted(search, clock):
+    memory = FakeMemory()
+    cache = _cache(search, memory, max_entries=2)
+    cache.resolve("one")
+    cache.resolve("two")
+    cache.resolve("one")
+    cache.resolve("three")
+    assert memory.deleted == ["two"]
+    assert len(cache) == 2
+    cache.resolve("one")
+    assert search.queries == ["one", "two", "three"]
+
+
+def test_popular_entries_refresh_with_the_original_text(search, clock):
+    cache = _cache(search)
+    cache.resolve("AC/DC")
+    for _ in range(POPULAR_HITS):
+        cache.resolve("ac dc")
+    cache.resolve("rare song")
+
+    assert cache.refresh_popular() == 0
+    clock.now += TTL * spotify_cache.REFRESH_AGE_FRACTION + 1
+    search.results["AC/DC"] = ("spotify:track:new", "AC/DC (Remastered)")
+    assert cache.refresh_popular() == 1
+    assert search.queries[-1] == "AC/DC"
+    assert cache.resolve("ac/dc") == ("spotify:track:new", "AC/DC (Remastered)")
+
+
+def test_hits_are_written_in_batches(search, clock):
+    memory = FakeMemory()
+    cache = _cache(search, memory)
+    queries = [f"song {i}" for i in range(PERSIST_BATCH)]
+    for query in queries:
+        cache.resolve(query)
+    assert len(memory.saved) == PERSIST_BATCH
+
+    memory.saved.clear()
+    for query in queries[:-1]:
+        cache.resolve(query)
+    assert memory.saved == []
+    cache.resolve(queries[-1])
+    assert len(memory.saved) == 1
+    assert sorted(memory.saved[0]) == sorted(normalise_query(q) for q in queries)
+
+    cache.resolve(queries[0])
+    cache.stop()
+    assert memory.saved[-1] == ["song 0"]
+
+
+def test_entries_survive_a_restart(search, clock, tmp_path):
+    memory = Memory(str(tmp_path / "memory.db"))
+    try:
+        cache = _cache(search, memory)
+        cache.resolve("AC/DC")
+        cache.resolve("ac dc")
+        cache.stop()
+
+        restarted = _cache(search, memory)
+        assert restarted.resolve("AC DC") == ("spotify:track:ac dc", "AC/DC")
+        assert search.queries == ["AC/DC"]
+        assert restarted._entries["ac dc"]['search_text'] == "AC/DC"
+        assert restarted._entries["ac dc"]['hits'] == 3
+    finally:
+        memory.close()
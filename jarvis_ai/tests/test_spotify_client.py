@@ -0,0 +1,156 @@
+"""Shared Spotify client: one instance, cached token, and play_music's device lookup."""
+import threading
+import time
+
+import pytest
+
+import config_helper
+import spotify_client
+import tools
+from entity_cache import EntityStateCache
+from spotify_client import TOKEN_REFRESH_MARGIN, CachedClientCredentials, get_spotify_client, search_spotify
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(spotify_client.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    monkeypatch.setattr(config_helper, "SPOTIPY_CLIENT_ID", "client-id")
+    monkeypatch.setattr(config_helper, "SPOTIPY_CLIENT_SECRET", "client-secret")
+    monkeypatch.setattr(spotify_client, "_client", None)
+
+
+@pytest.fixture
+def exchanges(monkeypatch):
+    """Counts token exchanges instead of calling accounts.spotify.com."""
+    calls = []
+
+    def request_access_token(self):
+        calls.append(1)
+        time.sleep(0.05)
+        return {"access_token": f"token-{len(calls)}", "token_type": "Bearer", "expires_in": 3600}
+
+    monkeypatch.setattr(CachedClientCredentials, "_request_access_token", request_access_token)
+    return calls
+
+
+def test_client_is_shared(configured):
+    assert get_spotify_client() is get_spotify_client()
+
+
+def test_no_client_without_credentials(monkeypatch):
+    monkeypatch.setattr(spotify_client, "_client", None)
+    monkeypatch.setattr(config_helper, "SPOTIPY_CLIENT_SECRET", "")
+
+    assert get_spotify_client() is None
+    assert search_spotify("jazz") is None
+
+
+def test_token_is_reused_until_shortly_before_expiry(configured, exchanges, clock):
+    auth = get_spotify_client().auth_manager
+
+    assert auth.get_access_token() == "token-1"
+    clock.now += 3600 - TOKEN_REFRESH_MARGIN - 1
+    assert auth.get_access_token() == "token-1"
+
+    clock.now += 2
+    assert auth.get_access_token() == "token-2"
+    assert len(exchanges) == 2
+
+
+def test_racing_calls_share_one_exchange(configured, exchanges, clock):
+    auth = get_spotify_client().auth_manager
+    tokens = []
+
+    threads = [threading.Thread(target=lambda: tokens.append(auth.get_access_token())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tokens == ["token-1"] * 5
+    assert len(exchanges) == 1
+
+
+def test_token_is_kept_in_memory(configured, exchanges, clock, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert spotify_client.warm_spotify_token()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_search_prefers_tracks_over_albums_and_artists(configured, monkeypatch):
+    results = {
+        'tracks': {'items': []},
+        'albums': {'items': [{'uri': 'spotify:album:1', 'name': 'Kind of Blue'}]},
+        'artists': {'items': [{'uri': 'spotify:artist:1', 'name': 'Miles Davis'}]},
+        'playlists': {'items': []},
+    }
+    monkeypatch.setattr(get_spotify_client(), "search", lambda **kwargs: results)
+
+    assert search_spotify("kind of blue") == ('spotify:album:1', "Album: Kind of Blue")
+
+    results['tracks']['items'] = [{'uri': 'spotify:track:1', 'name': 'So What', 'artists': [{'name': 'Miles Davis'}]}]
+    assert search_spotify("kind of blue") == ('spotify:track:1', "So What by Miles Davis")
+
+
+# ===== DEVICE LOOKUP =====
+
+class FakeSearchCache:
+    def resolve(self, query):
+        return 'spotify:track:1', "So What by Miles Davis"
+
+
+class FakeHAClient:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, path, json=None):
+        self.posts.append((path, json))
+        return type("Response", (), {"raise_for_status": lambda self: None})()
+
+
+@pytest.fixture
+def players(configured, monkeypatch):
+    cache = EntityStateCache()
+    cache._loaded = True
+    cache._live = True
+    for entity_id, name in [('media_player.kitchen_speaker', 'Kitchen Speaker'),
+                            ('media_player.office_display', 'Office Display'),
+                            ('light.office', 'Office Light')]:
+        cache.apply_state_changed({'entity_id': entity_id, 'new_state': {
+            'entity_id': entity_id, 'state': 'idle', 'attributes': {'friendly_name': name}}})
+    client = FakeHAClient()
+    monkeypatch.setattr(tools, "get_entity_cache", lambda: cache)
+    monkeypatch.setattr(tools, "get_ha_client", lambda: client)
+    monkeypatch.setattr(tools, "get_spotify_search_cache", lambda memory: FakeSearchCache())
+    return client
+
+
+def test_play_music_matches_the_device_by_name(players):
+    assert tools.play_music("so what", device="office") == "Playing 'So What by Miles Davis' on Office Display."
+    assert players.posts == [("/api/services/spotcast/start",
+                              {"entity_id": "media_player.office_display", "uri": "spotify:track:1"})]
+
+
+def test_play_music_lists_players_when_no_device_is_given(players):
+    assert tools.play_music("so what") == \
+        "Found 'So What by Miles Davis'. Which device? Available: Kitchen Speaker, Office Display"
+
+
+def test_play_music_reports_an_unknown_device(players):
+    assert tools.play_music("so what", device="garage") == "Could not find device matching 'garage'"
+    assert players.posts == []
@@ -0,0 +1,76 @@
+"""SentenceChunker boundaries for streamed TTS output."""
+import pytest
+
+from streaming import SentenceChunker
+
+
+def _chunks(fragments, min_chars=12):
+    chunker = SentenceChunker(min_chars=min_chars)
+    chunks = []
+    for fragment in fragments:
+        chunks.extend(chunker.feed(fragment))
+    rest = chunker.flush()
+    if rest:
+        chunks.append(rest)
+    return chunks
+
+
+def test_splits_on_sentence_ends():
+    text = "The kitchen light is on. The heating is set to 21 degrees! Anything else? "
+    assert _chunks([text]) == [
+        "The kitchen light is on. ",
+        "The heating is set to 21 degrees! ",
+        "Anything else? ",
+    ]
+
+
+def test_chunks_rejoin_to_the_input_for_any_fragmentation():
+    text = 'He said "Lights off." Then: done!\nNext line. Temperature is 21.5 degrees. Ok.'
+    expected = _chunks([text])
+    for size in (1, 2, 3, 7):
+        fragments = [text[i:i + size] for i in range(0, len(text), size)]
+        chunks = _chunks(fragments)
+        assert "".join(chunks) == text
+        assert chunks == expected
+
+
+@pytest.mark.parametrize('text', [
+    "It is 21.5 degrees inside right now",
+    "Use e.g.this one for the kitchen lights",
+    "Version 3.14.15 is installed on the server",
+])
+def test_no_split_inside_numbers_or_abbreviations(text):
+    assert _chunks([text]) == [text]
+
+
+def test_closing_quotes_and_brackets_stay_with_the_sentence():
+    assert _chunks(['He said "Turn it off." (Done it.) And more text here.']) == [
+        'He said "Turn it off." ',
+        '(Done it.) And more text here.',
+    ]
+
+
+def test_newline_ends_a_chunk():
+    assert _chunks(["First item on the list\nSecond item on the list"]) == [
+        "First item on the list\n",
+        "Second item on the list",
+    ]
+
+
+def test_short_sentences_merge_with_the_next():
+    assert _chunks(["Sir. 1. The lights are off now. "]) == ["Sir. 1. The lights are off now. "]
+
+
+def test_waits_for_the_next_word_before_releasing():
+    chunker = SentenceChunker()
+    assert chunker.feed("The kitchen light is on. ") == []
+    assert chunker.feed("Next") == ["The kitchen light is on. "]
+    assert chunker.flush() == "Next"
+
+
+def test_flush_empties_the_buffer():
+    chunker = SentenceChunker()
+    assert chunker.feed("") == []
+    chunker.feed("No sentence end")
+    assert chunker.flush() == "No sentence end"
+    assert chunker.flush() == ""
@@ -0,0 +1,61 @@
+"""Tools share the conversation's Memory instead of opening their own."""
+import pytest
+
+import config_helper
+import tools
+from memory import Memory
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    memory = Memory(str(tmp_path / "memory.db"))
+    monkeypatch.setattr(tools, "_memory_instance", None)
+    tools.set_memory(memory)
+    yield memory
+    memory.close()
+
+
+def test_preference_tools_use_the_shared_memory(memory):
+    version = memory.preferences_version
+
+    assert tools.save_preference("temperature_unit", "celsius") == "Preference saved: temperature_unit = celsius"
+
+    # The conversation sees the write (and rebuilds its prompt) without reopening the database
+    assert memory.get_preference("temperature_unit") == "celsius"
+    assert memory.preferences_version != version
+    assert tools.get_preference("temperature_unit") == "temperature_unit: celsius"
+    assert tools.delete_preference("temperature") == "Successfully deleted preference: temperature_unit"
+    assert memory.get_preference("temperature_unit") is None
+
+
+def test_get_ha_state_reads_the_unit_preference_from_the_shared_memory(memory, monkeypatch):
+    class FakeCache:
+        def get_state(self, entity_id, fresh=False):
+            return {'entity_id': entity_id, 'state': '21', 'attributes': {'unit_of_measurement': '°C'}}
+
+    monkeypatch.setattr(config_helper, "HA_URL", "http://ha.local")
+    monkeypatch.setattr(config_helper, "HA_TOKEN", "secret")
+    monkeypatch.setattr(tools, "_resolve_entity", lambda entity_id: (entity_id, False))
+    monkeypatch.setattr(tools, "get_entity_cache", lambda: FakeCache())
+    monkeypatch.setattr(tools, "Memory", lambda *args, **kwargs: pytest.fail("tool opened its own Memory"))
+
+    assert tools.get_ha_state("sensor.office_temperature") == "The state of sensor.office_temperature is 21 °C."
+    memory.set_preference("skip_unit_suffix", True)
+    assert tools.get_ha_state("sensor.office_temperature") == "The state of sensor.office_temperature is 21."
+
+
+def test_standalone_tools_open_one_memory(tmp_path, monkeypatch):
+    opened = []
+
+    def open_memory():
+        opened.append(Memory(str(tmp_path / f"memory-{len(opened)}.db")))
+        return opened[-1]
+
+    monkeypatch.setattr(tools, "_memory_instance", None)
+    monkeypatch.setattr(tools, "Memory", open_memory)
+
+    tools.save_preference("units", "metric")
+    tools.get_preference("units")
+
+    assert len(opened) == 1
+    opened[0].close()
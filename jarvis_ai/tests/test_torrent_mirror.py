@@ -0,0 +1,134 @@
+"""TorrentMirror merging of sync/maindata snapshots and deltas."""
+from collections import Counter
+
+import pytest
+
+from torrent_mirror import FILTER_COMPLETED, FILTER_DOWNLOADING, TorrentMirror, _stats_bucket
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeClient:
+    """Serves queued maindata responses and records the rid of each request."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.rids = []
+
+    def get(self, path, params=None):
+        assert path == "/api/v2/sync/maindata"
+        self.rids.append(params["rid"])
+        return FakeResponse(self.responses.pop(0))
+
+
+FULL = {
+    'rid': 1,
+    'full_update': True,
+    'torrents': {
+        'a': {'name': 'Alpha', 'state': 'downloading', 'progress': 0.5, 'size': 10, 'ratio': 0.1},
+        'b': {'name': 'Bravo', 'state': 'stalledUP', 'progress': 1.0, 'completion_on': 100},
+        'c': {'name': 'Charlie', 'state': 'pausedDL', 'progress': 0.2},
+        'd': {'name': 'Delta', 'state': 'uploading', 'progress': 1.0, 'completion_on': 300},
+    },
+}
+
+
+def _recount(mirror):
+    """Aggregates recomputed from scratch, to compare with the incremental ones."""
+    counts = Counter(_stats_bucket(t.get('state', '')) for t in mirror.torrents.values())
+    counts.pop(None, None)
+    return (
+        +counts,
+        {h for h, t in mirror.torrents.items() if t.get('state') in FILTER_DOWNLOADING},
+        {h for h, t in mirror.torrents.items() if t.get('state') in FILTER_COMPLETED},
+    )
+
+
+def _assert_consistent(mirror):
+    assert (+mirror.counts, mirror.downloading, mirror.completed) == _recount(mirror)
+
+
+@pytest.fixture
+def mirror():
+    mirror = TorrentMirror(FakeClient())
+    mirror.apply(FULL)
+    return mirror
+
+
+def test_full_update_loads_tracked_fields(mirror):
+    assert mirror.rid == 1
+    assert set(mirror.torrents) == {'a', 'b', 'c', 'd'}
+    assert 'ratio' not in mirror.torrents['a']
+    assert mirror.counts == Counter(downloading=1, seeding=2, paused=1)
+    assert mirror.downloading == {'a', 'c'}
+    assert mirror.completed == {'b', 'd'}
+    _assert_consistent(mirror)
+
+
+def test_delta_merges_only_the_changed_fields(mirror):
+    mirror.apply({'rid': 2, 'torrents': {'a': {'progress': 0.75, 'dlspeed': 500}}})
+    assert mirror.torrents['a'] == {'name': 'Alpha', 'state': 'downloading', 'progress': 0.75,
+                                    'size': 10, 'dlspeed': 500}
+    assert mirror.rid == 2
+    _assert_consistent(mirror)
+
+
+def test_state_change_moves_a_torrent_between_aggregates(mirror):
+    mirror.apply({'rid': 2, 'torrents': {'a': {'state': 'uploading', 'progress': 1.0,
+                                               'completion_on': 500}}})
+    assert mirror.downloading == {'c'}
+    assert mirror.completed == {'a', 'b', 'd'}
+    assert mirror.counts['seeding'] == 3
+    assert mirror.counts['downloading'] == 0
+    _assert_consistent(mirror)
+
+
+def test_added_and_removed_torrents(mirror):
+    mirror.apply({
+        'rid': 2,
+        'torrents': {'e': {'name': 'Echo', 'state': 'metaDL', 'progress': 0}},
+        'torrents_removed': ['b', 'missing'],
+    })
+    assert set(mirror.torrents) == {'a', 'c', 'd', 'e'}
+    assert mirror.completed == {'d'}
+    assert mirror.downloading == {'a', 'c', 'e'}
+    _assert_consistent(mirror)
+
+
+def test_a_second_full_update_replaces_the_mirror(mirror):
+    mirror.apply({'rid': 7, 'full_update': True,
+                  'torrents': {'z': {'name': 'Zulu', 'state': 'queuedDL', 'progress': 0}}})
+    assert set(mirror.torrents) == {'z'}
+    assert mirror.completed == set()
+    assert mirror.downloading == {'z'}
+    assert +mirror.counts == Counter()
+    _assert_consistent(mirror)
+
+
+def test_queries_read_the_aggregates(mirror):
+    mirror.min_interval = float('inf')
+    assert mirror.stats() == {'total': 4, 'downloading': 1, 'seeding': 2, 'paused': 1}
+    total, top = mirror.active_downloads(limit=1)
+    assert total == 2
+    assert [t['name'] for t in top] == ['Alpha']
+    assert [t['name'] for t in mirror.recently_completed()] == ['Delta', 'Bravo']
+
+
+def test_sync_sends_the_last_rid_and_skips_within_the_interval():
+    client = FakeClient(FULL, {'rid': 2, 'torrents': {'c': {'state': 'downloading'}}})
+    mirror = TorrentMirror(client, min_interval=60)
+    assert mirror.sync()
+    assert not mirror.sync()
+    assert mirror.sync(force=True)
+    assert client.rids == [0, 1]
+    assert mirror.counts['downloading'] == 2
+    _assert_consistent(mirror)
@@ -0,0 +1,117 @@
+"""Wyoming transcript handling, plain and streamed."""
+import asyncio
+from functools import partial
+
+from wyoming.asr import Transcript
+from wyoming.event import Event, async_read_event, async_write_event
+from wyoming.info import Info
+
+import wyoming_handler
+from wyoming_handler import JarvisWyomingHandler, handle_client
+
+
+class FakeJarvis:
+    """Answers every turn with two sentences, recording what it was asked."""
+
+    def __init__(self):
+        self.turns = []
+        self.sessions = set()
+
+    def reset_conversation(self, conversation_id=None):
+        self.sessions.discard(conversation_id)
+
+    async def aprocess(self, text, conversation_id=None):
+        self.turns.append((text, conversation_id))
+        self.sessions.add(conversation_id)
+        return "Lights on, Sir. Anything else?"
+
+    async def astream(self, text, conversation_id=None, response=None):
+        # Like a turn whose first sentence streamed before a function call replaced it
+        self.turns.append((text, conversation_id))
+        yield "Let me check. "
+        yield "Lights on, Sir. Anything else?"
+        if response is not None:
+            response[:] = ["Lights on, Sir. Anything else?"]
+
+
+def _stream(handler, event, **kwargs):
+    async def collect():
+        return [e async for e in handler.stream_event(event, **kwargs)]
+    return asyncio.run(collect())
+
+
+def test_handle_event_answers_a_transcript():
+    jarvis = FakeJarvis()
+    handler = JarvisWyomingHandler(jarvis)
+    reply = asyncio.run(handler.handle_event(Transcript(text="turn on the lights").event(),
+                                             conversation_id="wyoming:kitchen"))
+    assert jarvis.turns == [("turn on the lights", "wyoming:kitchen")]
+    assert reply.type == "text"
+    assert reply.data == {"text": "Lights on, Sir. Anything else?"}
+
+
+def test_stream_event_answers_a_transcript():
+    handler = JarvisWyomingHandler(FakeJarvis())
+    events = _stream(handler, Transcript(text="turn on the lights").event())
+    assert [e.type for e in events] == ["synthesize-start", "synthesize-chunk", "synthesize-chunk",
+                                        "synthesize-stop", "text"]
+    assert [e.data.get("text") for e in events[1:3]] == ["Let me check. ", "Lights on, Sir. Anything else?"]
+    # The final text is the turn's response, not the joined chunks
+    assert events[-1].data == {"text": "Lights on, Sir. Anything else?"}
+
+
+def test_other_events_are_ignored():
+    jarvis = FakeJarvis()
+    handler = JarvisWyomingHandler(jarvis)
+    for event in (Event(type="audio-start", data={"rate": 16000}), Transcript(text="").event()):
+        assert asyncio.run(handler.handle_event(event)) is None
+        assert _stream(handler, event) == []
+    assert jarvis.turns == []
+
+
+def test_transcript_context_names_the_conversation():
+    jarvis = FakeJarvis()
+    handler = JarvisWyomingHandler(jarvis)
+    event = Transcript(text="and the other one", context={"conversation_id": "01HKITCHEN"}).event()
+    asyncio.run(handler.handle_event(event, conversation_id="wyoming:connection"))
+    _stream(handler, event, conversation_id="wyoming:connection")
+    assert [cid for _, cid in jarvis.turns] == ["wyoming:01HKITCHEN", "wyoming:01HKITCHEN"]
+
+
+def test_connections_do_not_share_a_conversation(monkeypatch):
+    monkeypatch.setattr(wyoming_handler.config, "STREAM_RESPONSES", False)
+    jarvis = FakeJarvis()
+    handler = JarvisWyomingHandler(jarvis)
+
+    async def run():
+        server = await asyncio.start_server(
+            partial(handle_client, handler=handler, wyoming_info=Info()), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def turn(text):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await async_read_event(reader)  # info
+            await async_write_event(Transcript(text=text).event(), writer)
+            await async_write_event(Transcript(text=f"{text} again").event(), writer)
+            replies = [await async_read_event(reader), await async_read_event(reader)]
+            writer.close()
+            await writer.wait_closed()
+            return replies
+
+        async with server:
+            replies = await asyncio.gather(turn("kitchen"), turn("bedroom"))
+            # Let both handlers run their disconnect cleanup
+            for _ in range(50):
+                if not jarvis.sessions:
+                    break
+                await asyncio.sleep(0.01)
+        return replies
+
+    replies = asyncio.run(run())
+    assert all(r.type == "text" for pair in replies for r in pair)
+    by_text = dict(jarvis.turns)
+    assert by_text["kitchen"] == by_text["kitchen again"]
+    assert by_text["bedroom"] == by_text["bedroom again"]
+    assert by_text["kitchen"] != by_text["bedroom"]
+    # A connection's own conversation is dropped when it disconnects
+    assert jarvis.sessions == set()
@@ -9,14 +9,14 @@ import threading
 import logging
 from typing import Optional
 import config_helper as config
-
-# Spotify support (optional)
-try:
-    import spotipy
-    from spotipy.oauth2 import SpotifyClientCredentials
-    SPOTIFY_AVAILABLE = True
-except ImportError:
-    SPOTIFY_AVAILABLE = False
+from arr_metadata import get_arr_metadata
+from ha_client import get_ha_client
+from qbittorrent_client import QBittorrentAuthError, get_qbittorrent_client
+from torrent_mirror import get_torrent_mirror
+from entity_cache import get_entity_cache
+from entity_resolver import get_entity_resolver
+from spotify_cache import get_spotify_search_cache
+from spotify_client import SPOTIFY_AVAILABLE
 
 # No additional imports needed for Google Custom Search (uses requests)
 
@@ -56,16 +56,11 @@ def control_home_assistant(entity_id: str, command: str = "turn_on", parameter:
     
     # Buttons use press service, not turn_on/turn_off
     if domain == 'button':
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json",
-        }
         service_data = {
             "entity_id": entity_id
         }
-        url = f"{config.HA_URL}/api/services/button/press"
         try:
-            response = requests.post(url, json=service_data, headers=headers, timeout=10)
+            response = get_ha_client().post("/api/services/button/press", json=service_data, timeout=10)
             response.raise_for_status()
             _LAST_INTERACTED_ENTITY = entity_id
             return f"Pressed {entity_id} successfully."
@@ -115,13 +110,6 @@ def control_home_assistant(entity_id: str, command: str = "turn_on", parameter:
     elif command in ["volume_up", "volume_down", "media_next", "media_previous"]:
         service = command
     
-    url = f"{config.HA_URL}/api/services/{domain}/{service}"
-    
-    headers = {
-        "Authorization": f"Bearer {config.HA_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    
     data = {"entity_id": entity_id}
     
     if parameter:
@@ -150,7 +138,7 @@ def control_home_assistant(entity_id: str, command: str = "turn_on", parameter:
              data["value"] = parameter
     
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = get_ha_client().post(f"/api/services/{domain}/{service}", json=data)
         
         if response.status_code in [400, 404, 500] or "entity not found" in response.text.lower():
              return f"Failed to control {entity_id}. Error {response.status_code}: {response.text}"
@@ -177,69 +165,13 @@ def _search_ha_entities_raw(query: str):
     if not config.HA_URL or not config.HA_TOKEN:
         return []
 
-    url = f"{config.HA_URL}/api/states"
-    headers = {
-        "Authorization": f"Bearer {config.HA_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        states = response.json()
+        cache = get_entity_cache()
+        # Relevance scoring runs against the incrementally maintained search index
+        results = cache.search(query)
         
         # Debug: Log total entities and camera count
-        total_entities = len(states)
-        camera_count = len([e for e in states if e['entity_id'].startswith('camera.')])
-        logger.info(f"API returned {total_entities} total entities, {camera_count} are cameras")
-        
-        results = []
-        query_tokens = query.lower().split()
-        
-        for entity in states:
-            entity_id = entity['entity_id'].lower()
-            friendly_name = entity['attributes'].get('friendly_name', '').lower()
-            domain = entity_id.split('.')[0]
-            
-            search_text = f"{entity_id} {friendly_name}"
-            
-            # Relevance Scoring
-            score = 0
-            
-            if query == friendly_name:
-                score = 100
-            elif query in friendly_name:
-                score = 80
-            elif all(token in friendly_name for token in query_tokens):
-                score = 60
-            elif query in entity_id:
-                score = 40
-            elif all(token in entity_id for token in query_tokens):
-                score = 20
-            elif all(token in search_text for token in query_tokens):
-                score = 10
-            
-            # Domain boost: if query contains a domain keyword, boost entities of that domain
-            domain_keywords = {
-                'camera': 'camera',
-                'light': 'light',
-                'switch': 'switch',
-                'sensor': 'sensor',
-                'climate': 'climate',
-            }
-            
-            for keyword, domain_name in domain_keywords.items():
-                if keyword in query_tokens and domain == domain_name:
-                    score += 50  # Significant boost for domain match
-            
-            if score > 0:
-                results.append({
-                    'entity_id': entity['entity_id'],
-                    'friendly_name': entity['attributes'].get('friendly_name', 'Unknown'),
-                    'score': score
-                })
-        
-        results.sort(key=lambda x: x['score'], reverse=True)
+        logger.info(f"Index holds {len(cache.index)} total entities, {cache.index.domain_count('camera')} are cameras")
         
         # Debug: Log camera entities and their scores
         camera_entities = [r for r in results if r['entity_id'].startswith('camera.')]
@@ -261,38 +193,11 @@ def _resolve_entity(entity_id: str):
     if not config.HA_URL or not config.HA_TOKEN:
         return entity_id, False
         
-    url = f"{config.HA_URL}/api/states/{entity_id}"
-    headers = {
-        "Authorization": f"Bearer {config.HA_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return entity_id, False
-            
-        if response.status_code == 404:
-            query_name = entity_id.split(".")[-1].replace("_", " ")
-            found_entities = _search_ha_entities_raw(query_name)
-            
-            original_domain = entity_id.split(".")[0]
-            target_domains = ['light', 'switch', 'input_boolean']
-            
-            for ent in found_entities:
-                e_id = ent['entity_id']
-                e_domain = e_id.split(".")[0]
-                e_name = ent.get('friendly_name', '').lower()
-                
-                # Exclusion Rule: If looking for a light, don't fallback to a Plug/Socket
-                if original_domain == "light" and ("plug" in e_name or "plug" in e_id or "socket" in e_name):
-                    continue
-
-                if e_domain in target_domains or e_domain == original_domain:
-                     return e_id, True
-            
-    except Exception:
-        pass
+        # Fuzzy match against the local entity cache (a miss is confirmed live while the WebSocket is down)
+        return get_entity_resolver().resolve(entity_id)
+    except Exception as e:
+        logger.debug(f"Entity resolution failed for {entity_id}: {e}")
         
     return entity_id, False
 
@@ -304,16 +209,10 @@ def get_ha_state(entity_id: str):
     if not config.HA_URL or not config.HA_TOKEN:
         return "Error: Home Assistant URL or Token not configured."
 
-    url = f"{config.HA_URL}/api/states/{resolved_id}"
-    headers = {
-        "Authorization": f"Bearer {config.HA_TOKEN}",
-        "Content-Type": "application/json",
-    }
-    
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        state_data = response.json()
+        state_data = get_entity_cache().get_state(resolved_id, fresh=True)
+        if state_data is None:
+            return f"Failed to get state for {entity_id}: entity not found"
         
         state_val = state_data['state']
         unit = state_data['attributes'].get('unit_of_measurement', '')
@@ -321,9 +220,7 @@ def get_ha_state(entity_id: str):
         # Respect skip_unit_suffix preference
         skip_unit = False
         try:
-            from memory import Memory
-            mem = Memory()
-            skip_unit = mem.get_preference("skip_unit_suffix", False)
+            skip_unit = _get_memory().get_preference("skip_unit_suffix", False)
         except:
             pass
             
@@ -389,15 +286,7 @@ def get_appliance_status(appliance_name: str):
         time_keywords = ['remaining', 'finish', 'complete', 'end', 'duration', 'time_left', 'eta']
         status_keywords = ['status', 'state', 'program', 'cycle', 'phase']
         
-        url = f"{config.HA_URL}/api/states"
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        all_entities = response.json()
+        all_entities = get_entity_cache().get_states(fresh=True)
         
         # Filter to our appliance's entities
         entity_ids = [r['entity_id'] for r in results]
@@ -569,36 +458,24 @@ def get_person_location(person_name: str):
         # First try direct match: person.{lowercased_name}
         entity_id = f"person.{person_name.lower().replace(' ', '_')}"
         
-        url = f"{config.HA_URL}/api/states/{entity_id}"
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json",
-        }
+        cache = get_entity_cache()
+        state_data = cache.get_state(entity_id, fresh=True)
         
-        response = requests.get(url, headers=headers, timeout=5)
-        
-        if response.status_code == 404:
+        if state_data is None:
             # Entity not found - try searching all person entities
-            all_states_url = f"{config.HA_URL}/api/states"
-            all_response = requests.get(all_states_url, headers=headers, timeout=5)
-            all_response.raise_for_status()
-            
-            all_states = all_response.json()
-            person_entities = [e for e in all_states if e['entity_id'].startswith('person.')]
+            person_entities = cache.get_domain_states('person')
             
             # Search by friendly name
             for entity in person_entities:
                 friendly_name = entity.get('attributes', {}).get('friendly_name', '')
                 if person_name.lower() in friendly_name.lower():
                     entity_id = entity['entity_id']
-                    response = requests.get(f"{config.HA_URL}/api/states/{entity_id}", headers=headers, timeout=5)
+                    state_data = cache.get_state(entity_id, fresh=True)
                     break
-            else:
+            
+            if state_data is None:
                 return f"Could not find a person entity for '{person_name}'. Make sure they have a person entity in Home Assistant."
         
-        response.raise_for_status()
-        state_data = response.json()
-        
         location = state_data['state']
         friendly_name = state_data.get('attributes', {}).get('friendly_name', person_name)
         
@@ -643,53 +520,20 @@ def play_music(query: str, device: str = None, entity_id: str = None):
         return "Error: Spotify credentials not configured."
         
     try:
-        # Search Spotify
-        sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-            client_id=config.SPOTIPY_CLIENT_ID,
-            client_secret=config.SPOTIPY_CLIENT_SECRET
-        ))
-        
-        results = sp.search(q=query, limit=1, type='track,album,artist,playlist')
-        
-        uri = None
-        found_name = None
-        
-        if results['tracks']['items']:
-            item = results['tracks']['items'][0]
-            uri = item['uri']
-            found_name = f"{item['name']} by {item['artists'][0]['name']}"
-        elif results['albums']['items']:
-            item = results['albums']['items'][0]
-            uri = item['uri']
-            found_name = f"Album: {item['name']}"
-        elif results['artists']['items']:
-            item = results['artists']['items'][0]
-            uri = item['uri']
-            found_name = f"Artist: {item['name']}"
-        elif results['playlists']['items']:
-            item = results['playlists']['items'][0]
-            uri = item['uri']
-            found_name = f"Playlist: {item['name']}"
-            
-        if not uri:
+        # Resolve via the search cache; repeat requests skip the Spotify API
+        # (persisted in the shared memory when there is one)
+        result = get_spotify_search_cache(_memory_instance).resolve(query)
+        if not result:
             return f"Could not find '{query}' on Spotify."
+        uri, found_name = result
         
         # If no device specified, need to ask
         if not device and not entity_id:
             # Get available media players
-            headers = {
-                "Authorization": f"Bearer {config.HA_TOKEN}",
-                "Content-Type": "application/json",
-            }
-            entities_url = f"{config.HA_URL}/api/states"
-            response = requests.get(entities_url, headers=headers)
-            response.raise_for_status()
-            
             media_players = []
-            for entity in response.json():
-                if entity['entity_id'].startswith('media_player.'):
-                    name = entity['attributes'].get('friendly_name', entity['entity_id'])
-                    media_players.append(name)
+            for entity in get_entity_cache().get_domain_states('media_player'):
+                name = entity['attributes'].get('friendly_name', entity['entity_id'])
+                media_players.append(name)
             
             if media_players:
                 devices_list = ', '.join(media_players[:10])  # Limit to 10
@@ -700,24 +544,10 @@ def play_music(query: str, device: str = None, entity_id: str = None):
         # Find the target device entity_id
         target_entity = entity_id
         if device and not entity_id:
-            # Search for matching media player
-            headers = {
-                "Authorization": f"Bearer {config.HA_TOKEN}",
-                "Content-Type": "application/json",
-            }
-            entities_url = f"{config.HA_URL}/api/states"
-            response = requests.get(entities_url, headers=headers)
-            response.raise_for_status()
-            
-            device_lower = device.lower()
-            for entity in response.json():
-                if entity['entity_id'].startswith('media_player.'):
-                    entity_id_match = device_lower in entity['entity_id'].lower()
-                    name_match = device_lower in entity['attributes'].get('friendly_name', '').lower()
-                    
-                    if entity_id_match or name_match:
-                        target_entity = entity['entity_id']
-                        break
+            # Match the device against media player ids and names via the entity index
+            match = get_entity_cache().find_entity(device, 'media_player')
+            if match:
+                target_entity = match['entity_id']
             
             if not target_entity:
                 return f"Could not find device matching '{device}'"
@@ -725,17 +555,12 @@ def play_music(query: str, device: str = None, entity_id: str = None):
         # Use Spotcast to play
         logger.debug(f"Playing {uri} on {target_entity} via Spotcast")
         
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json",
-        }
-        spotcast_url = f"{config.HA_URL}/api/services/spotcast/start"
         spotcast_data = {
             "entity_id": target_entity,
             "uri": uri,
         }
         
-        response = requests.post(spotcast_url, headers=headers, json=spotcast_data)
+        response = get_ha_client().post("/api/services/spotcast/start", json=spotcast_data)
         response.raise_for_status()
         
         return f"Playing '{found_name}' on {target_entity.replace('media_player.', '').replace('_', ' ').title()}."
@@ -935,21 +760,13 @@ def add_to_radarr(movie_name: str):
         # Add first result
         movie = results[0]
         
-        # Get root folder
-        root_url = f"{config.RADARR_URL}/api/v3/rootfolder"
-        root_response = requests.get(root_url, headers=headers)
-        root_response.raise_for_status()
-        root_folders = root_response.json()
-        
+        # Root folder and quality profile come from the metadata cache
+        metadata = get_arr_metadata("radarr")
+        root_folders = metadata.root_folders()
         if not root_folders:
             return "Error: No root folder configured in Radarr."
         
-        # Get quality profile
-        profile_url = f"{config.RADARR_URL}/api/v3/qualityprofile"
-        profile_response = requests.get(profile_url, headers=headers)
-        profile_response.raise_for_status()
-        profiles = profile_response.json()
-        
+        profiles = metadata.quality_profiles()
         if not profiles:
             return "Error: No quality profile configured in Radarr."
         
@@ -968,6 +785,9 @@ def add_to_radarr(movie_name: str):
         
         add_url = f"{config.RADARR_URL}/api/v3/movie"
         add_response = requests.post(add_url, headers=headers, json=add_data)
+        if not add_response.ok:
+            # Refetch on the next add if the cached root folder or profile was the problem
+            metadata.invalidate_for_error(add_response)
         add_response.raise_for_status()
         
         return f"Added '{movie['title']} ({movie['year']})' to Radarr and started searching."
@@ -1172,21 +992,13 @@ def add_to_sonarr(series_name: str):
         
         series = results[0]
         
-        # Get root folder
-        root_url = f"{config.SONARR_URL}/api/v3/rootfolder"
-        root_response = requests.get(root_url, headers=headers)
-        root_response.raise_for_status()
-        root_folders = root_response.json()
-        
+        # Root folder and quality profile come from the metadata cache
+        metadata = get_arr_metadata("sonarr")
+        root_folders = metadata.root_folders()
         if not root_folders:
             return "Error: No root folder configured in Sonarr."
         
-        # Get quality profile
-        profile_url = f"{config.SONARR_URL}/api/v3/qualityprofile"
-        profile_response = requests.get(profile_url, headers=headers)
-        profile_response.raise_for_status()
-        profiles = profile_response.json()
-        
+        profiles = metadata.quality_profiles()
         if not profiles:
             return "Error: No quality profile configured in Sonarr."
         
@@ -1204,6 +1016,9 @@ def add_to_sonarr(series_name: str):
         
         add_url = f"{config.SONARR_URL}/api/v3/series"
         add_response = requests.post(add_url, headers=headers, json=add_data)
+        if not add_response.ok:
+            # Refetch on the next add if the cached root folder or profile was the problem
+            metadata.invalidate_for_error(add_response)
         add_response.raise_for_status()
         
         return f"Added '{series['title']}' to Sonarr and started searching for episodes."
@@ -1244,28 +1059,17 @@ def query_qbittorrent(query_type: str):
         return "Error: qBittorrent URL not configured."
     
     try:
-        # Login if credentials provided
-        session = requests.Session()
-        if config.QBITTORRENT_USERNAME and config.QBITTORRENT_PASSWORD:
-            login_url = f"{config.QBITTORRENT_URL}/api/v2/auth/login"
-            login_data = {
-                "username": config.QBITTORRENT_USERNAME,
-                "password": config.QBITTORRENT_PASSWORD
-            }
-            login_response = session.post(login_url, data=login_data, timeout=5)
-            if "Fails" in login_response.text or login_response.status_code != 200:
-                return "Error: qBittorrent authentication failed."
+        # Shared session: logs in once and again only when the SID expires
+        qbit = get_qbittorrent_client()
         
         if query_type == "status":
             # Check if qBittorrent is responding AND get connection status
-            url = f"{config.QBITTORRENT_URL}/api/v2/app/version"
-            response = session.get(url, timeout=5)
+            response = qbit.get("/api/v2/app/version", timeout=5)
             response.raise_for_status()
             version = response.text
             
             # Also get connection status
-            transfer_url = f"{config.QBITTORRENT_URL}/api/v2/transfer/info"
-            transfer_response = session.get(transfer_url, timeout=5)
+            transfer_response = qbit.get("/api/v2/transfer/info", timeout=5)
             transfer_response.raise_for_status()
             transfer_info = transfer_response.json()
             
@@ -1284,23 +1088,15 @@ def query_qbittorrent(query_type: str):
             return f"qBittorrent is running (v{version}). Connection: {status_msg}"
         
         elif query_type == "stats":
-            # Get torrent counts
-            url = f"{config.QBITTORRENT_URL}/api/v2/torrents/info"
-            response = session.get(url, timeout=10, verify=False)
-            response.raise_for_status()
-            torrents = response.json()
-            
-            downloading = sum(1 for t in torrents if t['state'] in ['downloading', 'stalledDL', 'metaDL', 'forcedDL'])
-            seeding = sum(1 for t in torrents if t['state'] in ['uploading', 'stalledUP', 'forcedUP'])
-            paused = sum(1 for t in torrents if 'paused' in t['state'].lower())
-            total = len(torrents)
+            # Torrent counts from the incrementally synced mirror
+            counts = get_torrent_mirror().stats()
             
-            return f"qBittorrent Stats: {total} torrents total, {downloading} downloading, {seeding} seeding, {paused} paused"
+            return (f"qBittorrent Stats: {counts['total']} torrents total, {counts['downloading']} downloading, "
+                    f"{counts['seeding']} seeding, {counts['paused']} paused")
         
         elif query_type == "speed":
             # Get transfer info
-            url = f"{config.QBITTORRENT_URL}/api/v2/transfer/info"
-            response = session.get(url, timeout=5)
+            response = qbit.get("/api/v2/transfer/info", timeout=5)
             response.raise_for_status()
             info = response.json()
             
@@ -1310,18 +1106,14 @@ def query_qbittorrent(query_type: str):
             return f"qBittorrent Speed: ↓ {dl_speed:.1f} MB/s, ↑ {up_speed:.1f} MB/s"
         
         elif query_type == "downloading":
-            # Get active downloads
-            url = f"{config.QBITTORRENT_URL}/api/v2/torrents/info"
-            params = {"filter": "downloading"}
-            response = session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            torrents = response.json()
+            # Active downloads from the mirror, closest to done first
+            total, torrents = get_torrent_mirror().active_downloads(limit=5)
             
-            if not torrents:
+            if not total:
                 return "No torrents currently downloading."
             
-            output = [f"Downloading ({len(torrents)} torrents):"]
-            for t in torrents[:5]:
+            output = [f"Downloading ({total} torrents):"]
+            for t in torrents:
                 name = t.get('name', 'Unknown')[:50]
                 progress = t.get('progress', 0) * 100
                 eta = t.get('eta', 0)
@@ -1338,18 +1130,14 @@ def query_qbittorrent(query_type: str):
             return "\n".join(output)
         
         elif query_type == "completed":
-            # Get recent completed
-            url = f"{config.QBITTORRENT_URL}/api/v2/torrents/info"
-            params = {"filter": "completed", "sort": "completion_on", "reverse": "true"}
-            response = session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            torrents = response.json()
+            # Recently completed from the mirror
+            torrents = get_torrent_mirror().recently_completed(limit=5)
             
             if not torrents:
                 return "No completed torrents found."
             
             output = ["Recently Completed:"]
-            for t in torrents[:5]:
+            for t in torrents:
                 name = t.get('name', 'Unknown')[:50]
                 size = t.get('size', 0) / 1024 / 1024 / 1024  # GB
                 output.append(f"- {name} ({size:.1f} GB)")
@@ -1359,6 +1147,8 @@ def query_qbittorrent(query_type: str):
         else:
             return f"Unknown query type: {query_type}. Supported: status, stats, speed, downloading, completed"
     
+    except QBittorrentAuthError:
+        return "Error: qBittorrent authentication failed."
     except requests.exceptions.ConnectionError:
         return "qBittorrent is not responding. It may be offline or the URL is incorrect."
     except requests.exceptions.Timeout:
@@ -1446,19 +1236,8 @@ def check_vpn_status():
         
         if config.QBITTORRENT_URL:
             try:
-                # Try to login and check qBit status
-                session = requests.Session()
-                if config.QBITTORRENT_USERNAME and config.QBITTORRENT_PASSWORD:
-                    login_url = f"{config.QBITTORRENT_URL}/api/v2/auth/login"
-                    login_data = {
-                        "username": config.QBITTORRENT_USERNAME,
-                        "password": config.QBITTORRENT_PASSWORD
-                    }
-                    session.post(login_url, data=login_data, timeout=5)
-                
-                # Check if qBit is connected and can download
-                transfer_url = f"{config.QBITTORRENT_URL}/api/v2/transfer/info"
-                transfer_response = session.get(transfer_url, timeout=5)
+                # Check if qBit is connected and can download (shared, already logged-in session)
+                transfer_response = get_qbittorrent_client().get("/api/v2/transfer/info", timeout=5)
                 
                 if transfer_response.status_code == 200:
                     transfer_info = transfer_response.json()
@@ -1481,12 +1260,7 @@ def check_vpn_status():
         if config.HA_URL and config.HA_TOKEN:
             try:
                 sensor_entity = config.UNIFI_WAN_SENSOR
-                url = f"{config.HA_URL}/api/states/{sensor_entity}"
-                headers = {
-                    "Authorization": f"Bearer {config.HA_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-                response = requests.get(url, headers=headers, timeout=5)
+                response = get_ha_client().get(f"/api/states/{sensor_entity}", timeout=5)
                 if response.status_code == 200:
                     home_ip = response.json().get('state', '')
             except Exception:
@@ -1552,11 +1326,6 @@ def query_unifi_network(query_type: str):
     if not config.HA_URL or not config.HA_TOKEN:
         return "Error: Home Assistant connection not configured."
     
-    headers = {
-        "Authorization": f"Bearer {config.HA_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
     try:
         # Common UniFi sensor entity patterns
         sensor_patterns = {
@@ -1571,8 +1340,7 @@ def query_unifi_network(query_type: str):
             """Try multiple sensor patterns and return first found."""
             for pattern in patterns:
                 try:
-                    url = f"{config.HA_URL}/api/states/{pattern}"
-                    response = requests.get(url, headers=headers, timeout=5)
+                    response = get_ha_client().get(f"/api/states/{pattern}", timeout=5)
                     if response.status_code == 200:
                         data = response.json()
                         state = data.get('state', 'unknown')
@@ -2427,13 +2195,8 @@ def analyze_camera(camera_entity: str, question: str = "Describe this scene in a
         if not camera_entity.startswith("camera."):
             camera_entity = f"camera.{camera_entity}"
         
-        snapshot_url = f"{config.HA_URL}/api/camera_proxy/{camera_entity}"
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-        }
-        
         logger.info(f"Fetching camera snapshot from {camera_entity}")
-        snapshot_response = requests.get(snapshot_url, headers=headers, timeout=10)
+        snapshot_response = get_ha_client().get(f"/api/camera_proxy/{camera_entity}", timeout=10)
         
         if snapshot_response.status_code == 404:
             return f"Camera '{camera_entity}' not found. Use search_ha_entities to find available cameras."
@@ -2685,8 +2448,7 @@ def get_travel_time(origin: str, destination: str, mode: str = "driving"):
         return "Error: Google Maps API key not configured. Add google_maps_api_key to add-on configuration."
     
     # Resolve 'home' to saved location
-    from memory import Memory
-    memory = Memory()
+    memory = _get_memory()
     
     # Helper function to resolve location names
     def resolve_location(location: str) -> str:
@@ -3115,7 +2877,6 @@ def test_device_tracker_history():
     """
     try:
         from datetime import datetime, timedelta
-        import requests
         
         # Get history for last 24 hours
         end_time = datetime.now()
@@ -3123,13 +2884,7 @@ def test_device_tracker_history():
         start_str = start_time.isoformat()
         
         # Try to get all history
-        url = f"{config.HA_URL}/api/history/period/{start_str}"
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15)
+        response = get_ha_client().get(f"/api/history/period/{start_str}", timeout=15)
         response.raise_for_status()
         
         data = response.json()
@@ -3186,20 +2941,12 @@ def create_location_reminder(message: str, location: str = "home", person_entity
     
     try:
         import uuid
-        import requests
         
         # Generate unique automation ID
         automation_id = f"reminder_{uuid.uuid4().hex[:8]}"
         
-        # Get the person entity to find their device tracker
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
         # Query person entity state to get device_trackers
-        person_url = f"{config.HA_URL}/api/states/{person_entity}"
-        person_response = requests.get(person_url, headers=headers, timeout=10)
+        person_response = get_ha_client().get(f"/api/states/{person_entity}", timeout=10)
         person_data = person_response.json()
         
         # Find mobile app device tracker from person's attributes
@@ -3278,12 +3025,6 @@ def create_location_reminder(message: str, location: str = "home", person_entity
             "mode": "single"
         }
         
-        # Create automation via HA API
-        headers = {
-            "Authorization": f"Bearer {config.HA_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
         # Use automations.yaml endpoint
         url = f"{config.HA_URL}/api/services/automation/reload"
         
@@ -3303,9 +3044,7 @@ def create_location_reminder(message: str, location: str = "home", person_entity
         # Since we can't directly create automations via API easily, let's use a helper approach:
         
         # Create via the /api/config/automation/config/{id} endpoint
-        automation_url = f"{config.HA_URL}/api/config/automation/config/{automation_id}"
-        
-        response = requests.post(automation_url, headers=headers, json=automation_config, timeout=10)
+        response = get_ha_client().post(f"/api/config/automation/config/{automation_id}", json=automation_config, timeout=10)
         response.raise_for_status()
         
         logger.info(f"Created location reminder automation: {automation_id}")
@@ -3317,18 +3056,13 @@ def create_location_reminder(message: str, location: str = "home", person_entity
         # Fallback: Create a simpler notification-based reminder
         try:
             # Just create a persistent notification as fallback
-            url = f"{config.HA_URL}/api/services/persistent_notification/create"
-            headers = {
-                "Authorization": f"Bearer {config.HA_TOKEN}",
-                "Content-Type": "application/json"
-            }
             data = {
                 "title": "Reminder Pending",
                 "message": f"Remind: {message} (when you get {location})",
                 "notification_id": f"reminder_{uuid.uuid4().hex[:8]}"
             }
             
-            requests.post(url, headers=headers, json=data, timeout=10)
+            get_ha_client().post("/api/services/persistent_notification/create", json=data, timeout=10)
             return f"Created reminder: '{message}' (manual notification - automatic trigger unavailable)"
             
         except:
@@ -3358,8 +3092,17 @@ def set_timer(seconds: int):
 from memory import Memory
 _memory_instance = None
 
+def set_memory(memory: Memory):
+    """
+    Share the process's Memory with every tool.
+    Called once by JarvisConversation so tools reuse its connection, writer
+    thread and preference cache instead of opening their own.
+    """
+    global _memory_instance
+    _memory_instance = memory
+
 def _get_memory():
-    """Get or create memory instance."""
+    """Get the shared memory instance (created on first use when running standalone)."""
     global _memory_instance
     if _memory_instance is None:
         _memory_instance = Memory()
@@ -3418,16 +3161,10 @@ def clear_context_history():
     """
     try:
         memory = _get_memory()
-        # Get count before clearing
-        stats = memory.get_stats()
-        count = stats.get('context_entries', 0)
         
         # Clear only context, not preferences or facts
-        cursor = memory.conn.cursor()
-        cursor.execute("DELETE FROM context")
-        memory.conn.commit()
+        count = memory.clear_context()
         
-        logger.info(f"Cleared {count} context entries")
         return f"Cleared {count} conversation context entries. User preferences and facts remain intact."
     except Exception as e:
         logger.error(f"Error clearing context: {e}", exc_info=True)
@@ -3486,12 +3223,9 @@ def delete_preference(name: str):
                 match_list = '\n'.join(f"  - {k}" for k in matches)
                 return f"Multiple preferences match '{name}':\n{match_list}\n\nPlease be more specific."
         
-        # Delete from database
-        cursor = memory.conn.cursor()
-        cursor.execute("DELETE FROM preferences WHERE key = ?", (key_to_delete,))
-        memory.conn.commit()
+        # Delete from database (and the preference cache)
+        memory.delete_preference(key_to_delete)
         
-        logger.info(f"Deleted preference: {key_to_delete}")
         return f"Successfully deleted preference: {key_to_delete}"
     except Exception as e:
         logger.error(f"Error deleting preference: {e}", exc_info=True)
@@ -0,0 +1,180 @@
+"""
+Local mirror of qBittorrent torrent state for Jarvis.
+Kept current with the /api/v2/sync/maindata rid protocol: after one full
+snapshot, each sync returns only the torrents (and fields) that changed, so
+stats, downloading and completed queries are answered from in-memory
+aggregates instead of re-downloading and recounting the full torrents/info list.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from qbittorrent_client import get_qbittorrent_client
+
+logger = logging.getLogger(__name__)
+
+# Syncs closer together than this (seconds) reuse the current mirror
+MIN_SYNC_INTERVAL = 2.0
+
+# Torrent fields kept in the mirror (deltas for other fields are ignored)
+TRACKED_FIELDS = ('name', 'state', 'progress', 'eta', 'size', 'completion_on', 'dlspeed')
+
+# States counted in the stats summary
+STATS_DOWNLOADING = {'downloading', 'stalledDL', 'metaDL', 'forcedDL'}
+STATS_SEEDING = {'uploading', 'stalledUP', 'forcedUP'}
+
+# States qBittorrent's own "downloading" and "completed" torrent filters match
+FILTER_DOWNLOADING = {'downloading', 'metaDL', 'forcedMetaDL', 'stalledDL', 'checkingDL',
+                      'pausedDL', 'stoppedDL', 'queuedDL', 'forcedDL'}
+FILTER_COMPLETED = {'uploading', 'stalledUP', 'checkingUP', 'pausedUP', 'stoppedUP',
+                    'queuedUP', 'forcedUP'}
+
+
+def _stats_bucket(state: str) -> Optional[str]:
+    if state in STATS_DOWNLOADING:
+        return 'downloading'
+    if state in STATS_SEEDING:
+        return 'seeding'
+    if 'paused' in state.lower():
+        return 'paused'
+    return None
+
+
+class TorrentMirror:
+    """
+    In-memory copy of qBittorrent's torrent list with running aggregates.
+
+    Counts per stats bucket and the downloading/completed hash sets are
+    adjusted torrent by torrent as deltas arrive, so queries never rescan
+    the whole list.
+    """
+
+    def __init__(self, client, min_interval: float = MIN_SYNC_INTERVAL):
+        """
+        Args:
+            client: QBittorrentClient used for sync/maindata requests
+            min_interval: Seconds within which repeated syncs are skipped
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.rid = 0
+        self.torrents: Dict[str, Dict] = {}
+        self.counts: Counter = Counter()
+        self.downloading: Set[str] = set()
+        self.completed: Set[str] = set()
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    # ===== SYNC =====
+
+    def sync(self, force: bool = False) -> bool:
+        """
+        Apply the changes since the last sync.
+
+        Returns:
+            bool: True if a request was made, False if the mirror was fresh enough
+        """
+        with self._lock:
+            if not force and self.rid and time.monotonic() - self._last_sync < self.min_interval:
+                return False
+            response = self.client.get("/api/v2/sync/maindata", params={"rid": self.rid})
+            response.raise_for_status()
+            self.apply(response.json())
+            self._last_sync = time.monotonic()
+            return True
+
+    def apply(self, data: Dict):
+        """Merge one maindata response (full snapshot or delta) into the mirror."""
+        if data.get('full_update'):
+            self.torrents.clear()
+            self.counts.clear()
+            self.downloading.clear()
+            self.completed.clear()
+
+        for torrent_hash in data.get('torrents_removed') or ():
+            torrent = self.torrents.pop(torrent_hash, None)
+            if torrent is not None:
+                self._unindex(torrent_hash, torrent)
+
+        for torrent_hash, changes in (data.get('torrents') or {}).items():
+            torrent = self.torrents.get(torrent_hash)
+            if torrent is None:
+                torrent = self.torrents[torrent_hash] = {}
+            else:
+                self._unindex(torrent_hash, torrent)
+            for field in TRACKED_FIELDS:
+                if field in changes:
+                    torrent[field] = changes[field]
+            self._index(torrent_hash, torrent)
+
+        self.rid = data.get('rid', self.rid)
+        if data.get('full_update'):
+            logger.debug(f"Torrent mirror loaded {len(self.torrents)} torrents (rid {self.rid})")
+
+    def _index(self, torrent_hash: str, torrent: Dict):
+        state = torrent.get('state', '')
+        bucket = _stats_bucket(state)
+        if bucket:
+            self.counts[bucket] += 1
+        if state in FILTER_DOWNLOADING:
+            self.downloading.add(torrent_hash)
+        elif state in FILTER_COMPLETED:
+            self.completed.add(torrent_hash)
+
+    def _unindex(self, torrent_hash: str, torrent: Dict):
+        bucket = _stats_bucket(torrent.get('state', ''))
+        if bucket:
+            self.counts[bucket] -= 1
+        self.downloading.discard(torrent_hash)
+        self.completed.discard(torrent_hash)
+
+    # ===== QUERIES =====
+
+    def stats(self) -> Dict[str, int]:
+        """Torrent counts: total, downloading, seeding, paused."""
+        self.sync()
+        with self._lock:
+            return {
+                'total': len(self.torrents),
+                'downloading': self.counts['downloading'],
+                'seeding': self.counts['seeding'],
+                'paused': self.counts['paused'],
+            }
+
+    def active_downloads(self, limit: int = 5) -> Tuple[int, List[Dict]]:
+        """
+        Torrents matching qBittorrent's "downloading" filter, closest to done first.
+
+        Returns:
+            (total matching, up to `limit` torrent dicts)
+        """
+        self.sync()
+        with self._lock:
+            top = heapq.nlargest(limit, (self.torrents[h] for h in self.downloading),
+                                 key=lambda t: t.get('progress', 0))
+            return len(self.downloading), [dict(t) for t in top]
+
+    def recently_completed(self, limit: int = 5) -> List[Dict]:
+        """Most recently completed torrents, newest first."""
+        self.sync()
+        with self._lock:
+            top = heapq.nlargest(limit, (self.torrents[h] for h in self.completed),
+                                 key=lambda t: t.get('completion_on', 0))
+            return [dict(t) for t in top]
+
+
+_mirror: Optional[TorrentMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_torrent_mirror() -> TorrentMirror:
+    """Get the process-wide torrent mirror (on the shared qBittorrent client)."""
+    global _mirror
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                _mirror = TorrentMirror(get_qbittorrent_client())
+    return _mirror
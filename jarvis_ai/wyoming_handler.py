@@ -4,18 +4,46 @@ Simplified implementation using wyoming.event base classes.
 """
 import asyncio
 import logging
+import uuid
 from functools import partial
-from typing import Optional
+from typing import Optional, Tuple
 
+from wyoming.asr import Transcript
 from wyoming.info import AsrModel, AsrProgram, Attribution, Info
 from wyoming.server import AsyncServer
 from wyoming.event import Event, async_read_event, async_write_event
 
+import config_helper as config
 from conversation import JarvisConversation
-from memory import Memory
 
 logger = logging.getLogger(__name__)
 
+
+def _parse_transcript(event: Event, conversation_id: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Read a transcript event (what STT heard).
+    
+    Connections all come from Home Assistant Core rather than the satellites,
+    so the peer address says nothing about which room is talking; a turn only
+    continues an earlier conversation when the client names one in the
+    transcript context ({"conversation_id": ...}).
+    
+    Args:
+        event: Wyoming event
+        conversation_id: Conversation to use when the transcript names none
+    
+    Returns:
+        (text, conversation_id), with text None for any other event
+    """
+    if not Transcript.is_type(event.type):
+        return None, conversation_id
+    transcript = Transcript.from_event(event)
+    context_id = (transcript.context or {}).get("conversation_id")
+    if context_id:
+        conversation_id = f"wyoming:{context_id}"
+    return transcript.text or None, conversation_id
+
+
 class JarvisWyomingHandler:
     """Handler for Wyoming protocol events - simplified for conversation."""
     
@@ -28,27 +56,32 @@ class JarvisWyomingHandler:
         """
         self.jarvis = jarvis
     
-    async def handle_event(self, event):
+    def end_connection(self, conversation_id: str):
+        """Drop a connection's own conversation once the client disconnects."""
+        if conversation_id in self.jarvis.sessions:
+            self.jarvis.reset_conversation(conversation_id)
+    
+    async def handle_event(self, event, conversation_id: Optional[str] = None):
         """
         Handle incoming Wyoming protocol events.
         
         Args:
             event: Wyoming event
+            conversation_id: Conversation to use unless the transcript names one
             
         Returns:
             Wyoming response event or None
         """
         logger.debug(f"Received event: {event}")
         
-        # For now, handle generic text events
-        # Wyoming will send us text from STT, we return text for TTS
-        if hasattr(event, 'text') and event.text:
-            text = event.text
+        # Wyoming sends us the STT transcript, we return text for TTS
+        text, conversation_id = _parse_transcript(event, conversation_id)
+        if text:
             logger.info(f"User said: {text}")
             
             try:
-                # Process through Jarvis brain
-                response = self.jarvis.process(text)
+                # Process through Jarvis brain (non-blocking for other clients)
+                response = await self.jarvis.aprocess(text, conversation_id=conversation_id)
                 logger.info(f"Jarvis: {response}")
                 
                 # Create response event with text
@@ -61,6 +94,45 @@ class JarvisWyomingHandler:
                 return error_response
         
         return None
+    
+    async def stream_event(self, event, conversation_id: Optional[str] = None):
+        """
+        Handle an incoming event, streaming the reply as it is generated.
+        
+        Yields synthesize-start, one synthesize-chunk per sentence and
+        synthesize-stop, then the same final text event handle_event() returns.
+        These are TTS request events, so this is only used when stream_responses
+        is turned on for a client that reads them; Home Assistant's Wyoming
+        integration only needs the final text event.
+        
+        Args:
+            event: Wyoming event
+            conversation_id: Conversation to use unless the transcript names one
+            
+        Yields:
+            Wyoming response events
+        """
+        logger.debug(f"Received event: {event}")
+        
+        text, conversation_id = _parse_transcript(event, conversation_id)
+        if not text:
+            return
+        
+        logger.info(f"User said: {text}")
+        
+        final = []
+        try:
+            yield Event(type="synthesize-start", data={})
+            async for chunk in self.jarvis.astream(text, conversation_id=conversation_id, response=final):
+                yield Event(type="synthesize-chunk", data={"text": chunk})
+            response = "".join(final)
+            logger.info(f"Jarvis: {response}")
+        except Exception as e:
+            logger.error(f"Error processing: {e}", exc_info=True)
+            response = "I encountered an error, Sir."
+        
+        yield Event(type="synthesize-stop", data={})
+        yield Event(type="text", data={"text": response})
 
 
 async def run_wyoming_server(jarvis: JarvisConversation, host: str = "0.0.0.0", port: int = 10400):
@@ -138,6 +210,10 @@ async def handle_client(
     client_address = writer.get_extra_info("peername")
     logger.info(f"Client connected: {client_address}")
     
+    # Every room reaches us through Home Assistant Core, so unless a transcript
+    # names its conversation, turns only share history within this connection
+    conversation_id = f"wyoming:{uuid.uuid4().hex}"
+    
     try:
         # Send info on connect
         await async_write_event(wyoming_info.event(), writer)
@@ -151,7 +227,13 @@ async def handle_client(
                 break
             
             # Handle event
-            response = await handler.handle_event(event)
+            if config.STREAM_RESPONSES:
+                async for response in handler.stream_event(event, conversation_id=conversation_id):
+                    await async_write_event(response, writer)
+                    await writer.drain()
+                continue
+            
+            response = await handler.handle_event(event, conversation_id=conversation_id)
             
             if response is not None:
                 await async_write_event(response, writer)
@@ -161,6 +243,7 @@ async def handle_client(
         logger.error(f"Error handling client: {e}", exc_info=True)
     
     finally:
+        handler.end_connection(conversation_id)
         writer.close()
         await writer.wait_closed()
         logger.info(f"Client disconnected: {client_address}")